@@ -0,0 +1,168 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import NamedTuple
+from uuid import UUID
+
+from application.config import (
+    ACCESS_TOKEN_EXPIRE_DAYS,
+    AUTH_CACHE_SIZE,
+    AUTH_CACHE_TTL_SECONDS,
+    AUTH_REVOCATION_REFRESH_SECONDS,
+    USER_CHANGES_CHANNEL,
+    timestamp_utc,
+)
+from application.database.backend import UserRepository, session_factory
+from application.database.notifications import listen_notifications
+from application.logger import setup_logging
+from application.models.database_models.user import UserRole
+
+logger = setup_logging(__name__)
+
+
+class AuthorizedUser(NamedTuple):
+    id: UUID
+    role: UserRole
+
+
+class AuthCache:
+    """
+    Пользователи по api_key с ограничением размера (LRU) и времени жизни
+    записи. Кэш работает, только пока процесс слушает канал изменений
+    пользователей: без него удаление или смена роли в другом процессе
+    остались бы незамеченными.
+
+    version увеличивается при каждой инвалидации. Пользователь,
+    прочитанный из базы до нее, в кэш не попадает.
+    """
+
+    def __init__(self, size: int, ttl: float):
+        self._size = size
+        self._ttl = ttl
+        self._users: OrderedDict[str, tuple[AuthorizedUser, float]] = (
+            OrderedDict()
+        )
+        self._keys_by_user: dict[UUID, set[str]] = {}
+        self.version = 0
+        self.active = False
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def get(self, api_key: str) -> AuthorizedUser | None:
+        if not self.active:
+            return None
+        item = self._users.get(api_key)
+        if item is None:
+            return None
+        user, expires_at = item
+        if expires_at <= time.monotonic():
+            self._remove(api_key)
+            return None
+        self._users.move_to_end(api_key)
+        return user
+
+    def put(self, api_key: str, user: AuthorizedUser, version: int) -> None:
+        if not self.active or version != self.version:
+            return
+        if api_key in self._users:
+            self._remove(api_key)
+        self._users[api_key] = (user, time.monotonic() + self._ttl)
+        self._keys_by_user.setdefault(user.id, set()).add(api_key)
+        while len(self._users) > self._size:
+            self._remove(next(iter(self._users)))
+
+    def _remove(self, api_key: str) -> None:
+        user, _ = self._users.pop(api_key)
+        keys = self._keys_by_user[user.id]
+        keys.discard(api_key)
+        if not keys:
+            del self._keys_by_user[user.id]
+
+    def invalidate(self, user_id: UUID) -> None:
+        self.version += 1
+        for api_key in self._keys_by_user.pop(user_id, ()):
+            del self._users[api_key]
+
+    def clear(self) -> None:
+        self.version += 1
+        self._users.clear()
+        self._keys_by_user.clear()
+
+    def activate(self) -> None:
+        # Пока канал не слушался, изменения могли быть пропущены
+        self.clear()
+        self.active = True
+
+    def reset(self) -> None:
+        self.active = False
+        self.clear()
+
+
+class RevokedUsers:
+    """
+    Пользователи, удаленные или сменившие роль за время жизни токена:
+    их токенам нельзя верить только по подписи. Список перечитывается
+    из базы по расписанию и пополняется уведомлениями сразу. Пока он
+    не загружен, по подписи не проверяется ни один токен.
+    """
+
+    def __init__(self):
+        self._users: set[UUID] = set()
+        self._added: set[UUID] = set()
+        self.loaded = False
+
+    def __contains__(self, user_id: UUID) -> bool:
+        return not self.loaded or user_id in self._users
+
+    def add(self, user_id: UUID) -> None:
+        self._users.add(user_id)
+        self._added.add(user_id)
+
+    def begin_refresh(self) -> None:
+        self._added = set()
+
+    def replace(self, user_ids: list[UUID]) -> None:
+        # Уведомления, пришедшие во время чтения, могли в него не попасть
+        self._users = set(user_ids) | self._added
+        self.loaded = True
+
+
+auth_cache = AuthCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS)
+revoked_users = RevokedUsers()
+
+
+def on_user_changed(payload: str) -> None:
+    user_id = UUID(payload)
+    auth_cache.invalidate(user_id)
+    revoked_users.add(user_id)
+    logger.debug(f"User {payload} invalidated in auth cache")
+
+
+async def listen_user_changes() -> None:
+    """
+    Включает кэш авторизации, пока процесс слушает канал изменений
+    пользователей; при разрыве кэш выключается и очищается.
+    """
+    await listen_notifications(
+        USER_CHANGES_CHANNEL,
+        on_user_changed,
+        on_connect=auth_cache.activate,
+        on_disconnect=auth_cache.reset,
+    )
+
+
+async def refresh_revoked_users() -> None:
+    token_lifetime = timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
+    while True:
+        try:
+            revoked_users.begin_refresh()
+            async with session_factory() as session:
+                user_ids = await UserRepository(
+                    db_session=session
+                ).get_revoked(timestamp_utc() - token_lifetime)
+            revoked_users.replace(user_ids)
+        except Exception:
+            logger.exception("Revoked users refresh failed")
+        await asyncio.sleep(AUTH_REVOCATION_REFRESH_SECONDS)
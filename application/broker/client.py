@@ -1,7 +1,14 @@
 import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
 import aio_pika
-from aio_pika.abc import AbstractRobustConnection
+from aio_pika.abc import (
+    AbstractChannel,
+    AbstractExchange,
+    AbstractIncomingMessage,
+    AbstractRobustConnection,
+)
 
 from application.config import RABBITMQ_URL
 from application.logger import setup_logging
@@ -10,12 +17,17 @@ logger = setup_logging(__name__)
 
 CONNECT_RETRY_DELAY = 0.5
 CONNECT_MAX_RETRIES = 12
+PUBLISH_CONFIRM_TIMEOUT = 10
 
 
 class RabbitMQClient:
     def __init__(self, queue: str = "orders"):
         self.queue = queue
         self._connection: AbstractRobustConnection | None = None
+        self._broadcast_channel: AbstractChannel | None = None
+        self._publish_channel: AbstractChannel | None = None
+        self._declared_queues: set[str] = set()
+        self._exchanges: dict[str, AbstractExchange] = {}
 
     async def connect(self) -> None:
         last_exc = None
@@ -46,44 +58,188 @@ class RabbitMQClient:
     async def publish(
         self, payload: str, routing_key: str | None = None
     ) -> None:
+        queue = routing_key or self.queue
+        [confirmed] = await self.publish_batch([(payload, queue)])
+        if not confirmed:
+            raise ConnectionError(f"Message to '{queue}' was not confirmed")
+        logger.debug(f"Published message to queue '{queue}'")
+
+    async def _confirm_channel(self) -> AbstractChannel:
         if not self._connection:
             raise RuntimeError("RabbitMQClient is not connected")
+        if self._publish_channel is None or self._publish_channel.is_closed:
+            self._publish_channel = await self._connection.channel(
+                publisher_confirms=True
+            )
+            self._declared_queues = set()
+        return self._publish_channel
 
-        async with self._connection.channel() as channel:
-            queue = await channel.declare_queue(self.queue, durable=True)
-            await channel.default_exchange.publish(
-                aio_pika.Message(
-                    body=payload.encode(),
-                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
-                ),
-                routing_key=routing_key or queue.name,
+    async def publish_batch(
+        self, messages: list[tuple[str, str]]
+    ) -> list[bool]:
+        """
+        Публикует сообщения (payload, очередь) через постоянный канал
+        с подтверждениями издателя: все сообщения отправляются подряд,
+        затем ожидаются подтверждения. Порядок сообщений в каждой очереди
+        сохраняется. Возвращает для каждого сообщения, подтвердил ли его
+        брокер.
+        """
+        channel = await self._confirm_channel()
+        for queue in {queue for _, queue in messages} - self._declared_queues:
+            await channel.declare_queue(queue, durable=True)
+            self._declared_queues.add(queue)
+
+        results = await asyncio.gather(
+            *(
+                channel.default_exchange.publish(
+                    aio_pika.Message(
+                        body=payload.encode(),
+                        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                    ),
+                    routing_key=queue,
+                    timeout=PUBLISH_CONFIRM_TIMEOUT,
+                )
+                for payload, queue in messages
+            ),
+            return_exceptions=True,
+        )
+        return [not isinstance(result, Exception) for result in results]
+
+    async def _fanout_exchange(self, name: str) -> AbstractExchange:
+        if not self._connection:
+            raise RuntimeError("RabbitMQClient is not connected")
+        exchange = self._exchanges.get(name)
+        if exchange is None:
+            if self._broadcast_channel is None:
+                self._broadcast_channel = await self._connection.channel()
+            exchange = await self._broadcast_channel.declare_exchange(
+                name, aio_pika.ExchangeType.FANOUT
             )
-            logger.debug(f"Published message to queue '{self.queue}'")
+            self._exchanges[name] = exchange
+        return exchange
 
-    async def consume(
-        self,
-        on_message,
-        prefetch_count: int = 1,
+    async def broadcast(self, exchange: str, payload: str) -> None:
+        """
+        Рассылает сообщение всем подписчикам fanout-обменника через
+        постоянный канал. Сообщения не сохраняются на диск.
+        """
+        fanout = await self._fanout_exchange(exchange)
+        await fanout.publish(
+            aio_pika.Message(body=payload.encode()), routing_key=""
+        )
+
+    async def subscribe(
+        self, exchange: str, on_message, on_reconnect=None
     ) -> None:
+        """
+        Получает сообщения fanout-обменника во временную очередь
+        процесса без подтверждений. Работает до отмены. Сообщения,
+        отправленные во время разрыва соединения, теряются, о чем
+        сообщает вызов on_reconnect.
+        """
         if not self._connection:
             raise RuntimeError("RabbitMQClient is not connected")
+        if on_reconnect is not None:
+            self._connection.reconnect_callbacks.add(lambda *_: on_reconnect())
 
+        async with self._connection.channel() as channel:
+            fanout = await channel.declare_exchange(
+                exchange, aio_pika.ExchangeType.FANOUT
+            )
+            queue = await channel.declare_queue(exclusive=True)
+            await queue.bind(fanout)
+            async with queue.iterator(no_ack=True) as messages:
+                async for message in messages:
+                    try:
+                        await on_message(message)
+                    except Exception:
+                        logger.exception(
+                            f"Failed to handle message from '{exchange}'"
+                        )
+
+    @asynccontextmanager
+    async def _incoming(
+        self, prefetch_count: int, queues: list[str] | None
+    ) -> AsyncIterator[asyncio.Queue[AbstractIncomingMessage]]:
+        """
+        Подписывается на очереди queues (по умолчанию на self.queue)
+        и складывает сообщения из всех них в одну локальную очередь.
+        Порядок сообщений внутри каждой очереди сохраняется.
+        """
+        if not self._connection:
+            raise RuntimeError("RabbitMQClient is not connected")
+
+        queue_names = queues or [self.queue]
         async with self._connection.channel() as channel:
             await channel.set_qos(prefetch_count=prefetch_count)
-            queue = await channel.declare_queue(self.queue, durable=True)
+            incoming: asyncio.Queue[AbstractIncomingMessage] = asyncio.Queue()
+            consumers = []
+            for queue_name in queue_names:
+                queue = await channel.declare_queue(queue_name, durable=True)
+                consumers.append((queue, await queue.consume(incoming.put)))
 
             logger.info(
-                f"Consumer started, waiting for messages on '{self.queue}'"
+                f"Consumer started, waiting for messages on {queue_names}"
             )
+            try:
+                yield incoming
+            finally:
+                for queue, consumer_tag in consumers:
+                    await queue.cancel(consumer_tag)
+
+    async def consume(
+        self,
+        on_message,
+        prefetch_count: int = 1,
+        queues: list[str] | None = None,
+    ) -> None:
+        async with self._incoming(prefetch_count, queues) as incoming:
+            while True:
+                message = await incoming.get()
+                async with message.process(ignore_processed=True):
+                    try:
+                        await on_message(message)
+                    except Exception:
+                        logger.exception(
+                            f"Failed to process message {message.message_id}"
+                        )
+                        await message.reject(requeue=True)
+
+    async def consume_batches(
+        self,
+        on_batch,
+        batch_size: int,
+        batch_timeout: float,
+        queues: list[str] | None = None,
+    ) -> None:
+        """
+        Вычитывает сообщения пачками: до batch_size сообщений или пока
+        не истечет batch_timeout секунд с момента первого сообщения.
+        Обработчик сам подтверждает сообщения; неподтвержденные после
+        ошибки возвращаются в очередь.
+        """
+        loop = asyncio.get_running_loop()
+        async with self._incoming(batch_size, queues) as incoming:
+            while True:
+                batch = [await incoming.get()]
+                deadline = loop.time() + batch_timeout
+                while len(batch) < batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(
+                            await asyncio.wait_for(incoming.get(), timeout)
+                        )
+                    except asyncio.TimeoutError:
+                        break
 
-            async with queue.iterator() as queue_iter:
-                async for message in queue_iter:
-                    async with message.process(ignore_processed=True):
-                        try:
-                            await on_message(message)
-                        except Exception:
-                            logger.exception(
-                                f"Failed to process message "
-                                f"{message.message_id}"
-                            )
+                try:
+                    await on_batch(batch)
+                except Exception:
+                    logger.exception(
+                        f"Failed to process batch of {len(batch)} messages"
+                    )
+                    for message in batch:
+                        if not message.processed:
                             await message.reject(requeue=True)
@@ -1,71 +1,226 @@
 import asyncio
+import multiprocessing
 
 from aio_pika import IncomingMessage
 
 from application.broker.client import RabbitMQClient
-from application.database.engine import async_session_factory
-from application.database.repository.app_config_repository import (
-    AppConfigRepository,
+from application.broker.sharding import owned_shards, shard_queue
+from application.config import (
+    BROKER_BATCH_SIZE,
+    BROKER_BATCH_TIMEOUT_MS,
+    BROKER_PROCESSES,
+    MATCHING_ORDER_BOOK,
+    STORAGE_BACKEND,
+    TICKER_LOCK_TIMEOUT_MS,
 )
-from application.database.repository.balance_repository import (
+from application.database.backend import (
+    AppConfigRepository,
     BalanceRepository,
-)
-from application.database.repository.order_repository import OrderRepository
-from application.database.repository.transaction_repository import (
+    LockManager,
+    OrderRepository,
     TransactionRepository,
+    session_factory,
 )
+from application.database.lock_manager import LockTimeoutError
 from application.logger import setup_logging
-from application.models.database_models.order import Order
-from application.order_consumer import process_order
+from application.market_data.publisher import market_data_publisher
+from application.matching.order_book import OrderBookRegistry
+from application.models.database_models.order import Order, OrderStatus
+from application.models.database_models.transaction import Transaction
+from application.order_consumer import OrderFinalResult, execute_order
+from application.reference_data import (
+    maintain_reference_data,
+    reference_data,
+)
 
 logger = setup_logging(__name__)
 
+order_books = OrderBookRegistry() if MATCHING_ORDER_BOOK else None
+lock_timeout = (
+    TICKER_LOCK_TIMEOUT_MS / 1000 if TICKER_LOCK_TIMEOUT_MS else None
+)
 
-async def handle_message(message: IncomingMessage) -> None:
-    current_order = Order.model_validate_json(message.body.decode())
-    logger.info(f"Consumer received order {current_order.id}")
 
-    async with async_session_factory.begin() as session:
+async def load_order_books() -> None:
+    if order_books is None:
+        return
+    async with session_factory() as session:
         order_repository = OrderRepository(db_session=session)
-        balance_repository = BalanceRepository(db_session=session)
-        transaction_repository = TransactionRepository(db_session=session)
-        app_config_repository = AppConfigRepository(db_session=session)
-
-        result = await process_order(
-            current_order=current_order,
-            balance_repository=balance_repository,
-            order_repository=order_repository,
-            transaction_repository=transaction_repository,
-            app_config_repository=app_config_repository,
+        orders = await order_repository.get_open_limit_orders()
+    order_books.rebuild(orders)
+    logger.info(f"Order books loaded: {len(orders)} open orders")
+
+
+def remove_cancelled_order(current_order: Order) -> None:
+    if order_books is None:
+        return
+    order_book = order_books.get(current_order.ticker)
+    if order_book is not None:
+        order_book.remove(current_order.id)
+    logger.info(f"Order {current_order.id} removed from order book")
+
+
+async def publish_market_data(
+    ticker: str, trades: list[Transaction] | None = None
+) -> None:
+    """
+    Рассылает изменения стакана тикера и сделки после коммита.
+    """
+    if order_books is None:
+        return
+    order_book = order_books.get(ticker)
+    if order_book is not None:
+        await market_data_publisher.publish_order_book(order_book, trades)
+
+
+def log_result(current_order: Order, result: OrderFinalResult) -> None:
+    if result.status_code != 200:
+        logger.warning(
+            f"Order {current_order.id} processed with "
+            f"status {result.status_code}: {result.detail}"
+        )
+    else:
+        logger.info(f"Order {current_order.id} processed successfully")
+
+
+async def process_ticker_batch(
+    ticker: str, batch: list[tuple[IncomingMessage, Order]]
+) -> None:
+    """
+    Обрабатывает ордера одного тикера в одной транзакции под одной
+    блокировкой, которая снимается при коммите. Каждый ордер выполняется
+    в своей точке сохранения, сообщения подтверждаются после коммита
+    всей пачки.
+    """
+    if all(order.status == OrderStatus.cancelled for _, order in batch):
+        for message, current_order in batch:
+            remove_cancelled_order(current_order)
+            await message.ack()
+        await publish_market_data(ticker)
+        return
+
+    trades: list[Transaction] = []
+    try:
+        async with session_factory.begin() as session:
+            order_repository = OrderRepository(db_session=session)
+            balance_repository = BalanceRepository(db_session=session)
+            transaction_repository = TransactionRepository(db_session=session)
+            app_config_repository = AppConfigRepository(db_session=session)
+            lock_manager = LockManager(db_session=session)
+
+            await lock_manager.lock_ticker(ticker, timeout=lock_timeout)
+            base_asset = await reference_data.base_asset(app_config_repository)
+            for _, current_order in batch:
+                if current_order.status == OrderStatus.cancelled:
+                    remove_cancelled_order(current_order)
+                    continue
+
+                savepoint = await session.begin_nested()
+                result = await execute_order(
+                    current_order=current_order,
+                    base_asset=base_asset,
+                    balance_repository=balance_repository,
+                    order_repository=order_repository,
+                    transaction_repository=transaction_repository,
+                    order_books=order_books,
+                )
+                if result.status_code == 500:
+                    await savepoint.rollback()
+                else:
+                    await savepoint.commit()
+                    trades += result.transactions
+                log_result(current_order, result)
+    except LockTimeoutError:
+        logger.warning(
+            f"Ticker {ticker} is busy, {len(batch)} messages are requeued"
+        )
+        raise
+    except Exception:
+        # Изменения стакана могли не попасть в базу
+        if order_books is not None:
+            order_books.invalidate(ticker)
+        raise
+
+    for message, _ in batch:
+        await message.ack()
+    await publish_market_data(ticker, trades)
+
+
+async def handle_batch(messages: list[IncomingMessage]) -> None:
+    batches: dict[str, list[tuple[IncomingMessage, Order]]] = {}
+    for message in messages:
+        current_order = Order.model_validate_json(message.body.decode())
+        logger.info(f"Consumer received order {current_order.id}")
+        batches.setdefault(current_order.ticker, []).append(
+            (message, current_order)
         )
 
-        await session.commit()
+    for ticker, batch in batches.items():
+        await process_ticker_batch(ticker, batch)
 
-        if result.status_code != 200:
-            logger.warning(
-                f"Order {current_order.id} processed with "
-                f"status {result.status_code}: {result.detail}"
-            )
-        else:
-            logger.info(f"Order {current_order.id} processed successfully")
 
-    await message.ack()
+async def handle_message(message: IncomingMessage) -> None:
+    await handle_batch([message])
 
 
-async def consume_orders() -> None:
+async def consume_orders(shards: list[int]) -> None:
     rabbit = RabbitMQClient()
+    queues = [shard_queue(shard) for shard in shards]
+    # В режиме memory справочные данные читаются из памяти процесса API
+    reference_task = None
+    if STORAGE_BACKEND == "postgres":
+        reference_task = asyncio.create_task(maintain_reference_data())
 
     try:
+        await load_order_books()
         await rabbit.connect()
-        logger.info("Broker (order consumer) started")
-        await rabbit.consume(on_message=handle_message)
+        market_data_publisher.attach(rabbit)
+        if order_books is not None:
+            for order_book in order_books:
+                await market_data_publisher.publish_order_book(order_book)
+        logger.info(f"Broker (order consumer) started for shards {shards}")
+        if BROKER_BATCH_SIZE > 1:
+            await rabbit.consume_batches(
+                on_batch=handle_batch,
+                batch_size=BROKER_BATCH_SIZE,
+                batch_timeout=BROKER_BATCH_TIMEOUT_MS / 1000,
+                queues=queues,
+            )
+        else:
+            await rabbit.consume(on_message=handle_message, queues=queues)
     finally:
+        if reference_task is not None:
+            reference_task.cancel()
         await rabbit.close()
         logger.info("Broker stopped")
 
 
+def run_consumer(shards: list[int]) -> None:
+    asyncio.run(consume_orders(shards))
+
+
 def main() -> None:
-    asyncio.run(consume_orders())
+    shards = owned_shards()
+    processes = min(BROKER_PROCESSES, len(shards))
+    if processes <= 1:
+        run_consumer(shards)
+        return
+
+    # Каждый процесс получает свою часть шардов, поэтому тикер
+    # по-прежнему обрабатывается ровно одним процессом
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(
+            target=run_consumer,
+            args=(shards[index::processes],),
+            name=f"order-consumer-{index}",
+        )
+        for index in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
 
 
 if __name__ == "__main__":
@@ -1,50 +1,172 @@
 import asyncio
+import json
+from uuid import UUID
 
 from application.broker.client import RabbitMQClient
-from application.database.engine import async_session_factory
-from application.database.repository.outbox_message_repository import (
+from application.broker.sharding import ticker_queue
+from application.config import (
+    OUTBOX_BATCH_MAX,
+    OUTBOX_BATCH_MIN,
+    OUTBOX_CHANNEL,
+    OUTBOX_POLL_INTERVAL_SECONDS,
+    STORAGE_BACKEND,
+)
+from application.database.backend import (
     OutboxMessageRepository,
+    session_factory,
 )
+from application.database.notifications import listen_notifications
 from application.logger import setup_logging
+from application.models.database_models.outbox_message import OutboxMessage
 
 logger = setup_logging(__name__)
 
-POLL_INTERVAL_SECONDS = 2
-BATCH_SIZE = 50
+# Неподтвержденные сообщения публикуются повторно с паузой, которая
+# удваивается до OUTBOX_POLL_INTERVAL_SECONDS
+PUBLISH_RETRY_SECONDS = 0.1
+
+
+def routed(
+    messages: list[OutboxMessage],
+) -> tuple[list[tuple[OutboxMessage, str]], list[UUID]]:
+    """
+    Очереди сообщений по тикеру и ID сообщений, которые невозможно
+    разобрать.
+    """
+    routes = []
+    invalid = []
+    for message in messages:
+        try:
+            ticker = json.loads(message.payload)["ticker"]
+        except Exception:
+            logger.exception(
+                f"Invalid outbox message {message.id} is dropped: "
+                f"{message.payload!r}"
+            )
+            invalid.append(message.id)
+            continue
+        routes.append((message, ticker_queue(ticker)))
+    return routes, invalid
+
+
+async def publish_batch(
+    rabbit: RabbitMQClient, messages: list[OutboxMessage]
+) -> list[UUID]:
+    """
+    Публикует пачку с ожиданием подтверждений брокера и возвращает ID
+    сообщений, которые отмечаются отправленными: тех, что невозможно
+    разобрать, и подтвержденных до первого неподтвержденного в своей
+    очереди. Остальные останутся неотправленными и будут опубликованы
+    повторно в прежнем порядке: отмена ордера не обгонит сам ордер.
+    Уже обработанные ордера консьюмер при повторной доставке пропускает.
+    """
+    routes, invalid = routed(messages)
+    try:
+        confirmed = await rabbit.publish_batch(
+            [(message.payload, queue) for message, queue in routes]
+        )
+    except Exception:
+        logger.exception(f"Failed to publish {len(routes)} outbox messages")
+        return invalid
+
+    sent = []
+    blocked: set[str] = set()
+    for (message, queue), is_confirmed in zip(routes, confirmed, strict=True):
+        if queue in blocked:
+            continue
+        if is_confirmed:
+            sent.append(message.id)
+        else:
+            blocked.add(queue)
+    if len(sent) < len(routes):
+        logger.warning(
+            f"{len(routes) - len(sent)} of {len(routes)} outbox "
+            f"messages will be published again"
+        )
+    logger.debug(f"Published {len(sent)} outbox messages")
+    return invalid + sent
+
+
+def next_batch_size(batch_size: int, fetched: int) -> int:
+    """
+    Пачка растет вдвое, пока сообщения выбираются целиком (накопилась
+    очередь), и уменьшается вдвое, когда очередь разобрана.
+    """
+    if fetched >= batch_size:
+        return min(batch_size * 2, OUTBOX_BATCH_MAX)
+    return max(batch_size // 2, OUTBOX_BATCH_MIN)
+
+
+async def publish_pending(
+    rabbit: RabbitMQClient, batch_size: int
+) -> tuple[int, int]:
+    """
+    Публикует пачку неотправленных сообщений и возвращает, сколько
+    сообщений выбрано и сколько из них отправлено.
+    """
+    async with session_factory.begin() as session:
+        repository = OutboxMessageRepository(db_session=session)
+        messages = await repository.get(limit=batch_size)
+        if not messages:
+            return 0, 0
+        sent = await publish_batch(rabbit, messages)
+        if sent:
+            await repository.mark_sent(sent)
+    return len(messages), len(sent)
+
+
+async def wait_for_messages(ready: asyncio.Event) -> None:
+    try:
+        await asyncio.wait_for(ready.wait(), OUTBOX_POLL_INTERVAL_SECONDS)
+    except asyncio.TimeoutError:
+        pass
 
 
 async def publish_outbox_messages() -> None:
     rabbit = RabbitMQClient()
+    listener = None
+    if STORAGE_BACKEND == "memory":
+        from application.database.memory.storage import memory_storage
+
+        # Репозитории в памяти будят публикатор сами
+        ready = memory_storage.outbox_ready
+    else:
+        ready = asyncio.Event()
+        listener = asyncio.create_task(
+            listen_notifications(
+                OUTBOX_CHANNEL,
+                lambda _payload: ready.set(),
+                # Сообщения, записанные до подписки, выбираются сразу
+                on_connect=ready.set,
+                on_disconnect=lambda: None,
+            )
+        )
 
     try:
         await rabbit.connect()
         logger.info("Outbox publisher started")
 
+        batch_size = OUTBOX_BATCH_MIN
+        retry_delay = PUBLISH_RETRY_SECONDS
         while True:
-            async with async_session_factory.begin() as session:
-                repository = OutboxMessageRepository(db_session=session)
-                messages = await repository.get(limit=BATCH_SIZE)
-
-                for msg in messages:
-                    try:
-                        await rabbit.publish(payload=msg.payload)
-                        await repository.update_status(
-                            message_id=msg.id, status=True
-                        )
-                        logger.debug(
-                            f"Published and marked outbox message {msg.id}"
-                        )
-                    except Exception:
-                        logger.exception(
-                            f"Failed to publish outbox message {msg.id}"
-                        )
-
-                if messages:
-                    await session.commit()
-
-            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+            # Уведомление, пришедшее во время выборки, не теряется
+            ready.clear()
+            fetched, sent = await publish_pending(rabbit, batch_size)
+            drained = fetched < batch_size
+            batch_size = next_batch_size(batch_size, fetched)
+            if sent < fetched:
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(
+                    retry_delay * 2, OUTBOX_POLL_INTERVAL_SECONDS
+                )
+                continue
+            retry_delay = PUBLISH_RETRY_SECONDS
+            if drained:
+                await wait_for_messages(ready)
 
     finally:
+        if listener is not None:
+            listener.cancel()
         await rabbit.close()
         logger.info("Outbox publisher stopped")
 
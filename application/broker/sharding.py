@@ -0,0 +1,55 @@
+import zlib
+
+from application.config import CONSUMER_SHARDS, ORDER_QUEUE, ORDER_SHARDS
+
+
+def ticker_shard(ticker: str, shards: int = ORDER_SHARDS) -> int:
+    """
+    Стабильный номер шарда тикера: не зависит от процесса и запуска,
+    в отличие от встроенного hash().
+    """
+    return zlib.crc32(ticker.encode()) % shards
+
+
+def shard_queue(shard: int, shards: int = ORDER_SHARDS) -> str:
+    if shards == 1:
+        return ORDER_QUEUE
+    return f"{ORDER_QUEUE}.{shard}"
+
+
+def ticker_queue(ticker: str, shards: int = ORDER_SHARDS) -> str:
+    return shard_queue(ticker_shard(ticker, shards), shards)
+
+
+def owned_shards(
+    value: str = CONSUMER_SHARDS, shards: int = ORDER_SHARDS
+) -> list[int]:
+    """
+    Разбирает список шардов процесса вида "0,1,4-7".
+    Пустое значение означает все шарды, ошибка в списке
+    выбрасывает ValueError.
+    """
+    if not value.strip():
+        return list(range(shards))
+
+    result: set[int] = set()
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = map(int, part.split("-", 1))
+            if start > end:
+                raise ValueError(f"Invalid shard range {part!r}")
+            result.update(range(start, end + 1))
+        else:
+            result.add(int(part))
+
+    if not result:
+        raise ValueError(f"No shards in {value!r}")
+    invalid = [shard for shard in result if not 0 <= shard < shards]
+    if invalid:
+        raise ValueError(
+            f"Shards {sorted(invalid)} are out of range 0..{shards - 1}"
+        )
+    return sorted(result)
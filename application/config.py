@@ -56,6 +56,86 @@ RABBITMQ_URL = get_rabbitmq_url(
 )
 
 JWT_SECRET_KEY = os.getenv("SECRET_KEY")
+ACCESS_TOKEN_EXPIRE_DAYS = int(os.getenv("ACCESS_TOKEN_EXPIRE_DAYS", "30"))
+
+# Резидентный стакан консьюмера корректен, только пока тикер
+# обрабатывается единственным процессом-консьюмером
+MATCHING_ORDER_BOOK = eval(os.getenv("MATCHING_ORDER_BOOK", "True"))
+
+# При размере пачки больше 1 консьюмер обрабатывает ордера одного тикера
+# пачкой в одной транзакции под одной блокировкой
+BROKER_BATCH_SIZE = int(os.getenv("BROKER_BATCH_SIZE", "1"))
+BROKER_BATCH_TIMEOUT_MS = int(os.getenv("BROKER_BATCH_TIMEOUT_MS", "20"))
+
+# Сколько ордеров принимает POST /api/v1/order/batch за один запрос
+ORDER_BATCH_MAX_SIZE = int(os.getenv("ORDER_BATCH_MAX_SIZE", "500"))
+
+# Ордера распределяются по очередям-шардам по хешу тикера. Каждый шард
+# должен читать ровно один процесс-консьюмер: CONSUMER_SHARDS задает шарды
+# процесса ("0,1,4-7", пусто - все), BROKER_PROCESSES - число процессов,
+# между которыми они делятся
+ORDER_QUEUE = os.getenv("ORDER_QUEUE", "orders")
+ORDER_SHARDS = int(os.getenv("ORDER_SHARDS", "1"))
+CONSUMER_SHARDS = os.getenv("CONSUMER_SHARDS", "")
+BROKER_PROCESSES = int(os.getenv("BROKER_PROCESSES", "1"))
+
+# 0 - ждать блокировку тикера без ограничения; иначе по истечении времени
+# пачка ордеров возвращается в очередь
+TICKER_LOCK_TIMEOUT_MS = int(os.getenv("TICKER_LOCK_TIMEOUT_MS", "0"))
+LOCK_METRICS_LOG_INTERVAL = float(os.getenv("LOCK_METRICS_LOG_INTERVAL", "60"))
+
+# Fanout-обменник, через который консьюмер рассылает процессам API
+# изменения стаканов
+MARKET_DATA_EXCHANGE = os.getenv("MARKET_DATA_EXCHANGE", "market_data")
+# Сколько последних сделок хранится для медленного клиента WebSocket
+MARKET_DATA_STREAM_TRADES = int(os.getenv("MARKET_DATA_STREAM_TRADES", "1000"))
+# Сколько последних сделок тикера процесс API хранит в памяти
+TRADE_TAPE_SIZE = int(os.getenv("TRADE_TAPE_SIZE", "1000"))
+
+# Фоновый процесс переносит исполненные и отмененные ордера в архив
+# orders_history пачками по ARCHIVE_BATCH_SIZE и заранее создает месячные
+# секции таблицы сделок на TRANSACTION_PARTITIONS_AHEAD месяцев вперед
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "60"))
+TRANSACTION_PARTITIONS_AHEAD = int(
+    os.getenv("TRANSACTION_PARTITIONS_AHEAD", "3")
+)
+
+# Кэш авторизации по api_key в процессе API: число пользователей и время
+# жизни записи. Удаление пользователя и смена роли сбрасывают записи во всех
+# процессах через NOTIFY в канал USER_CHANGES_CHANNEL
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+USER_CHANGES_CHANNEL = os.getenv("USER_CHANGES_CHANNEL", "user_changes")
+# Изменения инструментов и конфигурации перезагружают справочные данные
+# процессов API и консьюмеров через NOTIFY в этот канал
+REFERENCE_DATA_CHANNEL = os.getenv("REFERENCE_DATA_CHANNEL", "reference_data")
+# Запись сообщений outbox будит публикатор через NOTIFY в этот канал;
+# опрос раз в OUTBOX_POLL_INTERVAL_SECONDS остается на случай потери
+# уведомлений. Размер пачки растет от OUTBOX_BATCH_MIN до OUTBOX_BATCH_MAX,
+# пока пачки выбираются целиком, и уменьшается, когда очередь разобрана
+OUTBOX_CHANNEL = os.getenv("OUTBOX_CHANNEL", "outbox")
+OUTBOX_POLL_INTERVAL_SECONDS = float(
+    os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "5")
+)
+OUTBOX_BATCH_MIN = int(os.getenv("OUTBOX_BATCH_MIN", "50"))
+OUTBOX_BATCH_MAX = int(os.getenv("OUTBOX_BATCH_MAX", "2000"))
+
+# api_key - токен ищется в базе; jwt - подпись и срок токена проверяются
+# в процессе, пользователь и роль берутся из него. Токены удаленных
+# пользователей и сменивших роль проверяются по базе: их список
+# перечитывается раз в AUTH_REVOCATION_REFRESH_SECONDS
+AUTH_MODE = os.getenv("AUTH_MODE", "api_key")
+AUTH_REVOCATION_REFRESH_SECONDS = float(
+    os.getenv("AUTH_REVOCATION_REFRESH_SECONDS", "30")
+)
+
+# postgres - репозитории на PostgreSQL; memory - на структурах в памяти
+# процесса (нагрузочные прогоны без базы). В режиме memory консьюмер
+# и публикатор outbox запускаются внутри процесса API, а администратор
+# с ключом MEMORY_ADMIN_API_KEY создается при старте
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "postgres")
+MEMORY_ADMIN_API_KEY = os.getenv("MEMORY_ADMIN_API_KEY", "")
 
 
 def timestamp_utc():
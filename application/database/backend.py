@@ -0,0 +1,153 @@
+"""
+Выбор хранилища по STORAGE_BACKEND: фабрика сессий, репозитории
+и менеджер блокировок с одинаковым интерфейсом для PostgreSQL и памяти.
+Для аннотаций используются интерфейсы из protocols.
+"""
+
+from typing import NamedTuple
+
+from application.config import STORAGE_BACKEND
+from application.database.protocols import (
+    AppConfigRepositoryProtocol,
+    BalanceRepositoryProtocol,
+    CandleRepositoryProtocol,
+    InstrumentRepositoryProtocol,
+    LockManagerProtocol,
+    OrderRepositoryProtocol,
+    OutboxMessageRepositoryProtocol,
+    SessionFactoryProtocol,
+    SessionProtocol,
+    TransactionRepositoryProtocol,
+    UserRepositoryProtocol,
+)
+
+
+class StorageBackend(NamedTuple):
+    session_factory: SessionFactoryProtocol
+    lock_manager: type[LockManagerProtocol]
+    app_config_repository: type[AppConfigRepositoryProtocol]
+    balance_repository: type[BalanceRepositoryProtocol]
+    candle_repository: type[CandleRepositoryProtocol]
+    instrument_repository: type[InstrumentRepositoryProtocol]
+    order_repository: type[OrderRepositoryProtocol]
+    outbox_message_repository: type[OutboxMessageRepositoryProtocol]
+    transaction_repository: type[TransactionRepositoryProtocol]
+    user_repository: type[UserRepositoryProtocol]
+
+
+def load_backend(name: str) -> StorageBackend:
+    """
+    Импортирует реализацию хранилища только выбранного типа.
+    """
+    if name == "memory":
+        from application.database.memory.lock_manager import (
+            MemoryLockManager,
+        )
+        from application.database.memory.repositories import (
+            MemoryAppConfigRepository,
+            MemoryBalanceRepository,
+            MemoryCandleRepository,
+            MemoryInstrumentRepository,
+            MemoryOrderRepository,
+            MemoryOutboxMessageRepository,
+            MemoryTransactionRepository,
+            MemoryUserRepository,
+        )
+        from application.database.memory.session import (
+            memory_session_factory,
+        )
+
+        return StorageBackend(
+            session_factory=memory_session_factory,
+            lock_manager=MemoryLockManager,
+            app_config_repository=MemoryAppConfigRepository,
+            balance_repository=MemoryBalanceRepository,
+            candle_repository=MemoryCandleRepository,
+            instrument_repository=MemoryInstrumentRepository,
+            order_repository=MemoryOrderRepository,
+            outbox_message_repository=MemoryOutboxMessageRepository,
+            transaction_repository=MemoryTransactionRepository,
+            user_repository=MemoryUserRepository,
+        )
+    if name == "postgres":
+        from application.database.engine import async_session_factory
+        from application.database.lock_manager import LockManager
+        from application.database.repository.app_config_repository import (
+            AppConfigRepository,
+        )
+        from application.database.repository.balance_repository import (
+            BalanceRepository,
+        )
+        from application.database.repository.candle_repository import (
+            CandleRepository,
+        )
+        from application.database.repository.instrument_repository import (
+            InstrumentRepository,
+        )
+        from application.database.repository.order_repository import (
+            OrderRepository,
+        )
+        from application.database.repository.outbox_message_repository import (  # noqa: E501
+            OutboxMessageRepository,
+        )
+        from application.database.repository.transaction_repository import (
+            TransactionRepository,
+        )
+        from application.database.repository.user_repository import (
+            UserRepository,
+        )
+
+        return StorageBackend(
+            session_factory=async_session_factory,
+            lock_manager=LockManager,
+            app_config_repository=AppConfigRepository,
+            balance_repository=BalanceRepository,
+            candle_repository=CandleRepository,
+            instrument_repository=InstrumentRepository,
+            order_repository=OrderRepository,
+            outbox_message_repository=OutboxMessageRepository,
+            transaction_repository=TransactionRepository,
+            user_repository=UserRepository,
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {name}")
+
+
+backend = load_backend(STORAGE_BACKEND)
+
+session_factory = backend.session_factory
+LockManager = backend.lock_manager
+AppConfigRepository = backend.app_config_repository
+BalanceRepository = backend.balance_repository
+CandleRepository = backend.candle_repository
+InstrumentRepository = backend.instrument_repository
+OrderRepository = backend.order_repository
+OutboxMessageRepository = backend.outbox_message_repository
+TransactionRepository = backend.transaction_repository
+UserRepository = backend.user_repository
+
+__all__ = [
+    "AppConfigRepository",
+    "AppConfigRepositoryProtocol",
+    "BalanceRepository",
+    "BalanceRepositoryProtocol",
+    "CandleRepository",
+    "CandleRepositoryProtocol",
+    "InstrumentRepository",
+    "InstrumentRepositoryProtocol",
+    "LockManager",
+    "LockManagerProtocol",
+    "OrderRepository",
+    "OrderRepositoryProtocol",
+    "OutboxMessageRepository",
+    "OutboxMessageRepositoryProtocol",
+    "SessionFactoryProtocol",
+    "SessionProtocol",
+    "StorageBackend",
+    "TransactionRepository",
+    "TransactionRepositoryProtocol",
+    "UserRepository",
+    "UserRepositoryProtocol",
+    "backend",
+    "load_backend",
+    "session_factory",
+]
@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import time
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.config import LOCK_METRICS_LOG_INTERVAL
+from application.logger import setup_logging
+
+logger = setup_logging(__name__)
+
+TRY_LOCK_MIN_DELAY = 0.001
+TRY_LOCK_MAX_DELAY = 0.05
+
+
+class LockTimeoutError(Exception):
+    pass
+
+
+def ticker_lock_key(ticker: str) -> int:
+    """
+    Детерминированный 64-битный ключ advisory-блокировки тикера,
+    одинаковый во всех процессах.
+    """
+    digest = hashlib.blake2b(ticker.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class LockWaitStats:
+    __slots__ = ("count", "timeouts", "total_wait", "max_wait")
+
+    def __init__(self):
+        self.count = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "timeouts": self.timeouts,
+            "total_wait_ms": round(self.total_wait * 1000, 3),
+            "avg_wait_ms": round(
+                self.total_wait * 1000 / self.count if self.count else 0, 3
+            ),
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class LockMetrics:
+    """
+    Время ожидания блокировок по тикерам в рамках процесса.
+    Сводка периодически пишется в лог.
+    """
+
+    def __init__(self, log_interval: float = LOCK_METRICS_LOG_INTERVAL):
+        self.log_interval = log_interval
+        self._stats: dict[str, LockWaitStats] = {}
+        self._last_report = time.monotonic()
+
+    def record(self, ticker: str, wait: float, acquired: bool = True) -> None:
+        stats = self._stats.get(ticker)
+        if stats is None:
+            stats = self._stats[ticker] = LockWaitStats()
+        if acquired:
+            stats.count += 1
+            stats.total_wait += wait
+            stats.max_wait = max(stats.max_wait, wait)
+        else:
+            stats.timeouts += 1
+
+        now = time.monotonic()
+        if self.log_interval and now - self._last_report >= self.log_interval:
+            self._last_report = now
+            logger.info(f"Ticker lock wait: {self.snapshot()}")
+
+    def snapshot(self) -> dict[str, dict]:
+        return {
+            ticker: stats.as_dict() for ticker, stats in self._stats.items()
+        }
+
+    def reset(self) -> None:
+        self._stats.clear()
+
+
+lock_metrics = LockMetrics()
+
+
+class LockManager:
+    """
+    Advisory-блокировки тикеров в рамках транзакции: снимаются
+    автоматически при коммите или откате.
+    """
+
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def try_lock_ticker(self, ticker: str, timeout: float) -> bool:
+        key = ticker_lock_key(ticker)
+        started = time.perf_counter()
+        deadline = started + timeout
+        delay = TRY_LOCK_MIN_DELAY
+        while True:
+            result = await self.db_session.scalars(
+                select(func.pg_try_advisory_xact_lock(key))
+            )
+            if result.one():
+                lock_metrics.record(ticker, time.perf_counter() - started)
+                return True
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                lock_metrics.record(
+                    ticker, time.perf_counter() - started, acquired=False
+                )
+                return False
+            await asyncio.sleep(min(delay, remaining))
+            delay = min(delay * 2, TRY_LOCK_MAX_DELAY)
+
+    async def lock_ticker(
+        self, ticker: str, timeout: float | None = None
+    ) -> None:
+        """
+        Блокирует тикер до конца транзакции. Без timeout ждет сколько
+        угодно, иначе выбрасывает LockTimeoutError по истечении времени.
+        """
+        if timeout is not None:
+            if not await self.try_lock_ticker(ticker, timeout):
+                raise LockTimeoutError(
+                    f"Ticker {ticker} lock was not acquired in {timeout}s"
+                )
+            return
+
+        started = time.perf_counter()
+        await self.db_session.execute(
+            select(func.pg_advisory_xact_lock(ticker_lock_key(ticker)))
+        )
+        lock_metrics.record(ticker, time.perf_counter() - started)
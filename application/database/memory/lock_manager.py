@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+from application.database.lock_manager import LockTimeoutError, lock_metrics
+from application.database.memory.session import MemorySession
+
+ticker_locks: dict[str, asyncio.Lock] = {}
+
+
+class MemoryLockManager:
+    """
+    Блокировки тикеров в рамках процесса с той же семантикой, что
+    у LockManager: блокировка повторно входима в пределах сессии
+    и снимается при завершении ее транзакции.
+    """
+
+    def __init__(self, db_session: MemorySession):
+        self.db_session = db_session
+
+    async def _acquire(self, ticker: str, timeout: float | None) -> bool:
+        held = self.db_session.held_locks
+        if ticker in held:
+            return True
+        lock = ticker_locks.get(ticker)
+        if lock is None:
+            lock = ticker_locks[ticker] = asyncio.Lock()
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(lock.acquire(), timeout)
+        except TimeoutError:
+            lock_metrics.record(
+                ticker, time.perf_counter() - started, acquired=False
+            )
+            return False
+        lock_metrics.record(ticker, time.perf_counter() - started)
+
+        held.add(ticker)
+
+        def release() -> None:
+            held.discard(ticker)
+            lock.release()
+
+        self.db_session.on_transaction_end(release)
+        return True
+
+    async def try_lock_ticker(self, ticker: str, timeout: float) -> bool:
+        return await self._acquire(ticker, timeout)
+
+    async def lock_ticker(
+        self, ticker: str, timeout: float | None = None
+    ) -> None:
+        if not await self._acquire(ticker, timeout):
+            raise LockTimeoutError(
+                f"Ticker {ticker} lock was not acquired in {timeout}s"
+            )
@@ -0,0 +1,693 @@
+from bisect import bisect_left
+from datetime import datetime
+from functools import partial
+from itertools import islice
+from operator import attrgetter
+from uuid import UUID
+
+import numpy as np
+
+from application.config import timestamp_utc
+from application.database.memory.session import MemorySession
+from application.database.memory.storage import transaction_timestamp
+from application.market_data.candles import (
+    CANDLE_RESOLUTIONS,
+    TradeColumns,
+    aggregate_candles,
+    epoch_microseconds,
+    merge_candle,
+)
+from application.matching.order_book import OPEN_STATUSES
+from application.models.database_models.app_config import AppConfig
+from application.models.database_models.balance import Balance, BalanceDelta
+from application.models.database_models.candle import Candle
+from application.models.database_models.instrument import Instrument
+from application.models.database_models.order import (
+    Order,
+    OrderDirection,
+    UpdateOrder,
+)
+from application.models.database_models.outbox_message import OutboxMessage
+from application.models.database_models.transaction import Transaction
+from application.models.database_models.user import User, UserRole
+
+
+class MemoryRepository:
+    def __init__(self, db_session: MemorySession):
+        self.db_session = db_session
+        self.storage = db_session.storage
+
+
+class MemoryUserRepository(MemoryRepository):
+    async def create(self, user: User, role: UserRole = UserRole.user) -> User:
+        user = User(
+            id=user.id, name=user.name, role=role, api_key=user.api_key
+        )
+        self.storage.put_user(user)
+        self.db_session.record(lambda: self.storage.remove_user(user.id))
+        return user.model_copy()
+
+    def _revoke(self, user_id: UUID) -> None:
+        previous = self.storage.user_revocations.get(user_id)
+        self.storage.user_revocations[user_id] = timestamp_utc()
+
+        def undo() -> None:
+            if previous is None:
+                del self.storage.user_revocations[user_id]
+            else:
+                self.storage.user_revocations[user_id] = previous
+
+        self.db_session.record(undo)
+
+    async def get_revoked(self, since: datetime) -> list[UUID]:
+        return [
+            user_id
+            for user_id, revoked_at in self.storage.user_revocations.items()
+            if revoked_at > since
+        ]
+
+    async def exists_in_database(self, user_name: str) -> bool:
+        return user_name in self.storage.users_by_name
+
+    async def exists_id_in_database(self, user_id: UUID):
+        return user_id if user_id in self.storage.users else None
+
+    async def get_by_id(self, user_id: UUID) -> User | None:
+        user = self.storage.users.get(user_id)
+        if user is None:
+            return None
+        return user.model_copy()
+
+    async def get_by_api_key(self, api_key: str) -> User | None:
+        user_id = self.storage.users_by_api_key.get(api_key)
+        if user_id is None:
+            return None
+        return self.storage.users[user_id].model_copy()
+
+    async def change_user_role(self, user_id: UUID, role: UserRole) -> None:
+        user = self.storage.users.get(user_id)
+        if user is None:
+            return
+        self.storage.put_user(user.model_copy(update={"role": role}))
+        self.db_session.record(partial(self.storage.put_user, user))
+        self._revoke(user_id)
+
+    async def delete(self, user_id: UUID) -> User | None:
+        user = self.storage.users.get(user_id)
+        if user is None:
+            return None
+        # Балансы и ордера удаляются каскадно, как в базе
+        balances = list(self.storage.balances.get(user_id, {}).values())
+        order_ids = list(self.storage.orders_by_user.get(user_id, ()))
+        orders = [self.storage.orders[order_id] for order_id in order_ids]
+        for balance in balances:
+            self.storage.remove_balance(user_id, balance.ticker)
+        for order in orders:
+            self.storage.remove_order(order.id)
+        self.storage.remove_user(user_id)
+
+        def undo() -> None:
+            self.storage.put_user(user)
+            for balance in balances:
+                self.storage.put_balance(balance)
+            for order in orders:
+                self.storage.put_order(order)
+
+        self.db_session.record(undo)
+        self._revoke(user_id)
+        return user.model_copy()
+
+
+class MemoryInstrumentRepository(MemoryRepository):
+    async def create(self, instrument: Instrument) -> Instrument:
+        instrument = instrument.model_copy()
+        self.storage.instruments[instrument.ticker] = instrument
+        self.db_session.record(
+            lambda: self.storage.instruments.pop(instrument.ticker)
+        )
+        return instrument.model_copy()
+
+    async def exists_in_database(self, ticker: str) -> bool:
+        return ticker in self.storage.instruments
+
+    async def get_all(self) -> list[Instrument]:
+        return [
+            instrument.model_copy()
+            for instrument in self.storage.instruments.values()
+        ]
+
+    async def delete(self, ticker: str) -> None:
+        instrument = self.storage.instruments.pop(ticker, None)
+        if instrument is None:
+            return
+        # Сделки и свечи по тикеру удаляются каскадно, как в базе
+        transactions = self.storage.transactions.pop(ticker, [])
+        candles = self.storage.candles.pop(ticker, {})
+        candle_buckets = self.storage.candle_buckets.pop(ticker, {})
+
+        def undo() -> None:
+            self.storage.instruments[ticker] = instrument
+            self.storage.transactions[ticker] = transactions
+            self.storage.candles[ticker] = candles
+            self.storage.candle_buckets[ticker] = candle_buckets
+
+        self.db_session.record(undo)
+
+
+class MemoryBalanceRepository(MemoryRepository):
+    def _get(self, user_id: UUID, ticker: str) -> Balance | None:
+        return self.storage.balances.get(user_id, {}).get(ticker)
+
+    def _put(
+        self, user_id: UUID, ticker: str, qty: int, reserve: int
+    ) -> Balance:
+        """
+        Записывает баланс с проверкой ограничений модели Balance
+        (аналог CHECK в базе) и журналирует откат.
+        """
+        previous = self._get(user_id, ticker)
+        balance = Balance(
+            user_id=user_id, ticker=ticker, qty=qty, reserve=reserve
+        )
+        self.storage.put_balance(balance)
+        if previous is None:
+            self.db_session.record(
+                lambda: self.storage.remove_balance(user_id, ticker)
+            )
+        else:
+            balance.id = previous.id
+            self.db_session.record(partial(self.storage.put_balance, previous))
+        return balance
+
+    async def upsert(self, deposit: Balance) -> Balance:
+        balance = self._get(deposit.user_id, deposit.ticker)
+        if balance is None:
+            balance = self._put(
+                deposit.user_id, deposit.ticker, deposit.qty, deposit.reserve
+            )
+        else:
+            balance = self._put(
+                deposit.user_id,
+                deposit.ticker,
+                balance.qty + deposit.qty,
+                balance.reserve,
+            )
+        return balance.model_copy()
+
+    async def get_balances_by_user_id(self, user_id: UUID) -> list[Balance]:
+        return [
+            balance.model_copy()
+            for balance in self.storage.balances.get(user_id, {}).values()
+        ]
+
+    async def get_balance_by_user_id_and_ticker(
+        self, user_id: UUID, ticker: str
+    ) -> Balance | None:
+        balance = self._get(user_id, ticker)
+        if balance is None:
+            return None
+        return balance.model_copy()
+
+    async def withdraw(self, withdraw: Balance) -> Balance | None:
+        balance = self._get(withdraw.user_id, withdraw.ticker)
+        if balance is None:
+            return None
+        balance = self._put(
+            withdraw.user_id,
+            withdraw.ticker,
+            max(balance.qty - withdraw.qty, 0),
+            balance.reserve,
+        )
+        return balance.model_copy()
+
+    async def reserve(self, balance: Balance) -> None:
+        current = self._get(balance.user_id, balance.ticker)
+        if current is None:
+            return
+        self._put(
+            balance.user_id,
+            balance.ticker,
+            current.qty - balance.reserve,
+            current.reserve + balance.reserve,
+        )
+
+    async def reserve_if_available(
+        self, user_id: UUID, ticker: str, amount: int
+    ) -> Balance | None:
+        current = self._get(user_id, ticker)
+        if current is None or current.qty < amount:
+            return None
+        balance = self._put(
+            user_id, ticker, current.qty - amount, current.reserve + amount
+        )
+        return balance.model_copy()
+
+    async def release(self, balance: Balance) -> None:
+        current = self._get(balance.user_id, balance.ticker)
+        if current is None:
+            return
+        self._put(
+            balance.user_id,
+            balance.ticker,
+            current.qty + balance.reserve,
+            current.reserve - balance.reserve,
+        )
+
+    async def bulk_adjust(self, deltas: list[BalanceDelta]) -> list[Balance]:
+        # Все строки проверяются до записи, как в одном UPDATE
+        adjusted = []
+        for delta in deltas:
+            current = self._get(delta.user_id, delta.ticker)
+            if current is None:
+                current = Balance(user_id=delta.user_id, ticker=delta.ticker)
+            adjusted.append(
+                Balance(
+                    user_id=delta.user_id,
+                    ticker=delta.ticker,
+                    qty=current.qty + delta.qty,
+                    reserve=current.reserve + delta.reserve,
+                )
+            )
+        return [
+            self._put(
+                balance.user_id, balance.ticker, balance.qty, balance.reserve
+            ).model_copy()
+            for balance in adjusted
+        ]
+
+
+class MemoryOrderRepository(MemoryRepository):
+    def _put(self, order: Order) -> None:
+        previous = self.storage.orders.get(order.id)
+        self.storage.put_order(order)
+        if previous is None:
+            self.db_session.record(lambda: self.storage.remove_order(order.id))
+        else:
+            self.db_session.record(partial(self.storage.put_order, previous))
+
+    async def create(self, order: Order) -> Order | None:
+        if order.id in self.storage.orders:
+            return None
+        order = order.model_copy(update={"filled": 0})
+        self._put(order)
+        return order.model_copy()
+
+    async def create_with_outbox(
+        self, order: Order, message: OutboxMessage
+    ) -> None:
+        await self.bulk_create_with_outbox([order], [message])
+
+    async def bulk_create_with_outbox(
+        self, orders: list[Order], messages: list[OutboxMessage]
+    ) -> None:
+        for order in orders:
+            await self.create(order)
+        await MemoryOutboxMessageRepository(self.db_session).bulk_create(
+            messages
+        )
+
+    async def get_all_by_user_id(self, user_id: UUID) -> list[Order]:
+        return [
+            self.storage.orders[order_id].model_copy()
+            for order_id in self.storage.orders_by_user.get(user_id, ())
+        ]
+
+    async def get_by_id(self, order_id: UUID) -> Order | None:
+        order = self.storage.orders.get(order_id)
+        if order is None:
+            return None
+        return order.model_copy()
+
+    async def get_by_ticker(self, ticker: str, limit: int) -> list[Order]:
+        order_ids = list(self.storage.open_orders.get(ticker, ()))[:limit]
+        return [
+            self.storage.orders[order_id].model_copy()
+            for order_id in order_ids
+        ]
+
+    async def get_levels(
+        self,
+        ticker: str,
+        direction: OrderDirection,
+        depth: int | None = None,
+    ) -> list[tuple[int, int]]:
+        levels = self.storage.order_book(ticker).side(direction).levels()
+        return list(islice(levels, depth))
+
+    async def get_crossing_orders(
+        self,
+        ticker: str,
+        direction: OrderDirection,
+        qty: int,
+        price: int | None = None,
+        page_size: int | None = None,
+    ) -> list[Order]:
+        side = self.storage.order_book(ticker).side(direction)
+        return [
+            self.storage.orders[entry.order_id].model_copy()
+            for entry in side.crossing(price, qty)
+        ]
+
+    async def get_open_limit_orders(
+        self, ticker: str | None = None
+    ) -> list[Order]:
+        if ticker is None:
+            tickers = list(self.storage.open_orders)
+        else:
+            tickers = [ticker]
+        orders = [
+            self.storage.orders[order_id]
+            for ticker in tickers
+            for order_id in self.storage.open_orders.get(ticker, ())
+        ]
+        return [
+            order.model_copy()
+            for order in sorted(orders, key=attrgetter("timestamp", "id"))
+            if order.price is not None
+        ]
+
+    async def get_open_by_ids(self, order_ids: list[UUID]) -> list[Order]:
+        orders = []
+        for order_id in order_ids:
+            order = self.storage.orders.get(order_id)
+            if order is not None and order.status in OPEN_STATUSES:
+                orders.append(order.model_copy())
+        return orders
+
+    async def update(self, params: UpdateOrder) -> None:
+        order = self.storage.orders.get(params.id)
+        if order is None:
+            return
+        update_values = params.model_dump(exclude_unset=True, exclude={"id"})
+        self._put(order.model_copy(update=update_values))
+
+    async def bulk_update(self, orders: list[UpdateOrder]) -> None:
+        for params in orders:
+            order = self.storage.orders.get(params.id)
+            if order is None:
+                continue
+            update_values = params.model_dump(
+                exclude_none=True, exclude={"id"}
+            )
+            self._put(order.model_copy(update=update_values))
+
+    async def archive_finished(self, limit: int) -> int:
+        # Открытые ордера выбираются по индексу open_orders, поэтому
+        # завершенные ордера не замедляют их и не переносятся
+        return 0
+
+
+class MemoryCandleRepository(MemoryRepository):
+    def _put(self, candle: Candle) -> None:
+        previous = self.storage.get_candle(
+            candle.ticker, candle.resolution, candle.bucket
+        )
+        self.storage.put_candle(candle)
+        if previous is None:
+            self.db_session.record(
+                lambda: self.storage.remove_candle(
+                    candle.ticker, candle.resolution, candle.bucket
+                )
+            )
+        else:
+            self.db_session.record(partial(self.storage.put_candle, previous))
+
+    def _buckets(
+        self,
+        ticker: str,
+        resolution: int,
+        from_time: datetime | None,
+        to_time: datetime | None,
+    ) -> list[datetime]:
+        buckets = self.storage.candle_buckets.get(ticker, {}).get(
+            resolution, []
+        )
+        start = 0 if from_time is None else bisect_left(buckets, from_time)
+        end = (
+            len(buckets) if to_time is None else bisect_left(buckets, to_time)
+        )
+        return buckets[start:end]
+
+    async def add(self, candles: list[Candle]) -> None:
+        for candle in candles:
+            stored = self.storage.get_candle(
+                candle.ticker, candle.resolution, candle.bucket
+            )
+            if stored is None:
+                self._put(candle.model_copy())
+            else:
+                merged = stored.model_copy()
+                merge_candle(merged, candle)
+                self._put(merged)
+
+    async def get(
+        self,
+        ticker: str,
+        resolution: int,
+        from_time: datetime | None = None,
+        to_time: datetime | None = None,
+    ) -> list[Candle]:
+        series = self.storage.candles.get(ticker, {}).get(resolution, {})
+        return [
+            series[bucket].model_copy()
+            for bucket in self._buckets(ticker, resolution, from_time, to_time)
+        ]
+
+    async def rebuild(
+        self, ticker: str, start: datetime, end: datetime
+    ) -> int:
+        for resolution in CANDLE_RESOLUTIONS:
+            for bucket in self._buckets(ticker, resolution, start, end):
+                candle = self.storage.candles[ticker][resolution][bucket]
+                self.storage.remove_candle(ticker, resolution, bucket)
+                self.db_session.record(
+                    partial(self.storage.put_candle, candle)
+                )
+
+        transactions = self.storage.transactions.get(ticker, [])
+        candles = aggregate_candles(
+            transactions[
+                bisect_left(
+                    transactions, start, key=transaction_timestamp
+                ) : bisect_left(transactions, end, key=transaction_timestamp)
+            ]
+        )
+        for candle in candles:
+            self._put(candle)
+        return len(candles)
+
+
+class MemoryTransactionRepository(MemoryRepository):
+    def _add(self, transaction: Transaction) -> None:
+        self.storage.add_transaction(transaction)
+        self.db_session.record(
+            lambda: self.storage.remove_transaction(transaction)
+        )
+
+    async def create(self, transaction: Transaction) -> None:
+        await self.bulk_create(
+            [
+                Transaction(
+                    ticker=transaction.ticker,
+                    qty=transaction.qty,
+                    price=transaction.price,
+                )
+            ]
+        )
+
+    async def bulk_create(self, transactions: list[Transaction]):
+        for transaction in transactions:
+            self._add(transaction.model_copy())
+        await MemoryCandleRepository(self.db_session).add(
+            aggregate_candles(transactions)
+        )
+
+    async def get(
+        self,
+        ticker: str,
+        limit: int | None = None,
+        from_time: datetime | None = None,
+        to_time: datetime | None = None,
+    ) -> list[Transaction]:
+        transactions = self.storage.transactions.get(ticker, [])
+        start = 0
+        end = len(transactions)
+        if from_time is not None:
+            start = bisect_left(
+                transactions, from_time, key=transaction_timestamp
+            )
+        if to_time is not None:
+            end = bisect_left(transactions, to_time, key=transaction_timestamp)
+        if limit:
+            end = min(end, start + limit)
+        return [
+            transaction.model_copy() for transaction in transactions[start:end]
+        ]
+
+    async def get_latest(
+        self,
+        ticker: str,
+        limit: int | None = None,
+        before: UUID | None = None,
+    ) -> list[Transaction]:
+        transactions = self.storage.transactions.get(ticker, [])
+        end = len(transactions)
+        if before is not None:
+            end = next(
+                (
+                    index
+                    for index in range(end - 1, -1, -1)
+                    if transactions[index].id == before
+                ),
+                0,
+            )
+        start = max(end - limit, 0) if limit else 0
+        return [
+            transaction.model_copy()
+            for transaction in reversed(transactions[start:end])
+        ]
+
+    async def get_trade_columns(
+        self,
+        ticker: str,
+        from_time: datetime | None = None,
+        to_time: datetime | None = None,
+    ) -> TradeColumns:
+        transactions = await self.get(
+            ticker, from_time=from_time, to_time=to_time
+        )
+        return TradeColumns(
+            epochs=np.fromiter(
+                (epoch_microseconds(t.timestamp) for t in transactions),
+                dtype=np.int64,
+                count=len(transactions),
+            ),
+            prices=np.fromiter(
+                (t.price for t in transactions),
+                dtype=np.int64,
+                count=len(transactions),
+            ),
+            quantities=np.fromiter(
+                (t.qty for t in transactions),
+                dtype=np.int64,
+                count=len(transactions),
+            ),
+        )
+
+    async def get_time_range(
+        self, ticker: str
+    ) -> tuple[datetime, datetime] | None:
+        transactions = self.storage.transactions.get(ticker)
+        if not transactions:
+            return None
+        return transactions[0].timestamp, transactions[-1].timestamp
+
+    async def create_partitions(
+        self, months_ahead: int, now: datetime | None = None
+    ) -> list[str]:
+        return []
+
+
+class MemoryOutboxMessageRepository(MemoryRepository):
+    async def create(self, message: OutboxMessage):
+        await self.bulk_create([message])
+
+    async def bulk_create(self, messages: list[OutboxMessage]):
+        # Сообщения одной транзакции получают одно время, как now() в базе
+        created_at = datetime.now()
+        for message in messages:
+            message = OutboxMessage(id=message.id, payload=message.payload)
+            self.storage.outbox[message.id] = (
+                message,
+                created_at,
+                next(self.storage.outbox_seq),
+            )
+            self.db_session.record(
+                partial(self.storage.outbox.pop, message.id)
+            )
+        self.db_session.on_transaction_end(self.storage.outbox_ready.set)
+
+    async def get(self, limit: int = 100):
+        messages: list[OutboxMessage] = []
+        last_created_at = None
+        for message, created_at, _ in self.storage.outbox.values():
+            if len(messages) >= limit and created_at != last_created_at:
+                break
+            messages.append(message.model_copy())
+            last_created_at = created_at
+        return messages
+
+    async def update_status(self, message_id: UUID, status: bool):
+        if status:
+            await self.mark_sent([message_id])
+            return
+        item = self.storage.outbox.get(message_id)
+        if item is None:
+            return
+        message, created_at, seq = item
+        self.storage.outbox[message_id] = (
+            message.model_copy(update={"is_sent": status}),
+            created_at,
+            seq,
+        )
+        self.db_session.record(
+            partial(self.storage.outbox.__setitem__, message_id, item)
+        )
+
+    async def mark_sent(self, message_ids: list[UUID]):
+        """
+        Удаляет отправленные сообщения, чтобы выборка проходила только
+        по неотправленным. При откате сообщения возвращаются в порядке
+        создания.
+        """
+        sent = {
+            message_id: self.storage.outbox.pop(message_id)
+            for message_id in message_ids
+            if message_id in self.storage.outbox
+        }
+        if not sent:
+            return
+
+        def undo() -> None:
+            self.storage.outbox = dict(
+                sorted(
+                    (self.storage.outbox | sent).items(),
+                    key=lambda item: item[1][1:],
+                )
+            )
+
+        self.db_session.record(undo)
+
+    async def delete(self, message_id):
+        item = self.storage.outbox.pop(message_id, None)
+        if item is not None:
+            self.db_session.record(
+                partial(self.storage.outbox.__setitem__, message_id, item)
+            )
+
+
+class MemoryAppConfigRepository(MemoryRepository):
+    async def upsert(self, config: AppConfig) -> None:
+        previous = self.storage.app_config.get(config.key)
+        self.storage.app_config[config.key] = config.model_copy()
+        if previous is None:
+            self.db_session.record(
+                lambda: self.storage.app_config.pop(config.key)
+            )
+        else:
+            self.db_session.record(
+                partial(
+                    self.storage.app_config.__setitem__, config.key, previous
+                )
+            )
+
+    async def get(self, key: str):
+        config = self.storage.app_config.get(key)
+        if config is None:
+            return None
+        return config.value
+
+    async def get_all(self) -> list[AppConfig]:
+        return [
+            config.model_copy() for config in self.storage.app_config.values()
+        ]
@@ -0,0 +1,90 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+
+from application.database.memory.storage import MemoryStorage, memory_storage
+
+
+class MemorySavepoint:
+    def __init__(self, session: "MemorySession"):
+        self.session = session
+        self._position = len(session._undo)
+
+    async def commit(self) -> None:
+        pass
+
+    async def rollback(self) -> None:
+        self.session._rollback_to(self._position)
+
+
+class MemorySession:
+    """
+    Аналог AsyncSession для репозиториев в памяти. Каждое изменение
+    данных записывает в журнал функцию отката; rollback выполняет их
+    в обратном порядке. Изоляции между сессиями нет: изменения видны
+    сразу, а методы репозиториев атомарны, так как не содержат await.
+    """
+
+    def __init__(self, storage: MemoryStorage):
+        self.storage = storage
+        self._undo: list[Callable[[], object]] = []
+        self._on_end: list[Callable[[], None]] = []
+        self.held_locks: set[str] = set()
+
+    def record(self, undo: Callable[[], object]) -> None:
+        self._undo.append(undo)
+
+    def on_transaction_end(self, callback: Callable[[], None]) -> None:
+        self._on_end.append(callback)
+
+    def _rollback_to(self, position: int) -> None:
+        while len(self._undo) > position:
+            self._undo.pop()()
+
+    def _end(self) -> None:
+        while self._on_end:
+            self._on_end.pop()()
+
+    async def begin_nested(self) -> MemorySavepoint:
+        return MemorySavepoint(self)
+
+    async def commit(self) -> None:
+        self._undo.clear()
+        self._end()
+
+    async def rollback(self) -> None:
+        self._rollback_to(0)
+        self._end()
+
+    async def close(self) -> None:
+        await self.rollback()
+
+    async def __aenter__(self) -> "MemorySession":
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        await self.close()
+
+
+class MemorySessionFactory:
+    """
+    Повторяет интерфейс async_sessionmaker: factory() и factory.begin().
+    """
+
+    def __init__(self, storage: MemoryStorage):
+        self.storage = storage
+
+    def __call__(self) -> MemorySession:
+        return MemorySession(self.storage)
+
+    @asynccontextmanager
+    async def begin(self) -> AsyncIterator[MemorySession]:
+        session = MemorySession(self.storage)
+        try:
+            yield session
+        except BaseException:
+            await session.rollback()
+            raise
+        await session.commit()
+
+
+memory_session_factory = MemorySessionFactory(memory_storage)
@@ -0,0 +1,152 @@
+import asyncio
+from bisect import insort
+from datetime import datetime
+from itertools import count
+from operator import attrgetter
+from uuid import UUID
+
+from application.config import MEMORY_ADMIN_API_KEY
+from application.matching.order_book import OPEN_STATUSES, OrderBook
+from application.models.database_models.app_config import AppConfig
+from application.models.database_models.balance import Balance
+from application.models.database_models.candle import Candle
+from application.models.database_models.instrument import Instrument
+from application.models.database_models.order import Order
+from application.models.database_models.outbox_message import OutboxMessage
+from application.models.database_models.transaction import Transaction
+from application.models.database_models.user import User, UserRole
+
+transaction_timestamp = attrgetter("timestamp")
+# Порядок сделок тикера совпадает с постраничным запросом к базе
+transaction_key = attrgetter("timestamp", "id")
+
+
+class MemoryStorage:
+    """
+    Данные всех репозиториев в памяти процесса с индексами под их запросы.
+    Методы put_*/remove_* поддерживают индексы согласованными; откат
+    транзакций реализуют репозитории через журнал сессии.
+    """
+
+    def __init__(self):
+        self.users: dict[UUID, User] = {}
+        self.users_by_name: dict[str, UUID] = {}
+        self.users_by_api_key: dict[str, UUID] = {}
+        self.user_revocations: dict[UUID, datetime] = {}
+        self.instruments: dict[str, Instrument] = {}
+        self.balances: dict[UUID, dict[str, Balance]] = {}
+        self.orders: dict[UUID, Order] = {}
+        self.orders_by_user: dict[UUID, dict[UUID, None]] = {}
+        self.open_orders: dict[str, dict[UUID, None]] = {}
+        self.order_books: dict[str, OrderBook] = {}
+        self.transactions: dict[str, list[Transaction]] = {}
+        # Свечи по тикеру и разрешению и отсортированные начала интервалов
+        self.candles: dict[str, dict[int, dict[datetime, Candle]]] = {}
+        self.candle_buckets: dict[str, dict[int, list[datetime]]] = {}
+        # Неотправленные сообщения outbox в порядке (created_at, seq)
+        self.outbox: dict[UUID, tuple[OutboxMessage, datetime, int]] = {}
+        self.outbox_seq = count()
+        # Будит публикатор outbox после транзакции, записавшей сообщения
+        self.outbox_ready = asyncio.Event()
+        self.app_config: dict[str, AppConfig] = {}
+
+    def put_user(self, user: User) -> None:
+        previous = self.users.get(user.id)
+        if previous is not None:
+            self.remove_user(previous.id)
+        self.users[user.id] = user
+        self.users_by_name[user.name] = user.id
+        self.users_by_api_key[user.api_key] = user.id
+
+    def remove_user(self, user_id: UUID) -> None:
+        user = self.users.pop(user_id)
+        self.users_by_name.pop(user.name, None)
+        self.users_by_api_key.pop(user.api_key, None)
+
+    def put_balance(self, balance: Balance) -> None:
+        self.balances.setdefault(balance.user_id, {})[balance.ticker] = balance
+
+    def remove_balance(self, user_id: UUID, ticker: str) -> None:
+        balances = self.balances[user_id]
+        del balances[ticker]
+        if not balances:
+            del self.balances[user_id]
+
+    def order_book(self, ticker: str) -> OrderBook:
+        order_book = self.order_books.get(ticker)
+        if order_book is None:
+            order_book = self.order_books[ticker] = OrderBook(ticker)
+        return order_book
+
+    def put_order(self, order: Order) -> None:
+        previous = self.orders.get(order.id)
+        self.orders[order.id] = order
+        self.orders_by_user.setdefault(order.user_id, {})[order.id] = None
+        open_orders = self.open_orders.setdefault(order.ticker, {})
+        if order.status in OPEN_STATUSES:
+            open_orders[order.id] = None
+        else:
+            open_orders.pop(order.id, None)
+
+        order_book = self.order_book(order.ticker)
+        if (
+            previous is not None
+            and order.id in order_book
+            and previous.price == order.price
+        ):
+            # Ордер сохраняет место в очереди своего ценового уровня
+            order_book.fill(order.id, order.filled, order.status)
+        else:
+            order_book.add(order)
+
+    def remove_order(self, order_id: UUID) -> None:
+        order = self.orders.pop(order_id)
+        user_orders = self.orders_by_user[order.user_id]
+        del user_orders[order_id]
+        if not user_orders:
+            del self.orders_by_user[order.user_id]
+        self.open_orders.get(order.ticker, {}).pop(order_id, None)
+        self.order_book(order.ticker).remove(order_id)
+
+    def add_transaction(self, transaction: Transaction) -> None:
+        insort(
+            self.transactions.setdefault(transaction.ticker, []),
+            transaction,
+            key=transaction_key,
+        )
+
+    def remove_transaction(self, transaction: Transaction) -> None:
+        self.transactions[transaction.ticker].remove(transaction)
+
+    def get_candle(
+        self, ticker: str, resolution: int, bucket: datetime
+    ) -> Candle | None:
+        return self.candles.get(ticker, {}).get(resolution, {}).get(bucket)
+
+    def put_candle(self, candle: Candle) -> None:
+        series = self.candles.setdefault(candle.ticker, {}).setdefault(
+            candle.resolution, {}
+        )
+        if candle.bucket not in series:
+            insort(
+                self.candle_buckets.setdefault(candle.ticker, {}).setdefault(
+                    candle.resolution, []
+                ),
+                candle.bucket,
+            )
+        series[candle.bucket] = candle
+
+    def remove_candle(
+        self, ticker: str, resolution: int, bucket: datetime
+    ) -> None:
+        del self.candles[ticker][resolution][bucket]
+        self.candle_buckets[ticker][resolution].remove(bucket)
+
+    def seed_admin(self, api_key: str) -> None:
+        if not api_key or api_key in self.users_by_api_key:
+            return
+        self.put_user(User(name="admin", role=UserRole.admin, api_key=api_key))
+
+
+memory_storage = MemoryStorage()
+memory_storage.seed_admin(MEMORY_ADMIN_API_KEY)
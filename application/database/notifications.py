@@ -0,0 +1,61 @@
+import asyncio
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from application.database.engine import async_engine
+from application.logger import setup_logging
+
+logger = setup_logging(__name__)
+
+HEALTH_CHECK_SECONDS = 30
+RECONNECT_DELAY_SECONDS = 5
+
+
+async def listen(
+    connection: AsyncConnection,
+    channel: str,
+    on_notify: Callable[[str], None],
+    on_connect: Callable[[], None],
+) -> None:
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    assert driver_connection is not None
+    await driver_connection.add_listener(
+        channel,
+        lambda _connection, _pid, _channel, payload: on_notify(payload),
+    )
+    on_connect()
+    logger.info(f"Listening for notifications on {channel}")
+    while True:
+        await asyncio.sleep(HEALTH_CHECK_SECONDS)
+        await driver_connection.execute("SELECT 1")
+
+
+async def listen_notifications(
+    channel: str,
+    on_notify: Callable[[str], None],
+    on_connect: Callable[[], None],
+    on_disconnect: Callable[[], None],
+) -> None:
+    """
+    Держит отдельное соединение с Postgres, слушающее канал channel.
+    on_connect вызывается после подписки, on_disconnect - при разрыве:
+    уведомления, отправленные без подписки, теряются, поэтому кэши,
+    которые они сбрасывают, на это время выключаются.
+    """
+    while True:
+        try:
+            async with async_engine.connect() as connection:
+                try:
+                    await listen(connection, channel, on_notify, on_connect)
+                finally:
+                    # Соединение со слушателем не возвращается в пул
+                    await connection.invalidate()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception(f"Listener of {channel} failed")
+        finally:
+            on_disconnect()
+        await asyncio.sleep(RECONNECT_DELAY_SECONDS)
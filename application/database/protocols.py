@@ -0,0 +1,243 @@
+"""
+Интерфейсы хранилища, общие для PostgreSQL и памяти: сессии, фабрики
+сессий, репозиториев и менеджера блокировок. Используются в аннотациях
+вместо классов конкретного хранилища.
+"""
+
+from contextlib import AbstractAsyncContextManager
+from datetime import datetime
+from typing import Any, Awaitable, Protocol
+from uuid import UUID
+
+from application.market_data.candles import TradeColumns
+from application.models.database_models.app_config import AppConfig
+from application.models.database_models.balance import Balance, BalanceDelta
+from application.models.database_models.candle import Candle
+from application.models.database_models.instrument import Instrument
+from application.models.database_models.order import (
+    Order,
+    OrderDirection,
+    UpdateOrder,
+)
+from application.models.database_models.outbox_message import OutboxMessage
+from application.models.database_models.transaction import Transaction
+from application.models.database_models.user import User, UserRole
+from application.models.orm_models.user import UserOrm
+
+
+class SavepointProtocol(Protocol):
+    async def commit(self) -> None: ...
+
+    async def rollback(self) -> None: ...
+
+
+class SessionProtocol(Protocol):
+    def begin_nested(self) -> Awaitable[SavepointProtocol]: ...
+
+
+class SessionFactoryProtocol(Protocol):
+    def __call__(self) -> AbstractAsyncContextManager[SessionProtocol]: ...
+
+    def begin(self) -> AbstractAsyncContextManager[SessionProtocol]: ...
+
+
+class LockManagerProtocol(Protocol):
+    def __init__(self, db_session: Any) -> None: ...
+
+    async def try_lock_ticker(self, ticker: str, timeout: float) -> bool: ...
+
+    async def lock_ticker(
+        self, ticker: str, timeout: float | None = None
+    ) -> None: ...
+
+
+class AppConfigRepositoryProtocol(Protocol):
+    def __init__(self, db_session: Any) -> None: ...
+
+    async def upsert(self, config: AppConfig) -> None: ...
+
+    async def get(self, key: str) -> str | None: ...
+
+    async def get_all(self) -> list[AppConfig]: ...
+
+
+class BalanceRepositoryProtocol(Protocol):
+    def __init__(self, db_session: Any) -> None: ...
+
+    async def upsert(self, deposit: Balance) -> Balance: ...
+
+    async def get_balances_by_user_id(
+        self, user_id: UUID
+    ) -> list[Balance]: ...
+
+    async def get_balance_by_user_id_and_ticker(
+        self, user_id: UUID, ticker: str
+    ) -> Balance | None: ...
+
+    async def withdraw(self, withdraw: Balance) -> Balance | None: ...
+
+    async def reserve(self, balance: Balance) -> None: ...
+
+    async def reserve_if_available(
+        self, user_id: UUID, ticker: str, amount: int
+    ) -> Balance | None: ...
+
+    async def release(self, balance: Balance) -> None: ...
+
+    async def bulk_adjust(
+        self, deltas: list[BalanceDelta]
+    ) -> list[Balance]: ...
+
+
+class CandleRepositoryProtocol(Protocol):
+    def __init__(self, db_session: Any) -> None: ...
+
+    async def add(self, candles: list[Candle]) -> None: ...
+
+    async def get(
+        self,
+        ticker: str,
+        resolution: int,
+        from_time: datetime | None = None,
+        to_time: datetime | None = None,
+    ) -> list[Candle]: ...
+
+    async def rebuild(
+        self, ticker: str, start: datetime, end: datetime
+    ) -> int: ...
+
+
+class InstrumentRepositoryProtocol(Protocol):
+    def __init__(self, db_session: Any) -> None: ...
+
+    async def create(self, instrument: Instrument) -> Instrument: ...
+
+    async def exists_in_database(self, ticker: str) -> bool: ...
+
+    async def get_all(self) -> list[Instrument]: ...
+
+    async def delete(self, ticker: str) -> None: ...
+
+
+class OrderRepositoryProtocol(Protocol):
+    def __init__(self, db_session: Any) -> None: ...
+
+    async def create(self, order: Order) -> Order | None: ...
+
+    async def create_with_outbox(
+        self, order: Order, message: OutboxMessage
+    ) -> None: ...
+
+    async def bulk_create_with_outbox(
+        self, orders: list[Order], messages: list[OutboxMessage]
+    ) -> None: ...
+
+    async def get_all_by_user_id(self, user_id: UUID) -> list[Order]: ...
+
+    async def get_by_id(self, order_id: UUID) -> Order | None: ...
+
+    async def get_by_ticker(self, ticker: str, limit: int) -> list[Order]: ...
+
+    async def get_levels(
+        self,
+        ticker: str,
+        direction: OrderDirection,
+        depth: int | None = None,
+    ) -> list[tuple[int, int]]: ...
+
+    async def get_crossing_orders(
+        self,
+        ticker: str,
+        direction: OrderDirection,
+        qty: int,
+        price: int | None = None,
+        page_size: int = ...,
+    ) -> list[Order]: ...
+
+    async def get_open_limit_orders(
+        self, ticker: str | None = None
+    ) -> list[Order]: ...
+
+    async def get_open_by_ids(self, order_ids: list[UUID]) -> list[Order]: ...
+
+    async def update(self, params: UpdateOrder) -> None: ...
+
+    async def bulk_update(self, orders: list[UpdateOrder]) -> None: ...
+
+    async def archive_finished(self, limit: int) -> int: ...
+
+
+class OutboxMessageRepositoryProtocol(Protocol):
+    def __init__(self, db_session: Any) -> None: ...
+
+    async def create(self, message: OutboxMessage) -> None: ...
+
+    async def get(self, limit: int = 100) -> list[OutboxMessage]: ...
+
+    async def update_status(self, message_id: UUID, status: bool) -> None: ...
+
+    async def mark_sent(self, message_ids: list[UUID]) -> None: ...
+
+    async def delete(self, message_id: UUID) -> None: ...
+
+
+class TransactionRepositoryProtocol(Protocol):
+    def __init__(self, db_session: Any) -> None: ...
+
+    async def create(self, transaction: Transaction) -> None: ...
+
+    async def bulk_create(self, transactions: list[Transaction]) -> None: ...
+
+    async def get(
+        self,
+        ticker: str,
+        limit: int | None = None,
+        from_time: datetime | None = None,
+        to_time: datetime | None = None,
+    ) -> list[Transaction]: ...
+
+    async def get_latest(
+        self,
+        ticker: str,
+        limit: int | None = None,
+        before: UUID | None = None,
+    ) -> list[Transaction]: ...
+
+    async def get_trade_columns(
+        self,
+        ticker: str,
+        from_time: datetime | None = None,
+        to_time: datetime | None = None,
+    ) -> TradeColumns: ...
+
+    async def get_time_range(
+        self, ticker: str
+    ) -> tuple[datetime, datetime] | None: ...
+
+    async def create_partitions(
+        self, months_ahead: int, now: datetime | None = None
+    ) -> list[str]: ...
+
+
+class UserRepositoryProtocol(Protocol):
+    def __init__(self, db_session: Any) -> None: ...
+
+    async def create(
+        self, user: User, role: UserRole = UserRole.user
+    ) -> User: ...
+
+    async def exists_in_database(self, user_name: str) -> bool: ...
+
+    async def exists_id_in_database(self, user_id: UUID) -> bool: ...
+
+    async def get_by_id(self, user_id: UUID) -> User | None: ...
+
+    async def get_by_api_key(self, api_key: str) -> User | UserOrm | None: ...
+
+    async def get_revoked(self, since: datetime) -> list[UUID]: ...
+
+    async def change_user_role(
+        self, user_id: UUID, role: UserRole
+    ) -> None: ...
+
+    async def delete(self, user_id: UUID) -> User | None: ...
@@ -1,6 +1,7 @@
-from sqlalchemy import insert, select, update
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from application.config import REFERENCE_DATA_CHANNEL
 from application.models.database_models.app_config import AppConfig
 from application.models.orm_models.app_config import AppConfigOrm
 
@@ -10,6 +11,10 @@ class AppConfigRepository:
         self.db_session = db_session
 
     async def upsert(self, config: AppConfig) -> None:
+        # Уведомление доставляется слушателям после коммита транзакции
+        await self.db_session.execute(
+            select(func.pg_notify(REFERENCE_DATA_CHANNEL, config.key))
+        )
         config_exists = await self.db_session.scalars(
             select(AppConfigOrm).where(AppConfigOrm.key == config.key)
         )
@@ -34,3 +39,7 @@ class AppConfigRepository:
             select(AppConfigOrm.value).where(AppConfigOrm.key == key)
         )
         return result.one_or_none()
+
+    async def get_all(self) -> list[AppConfig]:
+        result = await self.db_session.scalars(select(AppConfigOrm))
+        return [AppConfig.model_validate(row) for row in result.all()]
@@ -1,9 +1,26 @@
+import uuid
 from uuid import UUID
 
-from sqlalchemy import func, insert, select, update
+from sqlalchemy import (
+    Integer,
+    String,
+    Uuid,
+    and_,
+    bindparam,
+    func,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.selectable import TableValuedAlias
 
-from application.models.database_models.balance import Balance
+from application.models.database_models.balance import (
+    Balance,
+    BalanceDelta,
+)
 from application.models.orm_models.balance import BalanceOrm
 
 
@@ -12,47 +29,22 @@ class BalanceRepository:
         self.db_session = db_session
 
     async def upsert(self, deposit: Balance) -> Balance:
-        lock_id = hash(deposit.ticker)
-        try:
-            await self.db_session.execute(
-                select(func.pg_advisory_lock(lock_id)).where(
-                    BalanceOrm.ticker == deposit.ticker
-                )
-            )
-
-            ticker_exists = await self.db_session.scalars(
-                select(BalanceOrm)
-                .where(BalanceOrm.user_id == deposit.user_id)
-                .where(BalanceOrm.ticker == deposit.ticker)
-            )
-            ticker = ticker_exists.one_or_none()
-
-            if ticker is None:
-                result = await self.db_session.scalars(
-                    insert(BalanceOrm)
-                    .values(
-                        user_id=deposit.user_id,
-                        ticker=deposit.ticker,
-                        qty=deposit.qty,
-                        reserve=deposit.reserve,
-                    )
-                    .returning(BalanceOrm)
-                )
-                return Balance.model_validate(result.one())
-
-            result = await self.db_session.scalars(
-                update(BalanceOrm)
-                .values(qty=ticker.qty + deposit.qty)
-                .where(BalanceOrm.user_id == deposit.user_id)
-                .where(BalanceOrm.ticker == deposit.ticker)
-                .returning(BalanceOrm)
-            )
-
-            return Balance.model_validate(result.one())
-        finally:
-            await self.db_session.execute(
-                select(func.pg_advisory_unlock(lock_id))
+        statement = pg_insert(BalanceOrm).values(
+            id=deposit.id,
+            user_id=deposit.user_id,
+            ticker=deposit.ticker,
+            qty=deposit.qty,
+            reserve=deposit.reserve,
+        )
+        result = await self.db_session.scalars(
+            statement.on_conflict_do_update(
+                constraint="uq_balance_user_ticker",
+                set_={"qty": BalanceOrm.qty + statement.excluded.qty},
             )
+            .returning(BalanceOrm)
+            .execution_options(synchronize_session=False)
+        )
+        return Balance.model_validate(result.one())
 
     async def get_balances_by_user_id(self, user_id: UUID) -> list[Balance]:
         result = await self.db_session.scalars(
@@ -113,6 +105,30 @@ class BalanceRepository:
             .where(BalanceOrm.ticker == balance.ticker)
         )
 
+    async def reserve_if_available(
+        self, user_id: UUID, ticker: str, amount: int
+    ) -> Balance | None:
+        """
+        Атомарно переводит amount из qty в reserve, если на балансе
+        достаточно свободных средств. Возвращает None, если баланса нет
+        или средств недостаточно.
+        """
+        result = await self.db_session.scalars(
+            update(BalanceOrm)
+            .values(
+                qty=BalanceOrm.qty - amount,
+                reserve=BalanceOrm.reserve + amount,
+            )
+            .where(BalanceOrm.user_id == user_id)
+            .where(BalanceOrm.ticker == ticker)
+            .where(BalanceOrm.qty >= amount)
+            .returning(BalanceOrm)
+        )
+        reserved = result.one_or_none()
+        if reserved is None:
+            return None
+        return Balance.model_validate(reserved)
+
     async def release(self, balance: Balance) -> None:
         await self.db_session.execute(
             update(BalanceOrm)
@@ -124,70 +140,112 @@ class BalanceRepository:
             .where(BalanceOrm.ticker == balance.ticker)
         )
 
-    async def bulk_adjust(
-        self,
-        deposit_balances: list[Balance],
-        withdraw_balances: list[Balance],
-    ) -> None:
-        sorted_deposit_balances = sorted(
-            deposit_balances, key=lambda x: x.user_id
-        )
-        for deposit in sorted_deposit_balances:
-            ticker_exists = await self.db_session.scalars(
-                select(BalanceOrm)
-                .where(BalanceOrm.user_id == deposit.user_id)
-                .where(BalanceOrm.ticker == deposit.ticker)
+    async def bulk_adjust(self, deltas: list[BalanceDelta]) -> list[Balance]:
+        """
+        Применяет итоговые изменения балансов относительной арифметикой
+        одним UPDATE по массиву изменений. Строки блокируются в порядке
+        (user_id, ticker); отсутствующие балансы создаются вторым
+        запросом INSERT ... ON CONFLICT. Возвращенные строки проверяются
+        моделью Balance, поэтому уход qty или reserve в минус
+        прерывает обработку.
+        """
+        if not deltas:
+            return []
+
+        source = balance_deltas_source(deltas)
+        locked_balance = aliased(BalanceOrm)
+        locked = (
+            select(locked_balance.id, source.c.qty, source.c.reserve)
+            .join(
+                source,
+                and_(
+                    locked_balance.user_id == source.c.user_id,
+                    locked_balance.ticker == source.c.ticker,
+                ),
             )
-            ticker_body = ticker_exists.one_or_none()
-
-            if ticker_body is None:
-                await self.db_session.execute(
-                    insert(BalanceOrm).values(
-                        user_id=deposit.user_id,
-                        ticker=deposit.ticker,
-                        qty=deposit.qty,
-                        reserve=deposit.reserve,
-                    )
-                )
-            else:
-                await self.db_session.execute(
-                    update(BalanceOrm)
-                    .values(qty=ticker_body.qty + deposit.qty)
-                    .where(BalanceOrm.user_id == deposit.user_id)
-                    .where(BalanceOrm.ticker == deposit.ticker)
-                )
-
-        sorted_withdraw_balances = sorted(
-            withdraw_balances, key=lambda x: x.user_id
+            .order_by(locked_balance.user_id, locked_balance.ticker)
+            .with_for_update(of=locked_balance)
+            .subquery()
         )
-        for withdraw in sorted_withdraw_balances:
-            ticker_exists = await self.db_session.scalars(
-                select(BalanceOrm)
-                .where(BalanceOrm.user_id == withdraw.user_id)
-                .where(BalanceOrm.ticker == withdraw.ticker)
+        result = await self.db_session.scalars(
+            update(BalanceOrm)
+            .values(
+                qty=BalanceOrm.qty + locked.c.qty,
+                reserve=BalanceOrm.reserve + locked.c.reserve,
             )
-            ticker_body = ticker_exists.one_or_none()
-            if ticker_body is None:
-                return None
-            else:
-                await self.db_session.execute(
-                    update(BalanceOrm)
-                    .values(
-                        qty=BalanceOrm.qty - withdraw.qty,
-                        reserve=BalanceOrm.reserve - withdraw.reserve,
-                    )
-                    .where(BalanceOrm.user_id == withdraw.user_id)
-                    .where(BalanceOrm.ticker == withdraw.ticker)
-                )
-
-    async def advisory_lock_by_ticker(self, ticker) -> int:
-        lock_id = hash(ticker)
-        await self.db_session.execute(
-            select(func.pg_advisory_lock(lock_id)).where(
-                BalanceOrm.ticker == ticker
+            .where(BalanceOrm.id == locked.c.id)
+            .returning(BalanceOrm)
+            .execution_options(synchronize_session=False)
+        )
+        balances = [Balance.model_validate(row) for row in result.all()]
+        if len(balances) == len(deltas):
+            return balances
+
+        updated = {(balance.user_id, balance.ticker) for balance in balances}
+        missing = [
+            delta
+            for delta in deltas
+            if (delta.user_id, delta.ticker) not in updated
+        ]
+        source = balance_deltas_source(missing)
+        statement = pg_insert(BalanceOrm).from_select(
+            ["id", "user_id", "ticker", "qty", "reserve"],
+            select(
+                source.c.id,
+                source.c.user_id,
+                source.c.ticker,
+                source.c.qty,
+                source.c.reserve,
+            ),
+        )
+        result = await self.db_session.scalars(
+            statement.on_conflict_do_update(
+                constraint="uq_balance_user_ticker",
+                set_={
+                    "qty": BalanceOrm.qty + statement.excluded.qty,
+                    "reserve": BalanceOrm.reserve + statement.excluded.reserve,
+                },
             )
+            .returning(BalanceOrm)
+            .execution_options(synchronize_session=False)
         )
-        return lock_id
-
-    async def advisory_unlock(self, lock_id: int) -> None:
-        await self.db_session.execute(select(func.pg_advisory_unlock(lock_id)))
+        balances.extend(Balance.model_validate(row) for row in result.all())
+        return balances
+
+
+def balance_deltas_source(deltas: list[BalanceDelta]) -> TableValuedAlias:
+    """
+    Представляет список изменений балансов как набор строк
+    unnest(id[], user_id[], ticker[], qty[], reserve[]).
+    """
+    return (
+        func.unnest(
+            bindparam(
+                "delta_id",
+                [uuid.uuid4() for _ in deltas],
+                type_=ARRAY(Uuid),
+            ),
+            bindparam(
+                "delta_user_id",
+                [delta.user_id for delta in deltas],
+                type_=ARRAY(Uuid),
+            ),
+            bindparam(
+                "delta_ticker",
+                [delta.ticker for delta in deltas],
+                type_=ARRAY(String),
+            ),
+            bindparam(
+                "delta_qty",
+                [delta.qty for delta in deltas],
+                type_=ARRAY(Integer),
+            ),
+            bindparam(
+                "delta_reserve",
+                [delta.reserve for delta in deltas],
+                type_=ARRAY(Integer),
+            ),
+        )
+        .table_valued("id", "user_id", "ticker", "qty", "reserve")
+        .render_derived()
+    )
@@ -0,0 +1,170 @@
+from datetime import datetime
+from typing import Any, cast
+
+from sqlalchemy import (
+    CursorResult,
+    Integer,
+    case,
+    delete,
+    func,
+    literal_column,
+    select,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from application.market_data.candles import CANDLE_RESOLUTIONS
+from application.models.database_models.candle import Candle
+from application.models.orm_models.candle import CandleOrm
+from application.models.orm_models.transaction import TransactionOrm
+
+
+def merge_on_conflict(statement):
+    """
+    Объединяет вставляемые свечи с хранимыми так же, как merge_candle.
+    """
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[
+            CandleOrm.ticker,
+            CandleOrm.resolution,
+            CandleOrm.bucket,
+        ],
+        set_={
+            "open": case(
+                (
+                    excluded.first_trade_at < CandleOrm.first_trade_at,
+                    excluded.open,
+                ),
+                else_=CandleOrm.open,
+            ),
+            "close": case(
+                (
+                    excluded.last_trade_at >= CandleOrm.last_trade_at,
+                    excluded.close,
+                ),
+                else_=CandleOrm.close,
+            ),
+            "high": func.greatest(CandleOrm.high, excluded.high),
+            "low": func.least(CandleOrm.low, excluded.low),
+            "volume": CandleOrm.volume + excluded.volume,
+            "first_trade_at": func.least(
+                CandleOrm.first_trade_at, excluded.first_trade_at
+            ),
+            "last_trade_at": func.greatest(
+                CandleOrm.last_trade_at, excluded.last_trade_at
+            ),
+        },
+    )
+
+
+class CandleRepository:
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def add(self, candles: list[Candle]) -> None:
+        """
+        Добавляет свечи новых сделок к хранимым одним запросом.
+        """
+        if not candles:
+            return
+        await self.db_session.execute(
+            merge_on_conflict(
+                pg_insert(CandleOrm).values(
+                    [candle.model_dump() for candle in candles]
+                )
+            )
+        )
+
+    async def get(
+        self,
+        ticker: str,
+        resolution: int,
+        from_time: datetime | None = None,
+        to_time: datetime | None = None,
+    ) -> list[Candle]:
+        stmt = (
+            select(CandleOrm)
+            .where(CandleOrm.ticker == ticker)
+            .where(CandleOrm.resolution == resolution)
+            .order_by(CandleOrm.bucket)
+        )
+        if from_time is not None:
+            stmt = stmt.where(CandleOrm.bucket >= from_time)
+        if to_time is not None:
+            stmt = stmt.where(CandleOrm.bucket < to_time)
+        result = await self.db_session.scalars(stmt)
+        return [Candle.model_validate(row) for row in result.all()]
+
+    async def rebuild(
+        self, ticker: str, start: datetime, end: datetime
+    ) -> int:
+        """
+        Пересчитывает свечи тикера за [start, end) из сделок. Границы
+        должны быть выровнены по наибольшему разрешению. Возвращает
+        число записанных свечей.
+        """
+        await self.db_session.execute(
+            delete(CandleOrm)
+            .where(CandleOrm.ticker == ticker)
+            .where(CandleOrm.bucket >= start)
+            .where(CandleOrm.bucket < end)
+        )
+
+        written = 0
+        for resolution in CANDLE_RESOLUTIONS:
+            # Константа в тексте запроса, чтобы выражение в GROUP BY
+            # совпадало с выражением в SELECT
+            seconds = literal_column(str(resolution), Integer)
+            epoch = func.extract("epoch", TransactionOrm.timestamp)
+            bucket = func.to_timestamp(
+                func.floor(epoch / seconds) * seconds
+            ).label("bucket")
+            by_time = (TransactionOrm.timestamp, TransactionOrm.id)
+            candles = (
+                select(
+                    TransactionOrm.ticker,
+                    seconds.label("resolution"),
+                    bucket,
+                    array_agg(
+                        aggregate_order_by(TransactionOrm.price, *by_time)
+                    )[1].label("open"),
+                    func.max(TransactionOrm.price).label("high"),
+                    func.min(TransactionOrm.price).label("low"),
+                    array_agg(
+                        aggregate_order_by(
+                            TransactionOrm.price,
+                            *(column.desc() for column in by_time),
+                        )
+                    )[1].label("close"),
+                    func.sum(TransactionOrm.qty).label("volume"),
+                    func.min(TransactionOrm.timestamp).label("first_trade_at"),
+                    func.max(TransactionOrm.timestamp).label("last_trade_at"),
+                )
+                .where(TransactionOrm.ticker == ticker)
+                .where(TransactionOrm.timestamp >= start)
+                .where(TransactionOrm.timestamp < end)
+                .group_by(TransactionOrm.ticker, bucket)
+            )
+            insert = pg_insert(CandleOrm).from_select(
+                [
+                    "ticker",
+                    "resolution",
+                    "bucket",
+                    "open",
+                    "high",
+                    "low",
+                    "close",
+                    "volume",
+                    "first_trade_at",
+                    "last_trade_at",
+                ],
+                candles,
+            )
+            # INSERT без RETURNING возвращает CursorResult с rowcount
+            result = cast(
+                CursorResult[Any], await self.db_session.execute(insert)
+            )
+            written += result.rowcount
+        return written
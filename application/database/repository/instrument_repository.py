@@ -1,6 +1,7 @@
-from sqlalchemy import delete, insert, select
+from sqlalchemy import delete, func, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from application.config import REFERENCE_DATA_CHANNEL
 from application.models.database_models.instrument import Instrument
 from application.models.orm_models.instrument import InstrumentOrm
 
@@ -9,6 +10,12 @@ class InstrumentRepository:
     def __init__(self, db_session: AsyncSession):
         self.db_session = db_session
 
+    async def _changed(self) -> None:
+        # Уведомление доставляется слушателям после коммита транзакции
+        await self.db_session.execute(
+            select(func.pg_notify(REFERENCE_DATA_CHANNEL, ""))
+        )
+
     async def create(self, instrument: Instrument) -> Instrument:
         result = await self.db_session.scalars(
             insert(InstrumentOrm)
@@ -18,6 +25,7 @@ class InstrumentRepository:
             )
             .returning(InstrumentOrm)
         )
+        await self._changed()
         return Instrument.model_validate(result.one())
 
     async def exists_in_database(self, ticker: str) -> bool:
@@ -34,3 +42,4 @@ class InstrumentRepository:
         await self.db_session.execute(
             delete(InstrumentOrm).where(InstrumentOrm.ticker == ticker)
         )
+        await self._changed()
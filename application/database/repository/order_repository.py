@@ -1,15 +1,78 @@
+from typing import Any
 from uuid import UUID
 
-from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy import (
+    Integer,
+    and_,
+    bindparam,
+    column,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    tuple_,
+    union_all,
+    update,
+    values,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.dml import ReturningInsert
+from sqlalchemy.sql.elements import ColumnElement
 
+from application.database.repository.outbox_message_repository import (
+    with_notify,
+)
+from application.matching.order_book import OPEN_STATUSES
 from application.models.database_models.order import (
     Order,
     OrderDirection,
     OrderStatus,
     UpdateOrder,
 )
-from application.models.orm_models.order import OrderOrm
+from application.models.database_models.outbox_message import OutboxMessage
+from application.models.orm_models.order import OrderHistoryOrm, OrderOrm
+from application.models.orm_models.outbox_message import OutboxMessageOrm
+
+MATCHING_PAGE_SIZE = 100
+FINISHED_STATUSES = (OrderStatus.executed, OrderStatus.cancelled)
+ORDER_COLUMNS = list(OrderHistoryOrm.__table__.c.keys())
+
+
+def status_in(statuses) -> ColumnElement[bool]:
+    """
+    Условие на статус ордера. Значения подставляются в текст запроса:
+    так условие совпадает с условием частичных индексов и при общем
+    плане подготовленного запроса.
+    """
+    return OrderOrm.status.in_(
+        bindparam(
+            None,
+            list(statuses),
+            type_=OrderOrm.status.type,
+            expanding=True,
+            literal_execute=True,
+        )
+    )
+
+
+def open_orders_of(direction: OrderDirection) -> ColumnElement[bool]:
+    """
+    Условие открытых ордеров стороны direction, совпадающее с условием
+    индексов ix_orders_open_asks/ix_orders_open_bids.
+    """
+    return and_(
+        OrderOrm.direction
+        == bindparam(
+            None,
+            direction,
+            type_=OrderOrm.direction.type,
+            literal_execute=True,
+        ),
+        status_in(OPEN_STATUSES),
+    )
 
 
 class OrderRepository:
@@ -17,10 +80,16 @@ class OrderRepository:
         self.db_session = db_session
 
     async def create(self, order: Order) -> Order | None:
+        # Повторно доставленный ордер мог быть уже перенесен в архив
         order_exists = await self.db_session.scalars(
-            select(OrderOrm).where(OrderOrm.id == order.id)
+            union_all(
+                select(OrderOrm.id).where(OrderOrm.id == order.id),
+                select(OrderHistoryOrm.id).where(
+                    OrderHistoryOrm.id == order.id
+                ),
+            )
         )
-        if order_exists.one_or_none():
+        if order_exists.first():
             return None
 
         result = await self.db_session.scalars(
@@ -38,62 +107,262 @@ class OrderRepository:
         )
         return Order.model_validate(result.one())
 
+    async def create_with_outbox(
+        self, order: Order, message: OutboxMessage
+    ) -> None:
+        await self.bulk_create_with_outbox([order], [message])
+
+    async def bulk_create_with_outbox(
+        self, orders: list[Order], messages: list[OutboxMessage]
+    ) -> None:
+        """
+        Сохраняет новые ордера и сообщения outbox о них одним запросом:
+        INSERT ордеров в CTE выполняется вместе с INSERT сообщений.
+        Сообщения вставляются в порядке списка и получают возрастающий
+        seq. Ордеров с такими id не должно существовать.
+        """
+        new_orders = (
+            insert(OrderOrm)
+            .values(
+                [
+                    {
+                        "id": order.id,
+                        "status": OrderStatus(order.status),
+                        "user_id": order.user_id,
+                        "timestamp": order.timestamp,
+                        "direction": OrderDirection(order.direction),
+                        "ticker": order.ticker,
+                        "qty": order.qty,
+                        "price": order.price,
+                    }
+                    for order in orders
+                ]
+            )
+            .cte("new_orders")
+        )
+        new_messages = values(
+            column("id", OutboxMessageOrm.id.type),
+            column("payload", OutboxMessageOrm.payload.type),
+            column("position", Integer),
+            name="new_messages",
+        ).data(
+            [
+                (message.id, message.payload, position)
+                for position, message in enumerate(messages)
+            ]
+        )
+        await self.db_session.execute(
+            with_notify(
+                insert(OutboxMessageOrm).from_select(
+                    ["id", "payload"],
+                    select(new_messages.c.id, new_messages.c.payload).order_by(
+                        new_messages.c.position
+                    ),
+                )
+            ).add_cte(new_orders)
+        )
+
     async def get_all_by_user_id(self, user_id: UUID) -> list[Order]:
+        """
+        Ордера пользователя, включая перенесенные в архив.
+        """
+        result = await self.db_session.execute(
+            union_all(
+                select(OrderOrm).where(OrderOrm.user_id == user_id),
+                select(OrderHistoryOrm).where(
+                    OrderHistoryOrm.user_id == user_id
+                ),
+            )
+        )
+        order_list: list[Order] = [
+            Order.model_validate(order) for order in result.all()
+        ]
+        return order_list
+
+    async def get_by_id(self, order_id: UUID) -> Order | None:
+        order = await self.db_session.get(OrderOrm, order_id)
+        if order is not None:
+            return Order.model_validate(order)
+        archived = await self.db_session.get(OrderHistoryOrm, order_id)
+        if archived is not None:
+            return Order.model_validate(archived)
+        return None
+
+    async def get_by_ticker(self, ticker: str, limit: int) -> list[Order]:
         result = await self.db_session.scalars(
-            select(OrderOrm).where(
-                OrderOrm.user_id == user_id,
-                # or_(
-                #     OrderOrm.status == OrderStatus.new,
-                #     OrderOrm.status == OrderStatus.partially_executed,
-                # )
+            select(OrderOrm)
+            .where(OrderOrm.ticker == ticker)
+            .where(
+                or_(
+                    OrderOrm.status == OrderStatus.new,
+                    OrderOrm.status == OrderStatus.partially_executed,
+                )
             )
+            .limit(limit)
         )
         order_list = [Order.model_validate(order) for order in result.all()]
         return order_list
 
-    async def get_by_id(self, order_id: UUID) -> Order | None:
-        result = await self.db_session.get(OrderOrm, order_id)
-        if not result:
-            return None
-        return Order.model_validate(result)
+    async def get_levels(
+        self,
+        ticker: str,
+        direction: OrderDirection,
+        depth: int | None = None,
+    ) -> list[tuple[int, int]]:
+        """
+        Агрегирует открытые лимитные ордера стороны direction по цене:
+        лучшие depth уровней (цена, остаток) в порядке приоритета.
+        """
+        remaining = func.sum(OrderOrm.qty - OrderOrm.filled)
+        stmt = (
+            select(OrderOrm.price, remaining)
+            .where(OrderOrm.ticker == ticker)
+            .where(open_orders_of(direction))
+            .where(OrderOrm.price.is_not(None))
+            .group_by(OrderOrm.price)
+            .having(remaining > 0)
+        )
+        if direction == OrderDirection.sell:
+            stmt = stmt.order_by(OrderOrm.price)
+        else:
+            stmt = stmt.order_by(OrderOrm.price.desc())
+        if depth is not None:
+            stmt = stmt.limit(depth)
+
+        result = await self.db_session.execute(stmt)
+        # Рыночные ордера отсеяны в запросе, проверка сужает тип цены
+        return [
+            (price, qty) for price, qty in result.all() if price is not None
+        ]
 
-    async def get_by_ticker(
-        self, ticker: str, limit: int, direction: OrderDirection | None = None
+    async def get_crossing_orders(
+        self,
+        ticker: str,
+        direction: OrderDirection,
+        qty: int,
+        price: int | None = None,
+        page_size: int = MATCHING_PAGE_SIZE,
     ) -> list[Order]:
-        if direction is None:
-            result = await self.db_session.scalars(
-                select(OrderOrm)
-                .where(OrderOrm.ticker == ticker)
-                .where(
-                    or_(
-                        OrderOrm.status == OrderStatus.new,
-                        OrderOrm.status == OrderStatus.partially_executed,
-                    )
-                )
-                .limit(limit)
+        """
+        Возвращает открытые ордера стороны direction, пересекающиеся с ценой
+        price, в порядке приоритета исполнения, пока их остаток не покроет
+        qty. Ограничение по цене и накопленному количеству выполняется в SQL,
+        страницы выбираются по курсору (price, timestamp, id).
+        """
+        stmt = (
+            select(OrderOrm)
+            .where(OrderOrm.ticker == ticker)
+            .where(open_orders_of(direction))
+        )
+        if direction == OrderDirection.sell:
+            if price is not None:
+                stmt = stmt.where(OrderOrm.price <= price)
+            stmt = stmt.order_by(
+                OrderOrm.price, OrderOrm.timestamp, OrderOrm.id
             )
         else:
-            stmt = (
-                select(OrderOrm)
-                .where(OrderOrm.ticker == ticker)
-                .where(OrderOrm.direction == direction)
-                .where(
-                    or_(
-                        OrderOrm.status == OrderStatus.new,
-                        OrderOrm.status == OrderStatus.partially_executed,
-                    )
-                )
+            if price is not None:
+                stmt = stmt.where(OrderOrm.price >= price)
+            stmt = stmt.order_by(
+                OrderOrm.price.desc(), OrderOrm.timestamp, OrderOrm.id
             )
 
+        orders: list[Order] = []
+        need = qty
+        last_order = None
+        while need > 0:
+            page_limit = min(page_size, need)
+            page_stmt = stmt
+            if last_order is not None:
+                page_stmt = page_stmt.where(
+                    self._after_cursor(direction, last_order)
+                )
+            page = page_stmt.limit(page_limit).subquery()
+
+            page_order_by: tuple[ColumnElement[Any], ...]
             if direction == OrderDirection.sell:
-                stmt = stmt.order_by(OrderOrm.price, OrderOrm.timestamp)
+                page_order_by = (page.c.price, page.c.timestamp, page.c.id)
             else:
-                stmt = stmt.order_by(OrderOrm.price.desc(), OrderOrm.timestamp)
+                page_order_by = (
+                    page.c.price.desc(),
+                    page.c.timestamp,
+                    page.c.id,
+                )
+            remaining = page.c.qty - page.c.filled
+            ranked = select(
+                page,
+                remaining.label("remaining"),
+                func.sum(remaining)
+                .over(order_by=page_order_by)
+                .label("cumulative"),
+            ).subquery()
 
-            result = await self.db_session.scalars(stmt)
+            result = await self.db_session.execute(
+                select(ranked)
+                .where(ranked.c.cumulative - ranked.c.remaining < need)
+                .order_by(ranked.c.cumulative)
+            )
+            rows = result.all()
+            for row in rows:
+                orders.append(Order.model_validate(row))
+                need -= row.remaining
 
-        order_list = [Order.model_validate(order) for order in result.all()]
-        return order_list
+            if len(rows) < page_limit:
+                break
+            last_order = orders[-1]
+
+        return orders
+
+    @staticmethod
+    def _after_cursor(direction: OrderDirection, order: Order):
+        position = tuple_(OrderOrm.timestamp, OrderOrm.id) > tuple_(
+            literal(order.timestamp, OrderOrm.timestamp.type),
+            literal(order.id, OrderOrm.id.type),
+        )
+        if direction == OrderDirection.sell:
+            return or_(
+                OrderOrm.price > order.price,
+                and_(OrderOrm.price == order.price, position),
+            )
+        return or_(
+            OrderOrm.price < order.price,
+            and_(OrderOrm.price == order.price, position),
+        )
+
+    async def get_open_limit_orders(
+        self, ticker: str | None = None
+    ) -> list[Order]:
+        stmt = (
+            select(OrderOrm)
+            .where(OrderOrm.price.is_not(None))
+            .where(
+                or_(
+                    OrderOrm.status == OrderStatus.new,
+                    OrderOrm.status == OrderStatus.partially_executed,
+                )
+            )
+            .order_by(OrderOrm.timestamp, OrderOrm.id)
+        )
+        if ticker is not None:
+            stmt = stmt.where(OrderOrm.ticker == ticker)
+
+        result = await self.db_session.scalars(stmt)
+        return [Order.model_validate(order) for order in result.all()]
+
+    async def get_open_by_ids(self, order_ids: list[UUID]) -> list[Order]:
+        if not order_ids:
+            return []
+        result = await self.db_session.scalars(
+            select(OrderOrm)
+            .where(OrderOrm.id.in_(order_ids))
+            .where(
+                or_(
+                    OrderOrm.status == OrderStatus.new,
+                    OrderOrm.status == OrderStatus.partially_executed,
+                )
+            )
+        )
+        return [Order.model_validate(order) for order in result.all()]
 
     async def update(self, params: UpdateOrder) -> None:
         update_values = params.dict(exclude_unset=True, exclude={"id"})
@@ -109,14 +378,29 @@ class OrderRepository:
             [order.dict(exclude_none=True) for order in orders],
         )
 
-    async def advisory_lock_by_ticker(self, ticker) -> int:
-        lock_id = hash(ticker)
-        await self.db_session.execute(
-            select(func.pg_advisory_lock(lock_id)).where(
-                OrderOrm.ticker == ticker
-            )
+    async def archive_finished(self, limit: int) -> int:
+        """
+        Переносит до limit самых старых исполненных и отмененных ордеров
+        в orders_history одним запросом. Строки, заблокированные другой
+        транзакцией, пропускаются. Возвращает число перенесенных ордеров.
+        """
+        finished = (
+            select(OrderOrm.id)
+            .where(status_in(FINISHED_STATUSES))
+            .order_by(OrderOrm.timestamp)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
         )
-        return lock_id
-
-    async def advisory_unlock(self, lock_id: int) -> None:
-        await self.db_session.execute(select(func.pg_advisory_unlock(lock_id)))
+        moved = (
+            delete(OrderOrm)
+            .where(OrderOrm.id.in_(finished.scalar_subquery()))
+            .returning(*(OrderOrm.__table__.c[name] for name in ORDER_COLUMNS))
+            .cte("moved")
+        )
+        archived: ReturningInsert[tuple[int]] = (
+            insert(OrderHistoryOrm)
+            .from_select(ORDER_COLUMNS, select(moved))
+            .returning(literal_column("1"))
+        )
+        result = await self.db_session.execute(archived)
+        return len(result.all())
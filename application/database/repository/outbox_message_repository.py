@@ -1,36 +1,81 @@
-from datetime import datetime, timedelta
 from uuid import UUID
 
-from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy import (
+    Insert,
+    Select,
+    Uuid,
+    any_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from application.config import OUTBOX_CHANNEL
 from application.models.database_models.outbox_message import OutboxMessage
 from application.models.orm_models.outbox_message import OutboxMessageOrm
 
 
+def with_notify(insert_messages: Insert) -> Select:
+    """
+    Выполняет INSERT сообщений и отправляет уведомление OUTBOX_CHANNEL
+    тем же запросом. Уведомление будит публикатор после коммита.
+    """
+    inserted = insert_messages.returning(OutboxMessageOrm.id).cte(
+        "inserted_messages"
+    )
+    return (
+        select(func.pg_notify(OUTBOX_CHANNEL, ""))
+        .select_from(inserted)
+        .limit(1)
+    )
+
+
 class OutboxMessageRepository:
     def __init__(self, db_session: AsyncSession):
         self.db_session = db_session
 
     async def create(self, message: OutboxMessage):
         await self.db_session.execute(
-            insert(OutboxMessageOrm).values(
-                id=message.id,
-                payload=message.payload,
+            with_notify(
+                insert(OutboxMessageOrm).values(
+                    id=message.id,
+                    payload=message.payload,
+                )
             )
         )
 
     async def get(self, limit: int = 100):
+        """
+        Неотправленные сообщения в порядке создания. Сообщения одной
+        транзакции (пачки ордеров) имеют одно время создания, их порядок
+        задает seq; пачка не разделяется: последняя возвращается целиком,
+        даже если сообщений становится больше limit.
+        """
+        unsent = OutboxMessageOrm.is_sent.is_(False)
+        last_created_at = (
+            select(OutboxMessageOrm.created_at)
+            .where(unsent)
+            .order_by(OutboxMessageOrm.created_at, OutboxMessageOrm.seq)
+            .offset(limit - 1)
+            .limit(1)
+            .scalar_subquery()
+        )
         result = await self.db_session.scalars(
             select(OutboxMessageOrm)
+            .where(unsent)
             .where(
                 or_(
-                    OutboxMessageOrm.is_sent.is_(False),
-                    OutboxMessageOrm.created_at
-                    < datetime.now() - timedelta(minutes=5),
+                    last_created_at.is_(None),
+                    OutboxMessageOrm.created_at <= last_created_at,
                 )
             )
-            .limit(limit)
+            .order_by(OutboxMessageOrm.created_at, OutboxMessageOrm.seq)
         )
         return [
             OutboxMessage.model_validate(message) for message in result.all()
@@ -43,6 +88,19 @@ class OutboxMessageRepository:
             .values(is_sent=status)
         )
 
+    async def mark_sent(self, message_ids: list[UUID]):
+        """
+        Отмечает отправленными все сообщения пачки одним запросом
+        """
+        await self.db_session.execute(
+            update(OutboxMessageOrm)
+            .where(
+                OutboxMessageOrm.id
+                == any_(bindparam("ids", message_ids, type_=ARRAY(Uuid)))
+            )
+            .values(is_sent=True)
+        )
+
     async def delete(self, message_id):
         await self.db_session.execute(
             delete(OutboxMessageOrm).where(OutboxMessageOrm.id == message_id)
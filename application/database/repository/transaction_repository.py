@@ -1,49 +1,201 @@
-from sqlalchemy import insert, select
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import (
+    BigInteger,
+    cast,
+    func,
+    insert,
+    literal,
+    select,
+    text,
+    tuple_,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from application.database.repository.candle_repository import (
+    CandleRepository,
+)
+from application.market_data.candles import TradeColumns, aggregate_candles
 from application.models.database_models.transaction import Transaction
 from application.models.orm_models.transaction import TransactionOrm
 
 
+def month_start(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0
+    )
+
+
+def next_month(start: datetime) -> datetime:
+    return (start + timedelta(days=32)).replace(day=1)
+
+
 class TransactionRepository:
     def __init__(self, db_session: AsyncSession):
         self.db_session = db_session
 
     async def create(self, transaction: Transaction) -> None:
-        await self.db_session.execute(
-            insert(TransactionOrm).values(
-                ticker=transaction.ticker,
-                qty=transaction.qty,
-                price=transaction.price,
-            )
+        await self.bulk_create(
+            [
+                Transaction(
+                    ticker=transaction.ticker,
+                    qty=transaction.qty,
+                    price=transaction.price,
+                )
+            ]
         )
 
     async def bulk_create(self, transactions: list[Transaction]):
+        """
+        Сохраняет сделки и в той же транзакции добавляет их в свечи.
+        """
         await self.db_session.execute(
             insert(TransactionOrm),
-            [
-                transaction.dict(exclude_unset=True)
-                for transaction in transactions
-            ],
+            [transaction.model_dump() for transaction in transactions],
+        )
+        await CandleRepository(self.db_session).add(
+            aggregate_candles(transactions)
         )
 
     async def get(
-        self, ticker: str, limit: int | None = None
+        self,
+        ticker: str,
+        limit: int | None = None,
+        from_time: datetime | None = None,
+        to_time: datetime | None = None,
     ) -> list[Transaction]:
-        if not limit:
-            result = await self.db_session.scalars(
-                select(TransactionOrm)
-                .where(TransactionOrm.ticker == ticker)
-                .order_by(TransactionOrm.timestamp)
-            )
-        else:
-            result = await self.db_session.scalars(
-                select(TransactionOrm)
-                .where(TransactionOrm.ticker == ticker)
-                .order_by(TransactionOrm.timestamp)
-                .limit(limit)
-            )
+        stmt = (
+            select(TransactionOrm)
+            .where(TransactionOrm.ticker == ticker)
+            .order_by(TransactionOrm.timestamp)
+        )
+        if from_time is not None:
+            stmt = stmt.where(TransactionOrm.timestamp >= from_time)
+        if to_time is not None:
+            stmt = stmt.where(TransactionOrm.timestamp < to_time)
+        if limit:
+            stmt = stmt.limit(limit)
+        result = await self.db_session.scalars(stmt)
         transaction_list = [
             Transaction.model_validate(row) for row in result.all()
         ]
         return transaction_list
+
+    async def get_latest(
+        self,
+        ticker: str,
+        limit: int | None = None,
+        before: UUID | None = None,
+    ) -> list[Transaction]:
+        """
+        Сделки тикера от новых к старым. before - id сделки, после
+        которой продолжается список (постраничный вывод по ключу).
+        """
+        stmt = (
+            select(TransactionOrm)
+            .where(TransactionOrm.ticker == ticker)
+            .order_by(
+                TransactionOrm.timestamp.desc(), TransactionOrm.id.desc()
+            )
+        )
+        if before is not None:
+            cursor = (
+                select(TransactionOrm.timestamp)
+                .where(TransactionOrm.id == before)
+                .scalar_subquery()
+            )
+            stmt = stmt.where(
+                tuple_(TransactionOrm.timestamp, TransactionOrm.id)
+                < tuple_(cursor, literal(before, TransactionOrm.id.type))
+            )
+        if limit:
+            stmt = stmt.limit(limit)
+        result = await self.db_session.scalars(stmt)
+        return [Transaction.model_validate(row) for row in result.all()]
+
+    async def get_trade_columns(
+        self,
+        ticker: str,
+        from_time: datetime | None = None,
+        to_time: datetime | None = None,
+    ) -> TradeColumns:
+        """
+        Время, цены и количества сделок диапазона в порядке времени,
+        собранные в массивы на стороне базы.
+        """
+        epoch = func.extract("epoch", TransactionOrm.timestamp) * 1_000_000
+        by_time = (TransactionOrm.timestamp, TransactionOrm.id)
+        stmt = select(
+            array_agg(aggregate_order_by(cast(epoch, BigInteger), *by_time)),
+            array_agg(aggregate_order_by(TransactionOrm.price, *by_time)),
+            array_agg(aggregate_order_by(TransactionOrm.qty, *by_time)),
+        ).where(TransactionOrm.ticker == ticker)
+        if from_time is not None:
+            stmt = stmt.where(TransactionOrm.timestamp >= from_time)
+        if to_time is not None:
+            stmt = stmt.where(TransactionOrm.timestamp < to_time)
+        result = await self.db_session.execute(stmt)
+        epochs, prices, quantities = result.one()
+        return TradeColumns(
+            epochs=np.array(epochs or [], dtype=np.int64),
+            prices=np.array(prices or [], dtype=np.int64),
+            quantities=np.array(quantities or [], dtype=np.int64),
+        )
+
+    async def get_time_range(
+        self, ticker: str
+    ) -> tuple[datetime, datetime] | None:
+        """
+        Время первой и последней сделки тикера.
+        """
+        result = await self.db_session.execute(
+            select(
+                func.min(TransactionOrm.timestamp),
+                func.max(TransactionOrm.timestamp),
+            ).where(TransactionOrm.ticker == ticker)
+        )
+        first, last = result.one()
+        if first is None:
+            return None
+        return first, last
+
+    async def create_partitions(
+        self, months_ahead: int, now: datetime | None = None
+    ) -> list[str]:
+        """
+        Создает недостающие месячные секции сделок на months_ahead месяцев
+        после текущего. Секции создаются заранее: при создании Postgres
+        проверяет, что в секции по умолчанию нет строк нового диапазона,
+        а будущих сделок в ней нет. Возвращает имена созданных секций.
+        """
+        table = TransactionOrm.__tablename__
+        result = await self.db_session.scalars(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = CAST(:table AS regclass)"
+            ),
+            {"table": table},
+        )
+        existing = set(result.all())
+
+        created = []
+        start = month_start(now or datetime.now(timezone.utc))
+        for _ in range(months_ahead):
+            start = next_month(start)
+            name = f"{table}_{start:%Y_%m}"
+            if name in existing:
+                continue
+            await self.db_session.execute(
+                text(
+                    f'CREATE TABLE IF NOT EXISTS "{name}" '
+                    f'PARTITION OF "{table}" FOR VALUES '
+                    f"FROM ('{start.isoformat()}') "
+                    f"TO ('{next_month(start).isoformat()}')"
+                )
+            )
+            created.append(name)
+        return created
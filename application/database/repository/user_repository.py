@@ -1,10 +1,13 @@
+from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import delete, insert, select, update
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from application.config import USER_CHANGES_CHANNEL
 from application.models.database_models.user import User, UserRole
-from application.models.orm_models.user import UserOrm
+from application.models.orm_models.user import UserOrm, UserRevocationOrm
 
 
 class UserRepository:
@@ -14,7 +17,9 @@ class UserRepository:
     async def create(self, user: User, role: UserRole = UserRole.user) -> User:
         result = await self.db_session.scalars(
             insert(UserOrm)
-            .values(name=user.name, role=role, api_key=user.api_key)
+            .values(
+                id=user.id, name=user.name, role=role, api_key=user.api_key
+            )
             .returning(UserOrm)
         )
         return User.model_validate(result.one())
@@ -31,16 +36,51 @@ class UserRepository:
         )
         return result.one_or_none()
 
+    async def get_by_id(self, user_id: UUID) -> User | None:
+        result = await self.db_session.get(UserOrm, user_id)
+        if result is None:
+            return None
+        return User.model_validate(result)
+
     async def get_by_api_key(self, api_key: str) -> UserOrm | None:
         result = await self.db_session.scalars(
             select(UserOrm).where(UserOrm.api_key == api_key)
         )
         return result.one_or_none()
 
+    async def _user_changed(self, user_id: UUID) -> None:
+        """
+        Отзывает проверку выданных пользователю токенов по подписи
+        и уведомляет процессы API после коммита транзакции.
+        """
+        revocation = pg_insert(UserRevocationOrm).values(user_id=user_id)
+        await self.db_session.execute(
+            revocation.on_conflict_do_update(
+                index_elements=[UserRevocationOrm.user_id],
+                set_={"revoked_at": func.now()},
+            )
+        )
+        await self.db_session.execute(
+            select(func.pg_notify(USER_CHANGES_CHANNEL, str(user_id)))
+        )
+
+    async def get_revoked(self, since: datetime) -> list[UUID]:
+        """
+        Пользователи, отозванные после since. Более ранние отзывы
+        не нужны: выданные до них токены уже истекли.
+        """
+        result = await self.db_session.scalars(
+            select(UserRevocationOrm.user_id).where(
+                UserRevocationOrm.revoked_at > since
+            )
+        )
+        return list(result.all())
+
     async def change_user_role(self, user_id: UUID, role: UserRole) -> None:
         await self.db_session.execute(
             update(UserOrm).where(UserOrm.id == user_id).values(role=role)
         )
+        await self._user_changed(user_id)
 
     async def delete(self, user_id: UUID) -> User | None:
         result = await self.db_session.scalars(
@@ -49,4 +89,5 @@ class UserRepository:
         result = result.one_or_none()
         if result is None:
             return None
+        await self._user_changed(user_id)
         return User.model_validate(result)
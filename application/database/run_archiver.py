@@ -0,0 +1,64 @@
+import asyncio
+
+from application.config import (
+    ARCHIVE_BATCH_SIZE,
+    ARCHIVE_INTERVAL_SECONDS,
+    TRANSACTION_PARTITIONS_AHEAD,
+)
+from application.database.backend import (
+    OrderRepository,
+    TransactionRepository,
+    session_factory,
+)
+from application.logger import setup_logging
+
+logger = setup_logging(__name__)
+
+
+async def create_transaction_partitions() -> None:
+    async with session_factory.begin() as session:
+        repository = TransactionRepository(db_session=session)
+        created = await repository.create_partitions(
+            TRANSACTION_PARTITIONS_AHEAD
+        )
+    if created:
+        logger.info(f"Transaction partitions created: {created}")
+
+
+async def archive_finished_orders() -> int:
+    """
+    Переносит завершенные ордера в архив пачками, каждая в своей
+    транзакции, пока в таблице ордеров не останется полной пачки.
+    """
+    archived = 0
+    while True:
+        async with session_factory.begin() as session:
+            repository = OrderRepository(db_session=session)
+            moved = await repository.archive_finished(ARCHIVE_BATCH_SIZE)
+        archived += moved
+        if moved < ARCHIVE_BATCH_SIZE:
+            return archived
+
+
+async def run_archiver() -> None:
+    logger.info("Archiver started")
+    try:
+        while True:
+            try:
+                await create_transaction_partitions()
+                archived = await archive_finished_orders()
+                if archived:
+                    logger.info(f"Orders archived: {archived}")
+            except Exception:
+                logger.exception("Archiver iteration failed")
+            await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+    finally:
+        logger.info("Archiver stopped")
+
+
+def main() -> None:
+    asyncio.run(run_archiver())
+
+
+if __name__ == "__main__":
+    main()
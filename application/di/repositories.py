@@ -3,28 +3,21 @@ from functools import partial
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from application.database.engine import async_session_factory
-from application.database.repository.app_config_repository import (
+from application.database.backend import (
     AppConfigRepository,
-)
-from application.database.repository.balance_repository import (
     BalanceRepository,
-)
-from application.database.repository.instrument_repository import (
+    CandleRepository,
     InstrumentRepository,
-)
-from application.database.repository.order_repository import OrderRepository
-from application.database.repository.outbox_message_repository import (
+    OrderRepository,
     OutboxMessageRepository,
-)
-from application.database.repository.transaction_repository import (
     TransactionRepository,
+    UserRepository,
+    session_factory,
 )
-from application.database.repository.user_repository import UserRepository
 
 
 async def get_db() -> AsyncSession:
-    async with async_session_factory.begin() as session:
+    async with session_factory.begin() as session:
         yield session
 
 
@@ -37,5 +30,6 @@ get_instrument_repository = get_repository(InstrumentRepository)
 get_balance_repository = get_repository(BalanceRepository)
 get_order_repository = get_repository(OrderRepository)
 get_transaction_repository = get_repository(TransactionRepository)
+get_candle_repository = get_repository(CandleRepository)
 get_outbox_message_repository = get_repository(OutboxMessageRepository)
 get_app_config_repository = get_repository(AppConfigRepository)
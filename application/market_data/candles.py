@@ -0,0 +1,168 @@
+"""
+Свечи OHLCV: агрегаты сделок по фиксированным разрешениям
+и их объединение в свечи произвольного кратного интервала.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, NamedTuple
+
+import numpy as np
+
+from application.models.database_models.candle import Candle
+from application.models.database_models.transaction import Transaction
+
+# Разрешения хранимых агрегатов в секундах: 1s, 1m, 1h, 1d
+CANDLE_RESOLUTIONS = (1, 60, 3600, 86400)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+def bucket_start(timestamp: datetime, resolution: int) -> datetime:
+    """
+    Начало интервала длины resolution секунд, отсчитанного от эпохи.
+    """
+    seconds = math.floor(timestamp.timestamp() / resolution) * resolution
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+def is_aligned(timestamp: datetime | None, resolution: int) -> bool:
+    return (
+        timestamp is None or bucket_start(timestamp, resolution) == timestamp
+    )
+
+
+def rollup_resolution(
+    interval: int, from_time: datetime | None, to_time: datetime | None
+) -> int | None:
+    """
+    Наибольшее хранимое разрешение, из которого собираются свечи
+    интервала interval в границах from_time/to_time без потерь.
+    """
+    for resolution in reversed(CANDLE_RESOLUTIONS):
+        if (
+            interval % resolution == 0
+            and is_aligned(from_time, resolution)
+            and is_aligned(to_time, resolution)
+        ):
+            return resolution
+    return None
+
+
+def merge_candle(candle: Candle, other: Candle) -> None:
+    """
+    Добавляет other в candle. Результат не зависит от порядка.
+    """
+    if other.first_trade_at < candle.first_trade_at:
+        candle.open = other.open
+        candle.first_trade_at = other.first_trade_at
+    if other.last_trade_at >= candle.last_trade_at:
+        candle.close = other.close
+        candle.last_trade_at = other.last_trade_at
+    candle.high = max(candle.high, other.high)
+    candle.low = min(candle.low, other.low)
+    candle.volume += other.volume
+
+
+def aggregate_candles(transactions: Iterable[Transaction]) -> list[Candle]:
+    """
+    Сворачивает сделки в свечи всех хранимых разрешений.
+    """
+    candles: dict[tuple[str, int, datetime], Candle] = {}
+    for transaction in transactions:
+        for resolution in CANDLE_RESOLUTIONS:
+            bucket = bucket_start(transaction.timestamp, resolution)
+            candle = candles.get((transaction.ticker, resolution, bucket))
+            trade = Candle(
+                ticker=transaction.ticker,
+                resolution=resolution,
+                bucket=bucket,
+                open=transaction.price,
+                high=transaction.price,
+                low=transaction.price,
+                close=transaction.price,
+                volume=transaction.qty,
+                first_trade_at=transaction.timestamp,
+                last_trade_at=transaction.timestamp,
+            )
+            if candle is None:
+                candles[transaction.ticker, resolution, bucket] = trade
+            else:
+                merge_candle(candle, trade)
+    return list(candles.values())
+
+
+def combine_candles(candles: Iterable[Candle], interval: int) -> list[Candle]:
+    """
+    Объединяет свечи, отсортированные по времени, в свечи интервала,
+    кратного их разрешению.
+    """
+    combined: list[Candle] = []
+    for candle in candles:
+        bucket = bucket_start(candle.bucket, interval)
+        if combined and combined[-1].bucket == bucket:
+            merge_candle(combined[-1], candle)
+        else:
+            combined.append(
+                candle.model_copy(
+                    update={"resolution": interval, "bucket": bucket}
+                )
+            )
+    return combined
+
+
+def epoch_microseconds(timestamp: datetime) -> int:
+    return (timestamp - EPOCH) // MICROSECOND
+
+
+def from_epoch_microseconds(microseconds: int) -> datetime:
+    return EPOCH + timedelta(microseconds=microseconds)
+
+
+class TradeColumns(NamedTuple):
+    """
+    Сделки диапазона столбцами в порядке времени: время в микросекундах
+    от эпохи, цена и количество.
+    """
+
+    epochs: np.ndarray
+    prices: np.ndarray
+    quantities: np.ndarray
+
+
+class CandleColumns(NamedTuple):
+    """
+    Свечи столбцами: начало интервала в микросекундах от эпохи и OHLCV.
+    """
+
+    buckets: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+
+def trade_candles(trades: TradeColumns, interval: int) -> CandleColumns:
+    """
+    Свечи интервала interval секунд по сделкам без цикла по строкам:
+    сделки одного интервала идут подряд, поэтому границы интервалов -
+    места смены номера интервала, а OHLCV - свертки по отрезкам.
+    """
+    if not len(trades.epochs):
+        empty = np.empty(0, dtype=np.int64)
+        return CandleColumns(empty, empty, empty, empty, empty, empty)
+    bucket_ids = trades.epochs // (interval * 1_000_000)
+    starts = np.flatnonzero(
+        np.concatenate(([True], bucket_ids[1:] != bucket_ids[:-1]))
+    )
+    ends = np.append(starts[1:], len(bucket_ids))
+    return CandleColumns(
+        buckets=bucket_ids[starts] * interval * 1_000_000,
+        open=trades.prices[starts],
+        high=np.maximum.reduceat(trades.prices, starts),
+        low=np.minimum.reduceat(trades.prices, starts),
+        close=trades.prices[ends - 1],
+        volume=np.add.reduceat(trades.quantities, starts),
+    )
@@ -0,0 +1,26 @@
+from enum import StrEnum
+
+from application.models.base import ModelBase
+from application.models.database_models.transaction import Transaction
+
+Levels = list[tuple[int, int]]
+
+
+class MarketDataEventType(StrEnum):
+    snapshot = "SNAPSHOT"
+    levels = "LEVELS"
+
+
+class MarketDataEvent(ModelBase):
+    """
+    Изменение рынка тикера от консьюмера после коммита: уровни стакана
+    и сделки. Уровни (цена, остаток) абсолютные: нулевой остаток
+    означает, что уровень исчез. SNAPSHOT содержит все уровни
+    и заменяет стакан целиком.
+    """
+
+    type: MarketDataEventType
+    ticker: str
+    bids: Levels = []
+    asks: Levels = []
+    trades: list[Transaction] = []
@@ -0,0 +1,54 @@
+from application.broker.client import RabbitMQClient
+from application.config import MARKET_DATA_EXCHANGE
+from application.logger import setup_logging
+from application.market_data.events import MarketDataEvent, MarketDataEventType
+from application.matching.order_book import OrderBook
+from application.models.database_models.transaction import Transaction
+
+logger = setup_logging(__name__)
+
+
+class MarketDataPublisher:
+    """
+    Рассылает из консьюмера изменения резидентных стаканов и сделки
+    после коммита. Без подключения к RabbitMQ изменения только
+    сбрасываются.
+    """
+
+    def __init__(self):
+        self.rabbit: RabbitMQClient | None = None
+
+    def attach(self, rabbit: RabbitMQClient) -> None:
+        self.rabbit = rabbit
+
+    async def publish_order_book(
+        self, order_book: OrderBook, trades: list[Transaction] | None = None
+    ) -> None:
+        is_snapshot, bids, asks = order_book.pop_changed_levels()
+        if self.rabbit is None or not (is_snapshot or bids or asks or trades):
+            return
+
+        event = MarketDataEvent(
+            type=(
+                MarketDataEventType.snapshot
+                if is_snapshot
+                else MarketDataEventType.levels
+            ),
+            ticker=order_book.ticker,
+            bids=bids,
+            asks=asks,
+            trades=trades or [],
+        )
+        try:
+            await self.rabbit.broadcast(
+                MARKET_DATA_EXCHANGE, event.model_dump_json()
+            )
+        except Exception:
+            logger.exception(
+                f"Failed to publish market data for {order_book.ticker}"
+            )
+            # Подписчики могли пропустить изменения
+            order_book.snapshot_pending = True
+
+
+market_data_publisher = MarketDataPublisher()
@@ -0,0 +1,114 @@
+"""
+Пересчет хранимых свечей из истории сделок.
+
+Диапазон сделок каждого тикера делится на куски по целым суткам,
+куски пересчитываются параллельно в отдельных транзакциях. Кусок
+с текущими сутками пересчитывается под блокировкой тикера, чтобы
+не разойтись со свечами, которые добавляет консьюмер.
+
+Пример:
+    python -m application.market_data.rebuild_candles --workers 8
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from application.database.backend import (
+    CandleRepository,
+    InstrumentRepository,
+    LockManager,
+    TransactionRepository,
+    session_factory,
+)
+from application.logger import setup_logging
+from application.market_data.candles import CANDLE_RESOLUTIONS, bucket_start
+
+logger = setup_logging(__name__)
+
+DAY = timedelta(seconds=max(CANDLE_RESOLUTIONS))
+
+
+async def rebuild_chunk(
+    ticker: str, start: datetime, end: datetime, live: bool
+) -> int:
+    async with session_factory.begin() as session:
+        if live:
+            await LockManager(db_session=session).lock_ticker(ticker)
+        return await CandleRepository(db_session=session).rebuild(
+            ticker, start, end
+        )
+
+
+async def ticker_chunks(
+    tickers: list[str] | None, chunk_days: int
+) -> list[tuple[str, datetime, datetime]]:
+    async with session_factory() as session:
+        if not tickers:
+            instruments = await InstrumentRepository(session).get_all()
+            tickers = [instrument.ticker for instrument in instruments]
+
+        chunks = []
+        transaction_repository = TransactionRepository(db_session=session)
+        for ticker in tickers:
+            time_range = await transaction_repository.get_time_range(ticker)
+            if time_range is None:
+                continue
+            first, last = time_range
+            start = bucket_start(first, int(DAY.total_seconds()))
+            while start <= last:
+                end = start + DAY * chunk_days
+                chunks.append((ticker, start, end))
+                start = end
+    return chunks
+
+
+async def rebuild_candles(
+    tickers: list[str] | None = None, chunk_days: int = 1, workers: int = 4
+) -> int:
+    """
+    Пересчитывает свечи тикеров (по умолчанию всех) и возвращает
+    число записанных свечей.
+    """
+    started_at = datetime.now().astimezone()
+    chunks = await ticker_chunks(tickers, chunk_days)
+    semaphore = asyncio.Semaphore(workers)
+
+    async def run(ticker: str, start: datetime, end: datetime) -> int:
+        async with semaphore:
+            written = await rebuild_chunk(ticker, start, end, end > started_at)
+        logger.info(f"Candles rebuilt: {ticker} [{start}, {end}): {written}")
+        return written
+
+    results = await asyncio.gather(*(run(*chunk) for chunk in chunks))
+    return sum(results)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--ticker",
+        action="append",
+        dest="tickers",
+        help="тикер для пересчета (можно несколько раз), по умолчанию все",
+    )
+    parser.add_argument("--chunk-days", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=4)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    started = time.perf_counter()
+    written = asyncio.run(
+        rebuild_candles(args.tickers, args.chunk_days, args.workers)
+    )
+    logger.info(
+        f"Candles rebuild finished: {written} candles "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
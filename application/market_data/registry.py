@@ -0,0 +1,94 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Generic, TypeVar
+
+from application.market_data.events import MarketDataEvent
+
+State = TypeVar("State")
+Loaded = TypeVar("Loaded")
+
+
+class TickerStateRegistry(ABC, Generic[State, Loaded]):
+    """
+    Состояния тикеров процесса API, которые поддерживаются событиями
+    консьюмера. Состояние холодного тикера загружается из базы при
+    первом запросе; события, пришедшие во время загрузки, применяются
+    после нее. Пока подписка на события не активна, состояния
+    не используются.
+    """
+
+    def __init__(self):
+        self.active = False
+        self._states: dict[str, State] = {}
+        self._loading: dict[str, list[MarketDataEvent]] = {}
+        self._loaded: dict[str, asyncio.Event] = {}
+
+    def get(self, ticker: str) -> State | None:
+        if not self.active:
+            return None
+        return self._states.get(ticker)
+
+    @abstractmethod
+    def _create(self, ticker: str, loaded: Loaded) -> State: ...
+
+    @abstractmethod
+    def _apply(self, event: MarketDataEvent) -> None: ...
+
+    def _apply_pending(
+        self, state: State, pending: list[MarketDataEvent]
+    ) -> None:
+        for event in pending:
+            self._apply(event)
+
+    def apply(self, event: MarketDataEvent) -> None:
+        pending = self._loading.get(event.ticker)
+        if pending is not None:
+            pending.append(event)
+            return
+        self._apply(event)
+
+    async def load(
+        self, ticker: str, loader: Callable[[str], Awaitable[Loaded]]
+    ) -> State | None:
+        """
+        Загружает состояние тикера через loader, если оно еще
+        не загружено; одновременные запросы ждут одну загрузку.
+        Возвращает None, если подписка не активна или загрузка
+        не удалась.
+        """
+        if not self.active:
+            return None
+        state = self._states.get(ticker)
+        if state is not None:
+            return state
+
+        loaded = self._loaded.get(ticker)
+        if loaded is not None:
+            await loaded.wait()
+            return self.get(ticker)
+
+        pending = self._loading[ticker] = []
+        loaded = self._loaded[ticker] = asyncio.Event()
+        try:
+            state = self._states[ticker] = self._create(
+                ticker, await loader(ticker)
+            )
+        finally:
+            del self._loading[ticker]
+            del self._loaded[ticker]
+            loaded.set()
+        self._apply_pending(state, pending)
+        return self.get(ticker)
+
+    def discard(self, ticker: str) -> None:
+        self._states.pop(ticker, None)
+
+    def retain(self, tickers: frozenset[str]) -> None:
+        """
+        Удаляет состояния тикеров, которых нет среди инструментов.
+        """
+        for ticker in self._states.keys() - tickers:
+            self.discard(ticker)
+
+    def reset(self) -> None:
+        self._states.clear()
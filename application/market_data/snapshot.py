@@ -0,0 +1,132 @@
+from bisect import bisect_left, insort
+
+from application.market_data.events import (
+    Levels,
+    MarketDataEvent,
+    MarketDataEventType,
+)
+from application.market_data.registry import TickerStateRegistry
+from application.market_data.stream import MarketDataStream
+from application.models.database_models.order import OrderDirection
+
+
+class LevelSide:
+    """
+    Агрегированные уровни одной стороны стакана: остаток по цене
+    и отсортированные ключи приоритета (для bid - отрицательная цена).
+    """
+
+    def __init__(self, direction: OrderDirection):
+        self._sign = -1 if direction == OrderDirection.buy else 1
+        self._keys: list[int] = []
+        self._qty: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def set(self, price: int, qty: int) -> None:
+        key = self._sign * price
+        if qty <= 0:
+            if self._qty.pop(price, None) is not None:
+                del self._keys[bisect_left(self._keys, key)]
+            return
+        if price not in self._qty:
+            insort(self._keys, key)
+        self._qty[price] = qty
+
+    def levels(self, depth: int | None = None) -> Levels:
+        keys = self._keys if depth is None else self._keys[:depth]
+        return [
+            (self._sign * key, self._qty[self._sign * key]) for key in keys
+        ]
+
+
+class L2Snapshot:
+    """
+    Агрегированный стакан тикера, который поддерживается событиями
+    консьюмера; запрос с ограничением глубины не зависит от числа ордеров.
+    """
+
+    def __init__(self, ticker: str, bids: Levels, asks: Levels):
+        self.ticker = ticker
+        self.bids = LevelSide(OrderDirection.buy)
+        self.asks = LevelSide(OrderDirection.sell)
+        self.update(bids, asks)
+
+    def update(self, bids: Levels, asks: Levels) -> None:
+        for price, qty in bids:
+            self.bids.set(price, qty)
+        for price, qty in asks:
+            self.asks.set(price, qty)
+
+
+class L2SnapshotRegistry(
+    TickerStateRegistry[L2Snapshot, tuple[Levels, Levels]]
+):
+    """
+    Снимки стаканов процесса API. Снимок тикера появляется из события
+    SNAPSHOT консьюмера или загружается из базы при первом запросе.
+
+    Каждое примененное событие получает номер seq тикера, который
+    не сбрасывается вместе со снимками, и передается потокам клиентов
+    WebSocket. При замене или сбросе снимка потоки запрашивают новый.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._seq: dict[str, int] = {}
+        self._streams: dict[str, set[MarketDataStream]] = {}
+
+    def seq(self, ticker: str) -> int:
+        return self._seq.get(ticker, 0)
+
+    def _next_seq(self, ticker: str) -> int:
+        seq = self._seq[ticker] = self._seq.get(ticker, 0) + 1
+        return seq
+
+    def _create(
+        self, ticker: str, loaded: tuple[Levels, Levels]
+    ) -> L2Snapshot:
+        bids, asks = loaded
+        return L2Snapshot(ticker, bids, asks)
+
+    def _apply(self, event: MarketDataEvent) -> None:
+        ticker = event.ticker
+        snapshot = self._states.get(ticker)
+        if event.type == MarketDataEventType.snapshot:
+            self._states[ticker] = L2Snapshot(ticker, event.bids, event.asks)
+            self._next_seq(ticker)
+            for stream in self._streams.get(ticker, ()):
+                stream.request_resync()
+            return
+        if snapshot is None:
+            # Изменения холодного тикера не нужны: при первом запросе
+            # он будет загружен из базы целиком
+            return
+
+        snapshot.update(event.bids, event.asks)
+        seq = self._next_seq(ticker)
+        for stream in self._streams.get(ticker, ()):
+            stream.push(seq, event.bids, event.asks, event.trades)
+
+    def add_stream(self, stream: MarketDataStream) -> None:
+        self._streams.setdefault(stream.ticker, set()).add(stream)
+
+    def remove_stream(self, stream: MarketDataStream) -> None:
+        streams = self._streams.get(stream.ticker)
+        if streams is not None:
+            streams.discard(stream)
+            if not streams:
+                del self._streams[stream.ticker]
+
+    def discard(self, ticker: str) -> None:
+        super().discard(ticker)
+        self._seq.pop(ticker, None)
+        for stream in self._streams.get(ticker, ()):
+            stream.request_resync()
+
+    def reset(self) -> None:
+        super().reset()
+        for streams in self._streams.values():
+            for stream in streams:
+                stream.request_resync()
@@ -0,0 +1,106 @@
+import asyncio
+from collections import deque
+
+from application.market_data.events import Levels
+from application.models.database_models.transaction import Transaction
+from application.models.endpoint_models.public.get_orderbook import Level
+from application.models.endpoint_models.public.get_transaction_history import (
+    GetTransactionHistoryResponse,
+)
+from application.models.endpoint_models.public.stream_market_data import (
+    MarketDataMessage,
+    MarketDataMessageType,
+)
+
+
+class MarketDataStream:
+    """
+    Очередь обновлений одного клиента WebSocket. Публикация не ждет
+    клиента: изменения уровней, пришедшие до отправки, схлопываются
+    в последнее значение, а из сделок хранятся последние max_trades.
+    """
+
+    def __init__(self, ticker: str, max_trades: int):
+        self.ticker = ticker
+        self.max_trades = max_trades
+        # Клиенту нужен снимок: при подключении и после сброса снимков
+        self.resync = True
+        self.seq = 0
+        self.sent_seq = 0
+        self.missed_trades = 0
+        self._bids: dict[int, int] = {}
+        self._asks: dict[int, int] = {}
+        self._trades: deque[Transaction] = deque(maxlen=max_trades)
+        self._ready = asyncio.Event()
+
+    def start(self, seq: int) -> None:
+        """
+        Начинает поток после отправки снимка с номером seq.
+        """
+        self.resync = False
+        self.seq = self.sent_seq = seq
+        self.missed_trades = 0
+        self._bids.clear()
+        self._asks.clear()
+        self._trades.clear()
+        self._ready.clear()
+
+    def push(
+        self, seq: int, bids: Levels, asks: Levels, trades: list[Transaction]
+    ) -> None:
+        if self.resync:
+            return
+        self.seq = seq
+        self._bids.update(bids)
+        self._asks.update(asks)
+        overflow = len(self._trades) + len(trades) - self.max_trades
+        if overflow > 0:
+            self.missed_trades += overflow
+        self._trades.extend(trades)
+        self._ready.set()
+
+    def request_resync(self) -> None:
+        self.resync = True
+        self._ready.set()
+
+    async def wait(self) -> None:
+        await self._ready.wait()
+
+    def pop(self) -> MarketDataMessage:
+        """
+        Забирает накопленные изменения одним сообщением delta. Уровни
+        с нулевым остатком исчезли; missed_trades - число сделок,
+        не поместившихся в очередь.
+        """
+        message = MarketDataMessage(
+            type=MarketDataMessageType.delta,
+            ticker=self.ticker,
+            seq=self.seq,
+            prev_seq=self.sent_seq,
+            bid_levels=[
+                Level(price=price, qty=qty)
+                for price, qty in self._bids.items()
+            ],
+            ask_levels=[
+                Level(price=price, qty=qty)
+                for price, qty in self._asks.items()
+            ],
+            trades=[
+                GetTransactionHistoryResponse(
+                    id=trade.id,
+                    ticker=trade.ticker,
+                    amount=trade.qty,
+                    price=trade.price,
+                    timestamp=trade.timestamp,
+                )
+                for trade in self._trades
+            ],
+            missed_trades=self.missed_trades,
+        )
+        self.sent_seq = self.seq
+        self.missed_trades = 0
+        self._bids.clear()
+        self._asks.clear()
+        self._trades.clear()
+        self._ready.clear()
+        return message
@@ -0,0 +1,113 @@
+from aio_pika.abc import AbstractIncomingMessage
+
+from application.broker.client import RabbitMQClient
+from application.config import MARKET_DATA_EXCHANGE, TRADE_TAPE_SIZE
+from application.database.backend import (
+    InstrumentRepository,
+    OrderRepository,
+    TransactionRepository,
+    session_factory,
+)
+from application.logger import setup_logging
+from application.market_data.events import Levels, MarketDataEvent
+from application.market_data.registry import TickerStateRegistry
+from application.market_data.snapshot import L2SnapshotRegistry
+from application.market_data.tape import TradeTapeRegistry
+from application.models.database_models.order import OrderDirection
+from application.models.database_models.transaction import Transaction
+from application.reference_data import reference_data
+
+logger = setup_logging(__name__)
+
+order_book_snapshots = L2SnapshotRegistry()
+trade_tapes = TradeTapeRegistry(TRADE_TAPE_SIZE)
+registries: tuple[TickerStateRegistry, ...] = (
+    order_book_snapshots,
+    trade_tapes,
+)
+
+
+async def instrument_exists(ticker: str) -> bool:
+    """
+    Проверяет тикер по справочным данным или в отдельной сессии.
+    """
+    async with session_factory() as session:
+        return await reference_data.ticker_exists(
+            ticker, InstrumentRepository(db_session=session)
+        )
+
+
+def discard_ticker(ticker: str) -> None:
+    for registry in registries:
+        registry.discard(ticker)
+
+
+def retain_tickers(tickers: frozenset[str]) -> None:
+    for registry in registries:
+        registry.retain(tickers)
+
+
+# Состояния удаленных инструментов не хранятся
+reference_data.on_reload(retain_tickers)
+
+
+async def load_levels(ticker: str) -> tuple[Levels, Levels]:
+    """
+    Загружает уровни стакана из базы в отдельной сессии.
+    """
+    async with session_factory() as session:
+        order_repository = OrderRepository(db_session=session)
+        bids = await order_repository.get_levels(ticker, OrderDirection.buy)
+        asks = await order_repository.get_levels(ticker, OrderDirection.sell)
+    return bids, asks
+
+
+async def load_trades(ticker: str) -> list[Transaction]:
+    """
+    Загружает последние сделки тикера из базы в отдельной сессии.
+    """
+    async with session_factory() as session:
+        transaction_repository = TransactionRepository(db_session=session)
+        return await transaction_repository.get_latest(ticker, TRADE_TAPE_SIZE)
+
+
+async def handle_market_data(message: AbstractIncomingMessage) -> None:
+    event = MarketDataEvent.model_validate_json(message.body)
+    # Снимки используются только после первого события: консьюмер без
+    # резидентного стакана их не рассылает
+    for registry in registries:
+        registry.active = True
+        registry.apply(event)
+
+
+def reset_snapshots() -> None:
+    logger.warning("Market data connection restored, snapshots reset")
+    for registry in registries:
+        registry.active = False
+        registry.reset()
+
+
+async def consume_market_data() -> None:
+    """
+    Подписывает процесс API на изменения стаканов и сделки
+    от консьюмера. Без RabbitMQ снимки и ленты сделок не используются,
+    стакан и сделки читаются из базы.
+    """
+    rabbit = RabbitMQClient()
+    try:
+        await rabbit.connect()
+    except ConnectionError:
+        logger.warning("Market data is unavailable, order book uses SQL")
+        return
+
+    try:
+        await rabbit.subscribe(
+            MARKET_DATA_EXCHANGE,
+            handle_market_data,
+            on_reconnect=reset_snapshots,
+        )
+    finally:
+        for registry in registries:
+            registry.active = False
+            registry.reset()
+        await rabbit.close()
@@ -0,0 +1,134 @@
+from typing import Iterable
+from uuid import UUID
+
+import numpy as np
+
+from application.market_data.candles import (
+    epoch_microseconds,
+    from_epoch_microseconds,
+)
+from application.market_data.events import MarketDataEvent
+from application.market_data.registry import TickerStateRegistry
+from application.models.database_models.transaction import Transaction
+
+
+class TradeTape:
+    """
+    Последние capacity сделок тикера в кольцевом буфере из параллельных
+    массивов: время (микросекунды от эпохи), цена, количество и id.
+    complete означает, что в буфере вся история сделок тикера.
+    """
+
+    def __init__(
+        self,
+        ticker: str,
+        capacity: int,
+        trades: Iterable[Transaction] = (),
+        complete: bool = False,
+    ):
+        self.ticker = ticker
+        self.capacity = capacity
+        self.complete = complete
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.prices = np.zeros(capacity, dtype=np.int64)
+        self.quantities = np.zeros(capacity, dtype=np.int64)
+        self.ids: list[UUID] = []
+        # Сквозной номер следующей сделки и номера сделок буфера по id
+        self._end = 0
+        self._numbers: dict[UUID, int] = {}
+        self.extend(trades)
+
+    def __len__(self) -> int:
+        return min(self._end, self.capacity)
+
+    def __contains__(self, trade_id: UUID) -> bool:
+        return trade_id in self._numbers
+
+    def extend(self, trades: Iterable[Transaction]) -> None:
+        """
+        Добавляет сделки в порядке времени, пропуская уже известные.
+        """
+        for trade in trades:
+            if trade.id in self._numbers:
+                continue
+            position = self._end % self.capacity
+            if self._end < self.capacity:
+                self.ids.append(trade.id)
+            else:
+                del self._numbers[self.ids[position]]
+                self.ids[position] = trade.id
+                self.complete = False
+            self.timestamps[position] = epoch_microseconds(trade.timestamp)
+            self.prices[position] = trade.price
+            self.quantities[position] = trade.qty
+            self._numbers[trade.id] = self._end
+            self._end += 1
+
+    def latest(
+        self, limit: int, before: UUID | None = None
+    ) -> list[Transaction] | None:
+        """
+        До limit сделок от новых к старым (limit <= 0 - все), начиная
+        после сделки before. None, если буфера для ответа недостаточно.
+        """
+        skip = 0
+        if before is not None:
+            number = self._numbers.get(before)
+            if number is None:
+                return None
+            skip = self._end - number
+
+        available = len(self) - skip
+        if limit <= 0 or limit > available:
+            if not self.complete:
+                return None
+            limit = available
+        if limit == 0:
+            return []
+
+        last = self._end - 1 - skip
+        positions = [
+            (last - offset) % self.capacity for offset in range(limit)
+        ]
+        index = np.array(positions)
+        return [
+            Transaction(
+                id=self.ids[position],
+                ticker=self.ticker,
+                qty=qty,
+                price=price,
+                timestamp=from_epoch_microseconds(timestamp),
+            )
+            for position, timestamp, price, qty in zip(
+                positions,
+                self.timestamps[index].tolist(),
+                self.prices[index].tolist(),
+                self.quantities[index].tolist(),
+                strict=True,
+            )
+        ]
+
+
+class TradeTapeRegistry(TickerStateRegistry[TradeTape, list[Transaction]]):
+    """
+    Ленты последних сделок тикеров процесса API. Лента загружается
+    из базы при первом запросе (loader возвращает сделки от новых
+    к старым) и пополняется сделками из событий консьюмера.
+    """
+
+    def __init__(self, capacity: int):
+        super().__init__()
+        self.capacity = capacity
+
+    def _create(self, ticker: str, loaded: list[Transaction]) -> TradeTape:
+        return TradeTape(
+            ticker,
+            self.capacity,
+            reversed(loaded),
+            complete=len(loaded) < self.capacity,
+        )
+
+    def _apply(self, event: MarketDataEvent) -> None:
+        tape = self._states.get(event.ticker)
+        if tape is not None and event.trades:
+            tape.extend(event.trades)
@@ -0,0 +1,73 @@
+from typing import Iterable, NamedTuple
+from uuid import UUID
+
+from application.models.database_models.order import OrderDirection
+
+
+class MakerOrder(NamedTuple):
+    order_id: UUID
+    user_id: UUID
+    price: int
+    qty: int
+    filled: int
+
+
+class Fill(NamedTuple):
+    maker_id: UUID
+    maker_user_id: UUID
+    price: int
+    qty: int
+    maker_filled: int
+    maker_executed: bool
+
+
+def match(
+    direction: OrderDirection,
+    price: int | None,
+    qty: int,
+    makers: Iterable[MakerOrder],
+) -> list[Fill]:
+    """
+    Исполняет ордер direction/price/qty против встречных ордеров makers,
+    отсортированных по приоритету исполнения. Сделки проходят по цене
+    встречного ордера; для рыночного ордера (price is None) цена
+    не ограничивается. Не обращается к базе и не меняет makers.
+    """
+    fills: list[Fill] = []
+    # Локальные ссылки и Fill._make заметно ускоряют горячий цикл
+    append = fills.append
+    new_fill = Fill._make
+    need = qty
+    is_buy = direction == OrderDirection.buy
+    for (
+        maker_id,
+        maker_user_id,
+        maker_price,
+        maker_qty,
+        maker_filled,
+    ) in makers:
+        if need <= 0:
+            break
+        if price is not None and (
+            maker_price > price if is_buy else maker_price < price
+        ):
+            break
+        available = maker_qty - maker_filled
+        if available <= 0:
+            continue
+        ticker_filled = need if need < available else available
+        need -= ticker_filled
+        maker_filled += ticker_filled
+        append(
+            new_fill(
+                (
+                    maker_id,
+                    maker_user_id,
+                    maker_price,
+                    ticker_filled,
+                    maker_filled,
+                    maker_filled >= maker_qty,
+                )
+            )
+        )
+    return fills
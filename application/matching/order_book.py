@@ -0,0 +1,280 @@
+from bisect import bisect_left, insort
+from datetime import datetime
+from operator import attrgetter
+from typing import Iterator
+from uuid import UUID
+
+from application.models.database_models.order import (
+    Order,
+    OrderDirection,
+    OrderStatus,
+    UpdateOrder,
+)
+
+OPEN_STATUSES = (OrderStatus.new, OrderStatus.partially_executed)
+
+
+class BookEntry:
+    __slots__ = ("order_id", "price", "qty", "filled", "timestamp")
+
+    def __init__(
+        self,
+        order_id: UUID,
+        price: int,
+        qty: int,
+        filled: int,
+        timestamp: datetime,
+    ):
+        self.order_id = order_id
+        self.price = price
+        self.qty = qty
+        self.filled = filled
+        self.timestamp = timestamp
+
+    @property
+    def remaining(self) -> int:
+        return self.qty - self.filled
+
+
+class BookSide:
+    """
+    Одна сторона стакана: ценовые уровни с FIFO-очередью ордеров на каждом.
+    Цены хранятся в отсортированном списке ключей приоритета
+    (для bid ключ - отрицательная цена), поэтому лучший уровень всегда первый.
+    """
+
+    def __init__(self, direction: OrderDirection):
+        self.direction = direction
+        self._sign = -1 if direction == OrderDirection.buy else 1
+        self._keys: list[int] = []
+        self._levels: dict[int, dict[UUID, BookEntry]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[BookEntry]:
+        """
+        Ордера стороны в порядке приоритета исполнения.
+        """
+        for key in self._keys:
+            yield from self._levels[self._sign * key].values()
+
+    def levels(self) -> Iterator[tuple[int, int]]:
+        """
+        Агрегированные уровни (цена, остаток) в порядке приоритета.
+        """
+        for key in self._keys:
+            price = self._sign * key
+            yield price, self.level_qty(price)
+
+    def level_qty(self, price: int) -> int:
+        level = self._levels.get(price)
+        if level is None:
+            return 0
+        return sum(entry.remaining for entry in level.values())
+
+    def add(self, entry: BookEntry) -> None:
+        level = self._levels.get(entry.price)
+        if level is None:
+            level = self._levels[entry.price] = {}
+            insort(self._keys, self._sign * entry.price)
+        level[entry.order_id] = entry
+
+    def remove(self, entry: BookEntry) -> None:
+        level = self._levels[entry.price]
+        del level[entry.order_id]
+        if not level:
+            del self._levels[entry.price]
+            key = self._sign * entry.price
+            del self._keys[bisect_left(self._keys, key)]
+
+    def crossing(self, price: int | None, qty: int) -> list[BookEntry]:
+        """
+        Возвращает ордера, пересекающиеся с ценой price, в порядке
+        приоритета (цена, время), пока их остаток не покроет qty.
+        Для рыночного ордера (price is None) цена не ограничивается.
+        """
+        result = []
+        need = qty
+        for key in self._keys:
+            level_price = self._sign * key
+            if price is not None and self._sign * (level_price - price) > 0:
+                break
+            for entry in self._levels[level_price].values():
+                result.append(entry)
+                need -= entry.remaining
+                if need <= 0:
+                    return result
+        return result
+
+
+class OrderBook:
+    """
+    Резидентный стакан лимитных ордеров одного тикера.
+    Хранит только индекс открытых ордеров; источником истины остается
+    таблица orders.
+    """
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self.bids = BookSide(OrderDirection.buy)
+        self.asks = BookSide(OrderDirection.sell)
+        self._entries: dict[UUID, tuple[BookSide, BookEntry]] = {}
+        # Измененные уровни для публикации рыночных данных; новый стакан
+        # публикуется целиком
+        self._changed: set[tuple[BookSide, int]] = set()
+        self.snapshot_pending = True
+
+    def __contains__(self, order_id: UUID) -> bool:
+        return order_id in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def side(self, direction: OrderDirection) -> BookSide:
+        if direction == OrderDirection.buy:
+            return self.bids
+        return self.asks
+
+    def add(self, order: Order) -> None:
+        self.remove(order.id)
+        if (
+            order.price is None
+            or order.status not in OPEN_STATUSES
+            or order.filled >= order.qty
+        ):
+            return
+        side = self.side(OrderDirection(order.direction))
+        entry = BookEntry(
+            order_id=order.id,
+            price=order.price,
+            qty=order.qty,
+            filled=order.filled,
+            timestamp=order.timestamp,
+        )
+        side.add(entry)
+        self._entries[order.id] = (side, entry)
+        self._changed.add((side, entry.price))
+
+    def remove(self, order_id: UUID) -> None:
+        item = self._entries.pop(order_id, None)
+        if item is not None:
+            side, entry = item
+            side.remove(entry)
+            self._changed.add((side, entry.price))
+
+    def fill(
+        self, order_id: UUID, filled: int, status: OrderStatus | None
+    ) -> None:
+        item = self._entries.get(order_id)
+        if item is None:
+            return
+        side, entry = item
+        if status not in OPEN_STATUSES or filled >= entry.qty:
+            self.remove(order_id)
+            return
+        if entry.filled != filled:
+            entry.filled = filled
+            self._changed.add((side, entry.price))
+
+    def crossing(self, current_order: Order) -> list[UUID]:
+        """
+        Возвращает id встречных ордеров, с которыми может быть исполнен
+        current_order, в порядке приоритета исполнения.
+        """
+        if current_order.direction == OrderDirection.sell:
+            side = self.bids
+        else:
+            side = self.asks
+        entries = side.crossing(
+            current_order.price, current_order.qty - current_order.filled
+        )
+        return [entry.order_id for entry in entries]
+
+    def pop_changed_levels(
+        self,
+    ) -> tuple[bool, list[tuple[int, int]], list[tuple[int, int]]]:
+        """
+        Возвращает (полный снимок?, bid, ask): после создания стакана -
+        все уровни, далее - только уровни, измененные с прошлого вызова,
+        с их текущим остатком (0 - уровень исчез).
+        """
+        if self.snapshot_pending:
+            self.snapshot_pending = False
+            self._changed.clear()
+            return True, list(self.bids.levels()), list(self.asks.levels())
+
+        bids: list[tuple[int, int]] = []
+        asks: list[tuple[int, int]] = []
+        for side, price in self._changed:
+            levels = bids if side is self.bids else asks
+            levels.append((price, side.level_qty(price)))
+        self._changed.clear()
+        return False, bids, asks
+
+    def apply(
+        self, current_order: Order, changed_orders: list[UpdateOrder]
+    ) -> None:
+        """
+        Применяет результат обработки ордера к стакану: обновляет
+        исполненные встречные ордера и добавляет остаток текущего ордера.
+        """
+        for order in changed_orders:
+            if order.id == current_order.id:
+                continue
+            if order.filled is None:
+                continue
+            self.fill(order.id, order.filled, order.status)
+        self.add(current_order)
+
+
+class OrderBookRegistry:
+    """
+    Стаканы всех тикеров процесса-консьюмера. Стакан тикера, помеченный
+    как недостоверный, перестраивается из базы при следующем обращении.
+    """
+
+    def __init__(self):
+        self._books: dict[str, OrderBook] = {}
+        self._stale: set[str] = set()
+        self._loaded = False
+
+    def get(self, ticker: str) -> OrderBook | None:
+        """
+        Возвращает стакан тикера или None, если его нужно перестроить.
+        """
+        if ticker in self._stale:
+            return None
+        book = self._books.get(ticker)
+        if book is None:
+            if not self._loaded:
+                return None
+            book = self._books[ticker] = OrderBook(ticker)
+        return book
+
+    def __iter__(self) -> Iterator[OrderBook]:
+        return iter(list(self._books.values()))
+
+    def invalidate(self, ticker: str) -> None:
+        self._stale.add(ticker)
+        self._books.pop(ticker, None)
+
+    def rebuild(self, orders: list[Order], ticker: str | None = None) -> None:
+        """
+        Перестраивает стаканы из списка открытых ордеров. Очередь уровня
+        строится в порядке (timestamp, id), как в запросе встречных
+        ордеров к базе. Если передан ticker, перестраивается только его
+        стакан.
+        """
+        if ticker is None:
+            self._books.clear()
+            self._stale.clear()
+            self._loaded = True
+        else:
+            self._books[ticker] = OrderBook(ticker)
+            self._stale.discard(ticker)
+        for order in sorted(orders, key=attrgetter("timestamp", "id")):
+            book = self._books.get(order.ticker)
+            if book is None:
+                book = self._books[order.ticker] = OrderBook(order.ticker)
+            book.add(order)
@@ -7,13 +7,20 @@ from application.config import POSTGRESQL_URL
 from application.database.engine import Base
 from application.models.orm_models.app_config import AppConfigOrm  # noqa
 from application.models.orm_models.balance import BalanceOrm  # noqa
+from application.models.orm_models.candle import CandleOrm  # noqa
 from application.models.orm_models.instrument import InstrumentOrm  # noqa
-from application.models.orm_models.order import OrderOrm  # noqa
+from application.models.orm_models.order import (  # noqa
+    OrderHistoryOrm,
+    OrderOrm,
+)
 from application.models.orm_models.outbox_message import (  # noqa
     OutboxMessageOrm,
 )
 from application.models.orm_models.transaction import TransactionOrm  # noqa
-from application.models.orm_models.user import UserOrm  # noqa
+from application.models.orm_models.user import (  # noqa
+    UserOrm,
+    UserRevocationOrm,
+)
 
 config = context.config
 
@@ -28,6 +35,16 @@ config.set_main_option(
 target_metadata = Base.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    # Секции таблицы сделок создаются миграцией и архиватором
+    return not (
+        type_ == "table"
+        and reflected
+        and compare_to is None
+        and name.startswith(f"{TransactionOrm.__tablename__}_")
+    )
+
+
 def run_migrations_offline() -> None:
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
@@ -53,6 +70,7 @@ def run_migrations_online() -> None:
             connection=connection,
             target_metadata=target_metadata,
             compare_server_default=True,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
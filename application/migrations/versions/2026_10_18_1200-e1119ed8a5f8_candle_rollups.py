@@ -0,0 +1,51 @@
+"""candle rollups
+
+Revision ID: e1119ed8a5f8
+Revises: 9b41be6fcc6b
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e1119ed8a5f8"
+down_revision: Union[str, None] = "9b41be6fcc6b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Свечи по существующим сделкам заполняет
+    # python -m application.market_data.rebuild_candles
+    op.create_table(
+        "candle",
+        sa.Column("ticker", sa.String(), nullable=False),
+        sa.Column("resolution", sa.Integer(), nullable=False),
+        sa.Column("bucket", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("open", sa.Integer(), nullable=False),
+        sa.Column("high", sa.Integer(), nullable=False),
+        sa.Column("low", sa.Integer(), nullable=False),
+        sa.Column("close", sa.Integer(), nullable=False),
+        sa.Column("volume", sa.BigInteger(), nullable=False),
+        sa.Column(
+            "first_trade_at", sa.DateTime(timezone=True), nullable=False
+        ),
+        sa.Column("last_trade_at", sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["ticker"],
+            ["instrument.ticker"],
+            onupdate="CASCADE",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("ticker", "resolution", "bucket"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("candle")
@@ -0,0 +1,97 @@
+"""hot path indexes
+
+Revision ID: 4c7d2e9a1b36
+Revises: e1119ed8a5f8
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "4c7d2e9a1b36"
+down_revision: Union[str, None] = "e1119ed8a5f8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OPEN_ORDERS = "status IN ('new', 'partially_executed')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY не блокирует запись в таблицы, но не может
+    # выполняться внутри транзакции. Если построение прервалось,
+    # невалидный индекс нужно удалить перед повторным запуском
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_orders_open_asks",
+            "orders",
+            ["ticker", "price", "timestamp", "id"],
+            postgresql_where=sa.text(f"direction = 'sell' AND {OPEN_ORDERS}"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_orders_open_bids",
+            "orders",
+            ["ticker", sa.text("price DESC"), "timestamp", "id"],
+            postgresql_where=sa.text(f"direction = 'buy' AND {OPEN_ORDERS}"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_transaction_ticker_timestamp",
+            "transaction",
+            ["ticker", "timestamp", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # Покрывается ix_transaction_ticker_timestamp
+        op.drop_index(
+            "ix_transaction_ticker",
+            table_name="transaction",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.create_index(
+            "ix_outbox_unsent",
+            "outbox",
+            ["created_at"],
+            postgresql_where=sa.text("NOT is_sent"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_outbox_unsent",
+            table_name="outbox",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_transaction_ticker",
+            "transaction",
+            ["ticker"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_transaction_ticker_timestamp",
+            table_name="transaction",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_orders_open_bids",
+            table_name="orders",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_orders_open_asks",
+            table_name="orders",
+            postgresql_concurrently=True,
+        )
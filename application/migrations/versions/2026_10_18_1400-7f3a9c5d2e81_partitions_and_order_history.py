@@ -0,0 +1,184 @@
+"""partitions and order history
+
+Revision ID: 7f3a9c5d2e81
+Revises: 4c7d2e9a1b36
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import FetchedValue
+
+# revision identifiers, used by Alembic.
+revision: str = "7f3a9c5d2e81"
+down_revision: Union[str, None] = "4c7d2e9a1b36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Секция текущего месяца создается, только если в прежней таблице
+# нет его сделок: иначе они остаются в секции по умолчанию, а месячные
+# секции создает архиватор начиная со следующего месяца
+CREATE_CURRENT_MONTH_PARTITION = """
+DO $$
+DECLARE
+    month_start timestamptz :=
+        date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM transaction_default WHERE timestamp >= month_start
+    ) THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF transaction '
+            'FOR VALUES FROM (%L) TO (%L)',
+            'transaction_' || to_char(month_start AT TIME ZONE 'UTC',
+                                      'YYYY_MM'),
+            month_start,
+            month_start + interval '1 month'
+        );
+    END IF;
+END $$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "orders_history",
+        sa.Column(
+            "id", sa.Uuid(), server_default=FetchedValue(), nullable=False
+        ),
+        sa.Column(
+            "status",
+            postgresql.ENUM(name="orderstatus", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "timestamp",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column(
+            "direction",
+            postgresql.ENUM(name="orderdirection", create_type=False),
+            nullable=False,
+        ),
+        sa.Column("ticker", sa.String(), nullable=False),
+        sa.Column("qty", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Integer(), nullable=True),
+        sa.Column("filled", sa.Integer(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user_id"], ["users.id"], onupdate="CASCADE", ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_orders_history_user_id", "orders_history", ["user_id"])
+
+    # Прежняя таблица сделок без копирования данных становится секцией
+    # по умолчанию. Ее первичный ключ расширяется ключом секционирования,
+    # индексы совпадают с индексами новой таблицы и присоединяются к ним
+    op.rename_table("transaction", "transaction_default")
+    op.drop_constraint(
+        "transaction_pkey", "transaction_default", type_="primary"
+    )
+    op.drop_constraint(
+        "transaction_ticker_fkey", "transaction_default", type_="foreignkey"
+    )
+    op.create_primary_key(
+        "transaction_default_pkey", "transaction_default", ["id", "timestamp"]
+    )
+    op.execute(
+        "ALTER INDEX ix_transaction_ticker_timestamp "
+        "RENAME TO transaction_default_ticker_timestamp_id_idx"
+    )
+    op.create_table(
+        "transaction",
+        sa.Column(
+            "id", sa.Uuid(), server_default=FetchedValue(), nullable=False
+        ),
+        sa.Column("ticker", sa.String(), nullable=False),
+        sa.Column("qty", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Integer(), nullable=False),
+        sa.Column(
+            "timestamp",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(
+            ["ticker"],
+            ["instrument.ticker"],
+            onupdate="CASCADE",
+            ondelete="CASCADE",
+        ),
+        sa.PrimaryKeyConstraint("id", "timestamp"),
+        postgresql_partition_by="RANGE (timestamp)",
+    )
+    op.create_index(
+        "ix_transaction_ticker_timestamp",
+        "transaction",
+        ["ticker", "timestamp", "id"],
+    )
+    op.execute(
+        "ALTER TABLE transaction ATTACH PARTITION transaction_default DEFAULT"
+    )
+    op.execute(CREATE_CURRENT_MONTH_PARTITION)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_orders_finished",
+            "orders",
+            ["timestamp"],
+            postgresql_where=sa.text("status IN ('executed', 'cancelled')"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_orders_finished",
+            table_name="orders",
+            postgresql_concurrently=True,
+        )
+
+    # Сделки месячных секций возвращаются в прежнюю таблицу. Внешний
+    # ключ удаляется вместе с его копиями в секциях и создается заново
+    op.drop_constraint(
+        "transaction_ticker_fkey", "transaction", type_="foreignkey"
+    )
+    op.execute("ALTER TABLE transaction DETACH PARTITION transaction_default")
+    op.execute("INSERT INTO transaction_default SELECT * FROM transaction")
+    op.drop_table("transaction")
+    op.rename_table("transaction_default", "transaction")
+    op.drop_constraint(
+        "transaction_default_pkey", "transaction", type_="primary"
+    )
+    op.create_primary_key("transaction_pkey", "transaction", ["id"])
+    op.execute(
+        "ALTER INDEX transaction_default_ticker_timestamp_id_idx "
+        "RENAME TO ix_transaction_ticker_timestamp"
+    )
+    op.create_foreign_key(
+        "transaction_ticker_fkey",
+        "transaction",
+        "instrument",
+        ["ticker"],
+        ["ticker"],
+        onupdate="CASCADE",
+        ondelete="CASCADE",
+    )
+
+    op.execute(
+        "INSERT INTO orders SELECT * FROM orders_history "
+        "ON CONFLICT (id) DO NOTHING"
+    )
+    op.drop_index("ix_orders_history_user_id", table_name="orders_history")
+    op.drop_table("orders_history")
@@ -0,0 +1,47 @@
+"""user revocation
+
+Revision ID: b5e8d1c4a7f2
+Revises: 7f3a9c5d2e81
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b5e8d1c4a7f2"
+down_revision: Union[str, None] = "7f3a9c5d2e81"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "user_revocation",
+        sa.Column("user_id", sa.Uuid(), nullable=False),
+        sa.Column(
+            "revoked_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("user_id"),
+    )
+    op.create_index(
+        op.f("ix_user_revocation_revoked_at"),
+        "user_revocation",
+        ["revoked_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        op.f("ix_user_revocation_revoked_at"), table_name="user_revocation"
+    )
+    op.drop_table("user_revocation")
@@ -0,0 +1,52 @@
+"""outbox seq
+
+Revision ID: 9d2f6b3e8c14
+Revises: b5e8d1c4a7f2
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9d2f6b3e8c14"
+down_revision: Union[str, None] = "b5e8d1c4a7f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Сообщения одной транзакции имеют общий created_at: seq задает
+    # их порядок. Существующие строки нумеруются при добавлении столбца
+    op.add_column(
+        "outbox",
+        sa.Column(
+            "seq",
+            sa.BigInteger(),
+            sa.Identity(always=True),
+            nullable=False,
+        ),
+    )
+    op.drop_index("ix_outbox_unsent", table_name="outbox")
+    op.create_index(
+        "ix_outbox_unsent",
+        "outbox",
+        ["created_at", "seq"],
+        postgresql_where=sa.text("NOT is_sent"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_outbox_unsent", table_name="outbox")
+    op.create_index(
+        "ix_outbox_unsent",
+        "outbox",
+        ["created_at"],
+        postgresql_where=sa.text("NOT is_sent"),
+    )
+    op.drop_column("outbox", "seq")
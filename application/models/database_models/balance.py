@@ -12,3 +12,15 @@ class Balance(ModelBase):
     ticker: str
     qty: int = Field(ge=0, default=0)
     reserve: int = Field(ge=0, default=0)
+
+
+class BalanceDelta(ModelBase):
+    """
+    Итоговое изменение баланса пользователя по тикеру.
+    Значения могут быть отрицательными.
+    """
+
+    user_id: UUID
+    ticker: str
+    qty: int = 0
+    reserve: int = 0
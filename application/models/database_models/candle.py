@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from application.models.base import ModelBase
+
+
+class Candle(ModelBase):
+    """
+    Свеча тикера за интервал [bucket, bucket + resolution) секунд.
+    Время первой и последней сделки позволяет объединять свечи
+    в любом порядке.
+    """
+
+    ticker: str
+    resolution: int
+    bucket: datetime
+    open: int
+    high: int
+    low: int
+    close: int
+    volume: int
+    first_trade_at: datetime
+    last_trade_at: datetime
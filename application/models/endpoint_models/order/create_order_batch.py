@@ -0,0 +1,24 @@
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+from application.config import ORDER_BATCH_MAX_SIZE
+from application.models.endpoint_models.order.create_order import (
+    CreateOrderRequest,
+)
+
+
+class CreateOrderBatchRequest(BaseModel):
+    orders: list[CreateOrderRequest] = Field(
+        min_length=1, max_length=ORDER_BATCH_MAX_SIZE
+    )
+
+
+class CreateOrderBatchItem(BaseModel):
+    order_id: UUID | None = None
+    error: str | None = None
+
+
+class CreateOrderBatchResponse(BaseModel):
+    success: bool = True
+    orders: list[CreateOrderBatchItem]
@@ -0,0 +1,24 @@
+from enum import StrEnum
+
+from pydantic import BaseModel
+
+from application.models.endpoint_models.public.get_orderbook import Level
+from application.models.endpoint_models.public.get_transaction_history import (
+    GetTransactionHistoryResponse,
+)
+
+
+class MarketDataMessageType(StrEnum):
+    snapshot = "snapshot"
+    delta = "delta"
+
+
+class MarketDataMessage(BaseModel):
+    type: MarketDataMessageType
+    ticker: str
+    seq: int
+    prev_seq: int | None = None
+    bid_levels: list[Level] = []
+    ask_levels: list[Level] = []
+    trades: list[GetTransactionHistoryResponse] = []
+    missed_trades: int = 0
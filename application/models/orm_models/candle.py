@@ -0,0 +1,32 @@
+import datetime
+
+from sqlalchemy import BigInteger, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from application.database.engine import Base
+
+
+class CandleOrm(Base):
+    __tablename__ = "candle"
+
+    ticker: Mapped[str] = mapped_column(
+        ForeignKey(
+            "instrument.ticker", ondelete="CASCADE", onupdate="CASCADE"
+        ),
+        primary_key=True,
+    )
+    resolution: Mapped[int] = mapped_column(primary_key=True)
+    bucket: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True
+    )
+    open: Mapped[int]
+    high: Mapped[int]
+    low: Mapped[int]
+    close: Mapped[int]
+    volume: Mapped[int] = mapped_column(BigInteger)
+    first_trade_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True)
+    )
+    last_trade_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True)
+    )
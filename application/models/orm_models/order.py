@@ -1,7 +1,7 @@
 import datetime
 from uuid import UUID, uuid4
 
-from sqlalchemy import DateTime, ForeignKey, func
+from sqlalchemy import DateTime, ForeignKey, Index, func, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.schema import FetchedValue
 
@@ -13,8 +13,10 @@ from application.models.database_models.order import (
 )
 
 
-class OrderOrm(Base):
-    __tablename__ = "orders"
+class OrderColumns:
+    """
+    Колонки ордера, общие для открытых ордеров и архива.
+    """
 
     id: Mapped[UUID] = mapped_column(
         primary_key=True, default=uuid4, server_default=FetchedValue()
@@ -31,7 +33,55 @@ class OrderOrm(Base):
         nullable=False,
     )
     direction: Mapped[OrderDirection]
-    ticker: Mapped[str] = mapped_column(index=True)
+    ticker: Mapped[str]
     qty: Mapped[int]
     price: Mapped[int | None] = mapped_column(nullable=True)
     filled: Mapped[int] = mapped_column(default=0, server_default="0")
+
+
+class OrderOrm(OrderColumns, Base):
+    """
+    Открытые ордера и завершенные, которые еще не перенесены в архив.
+    """
+
+    __tablename__ = "orders"
+
+    # Открытые ордера сторон стакана в порядке приоритета исполнения
+    # и завершенные ордера в порядке переноса в архив
+    __table_args__ = (
+        Index("ix_orders_ticker", "ticker"),
+        Index(
+            "ix_orders_open_asks",
+            "ticker",
+            "price",
+            "timestamp",
+            "id",
+            postgresql_where=text(
+                "direction = 'sell' "
+                "AND status IN ('new', 'partially_executed')"
+            ),
+        ),
+        Index(
+            "ix_orders_open_bids",
+            "ticker",
+            text("price DESC"),
+            "timestamp",
+            "id",
+            postgresql_where=text(
+                "direction = 'buy' AND status IN ('new', 'partially_executed')"
+            ),
+        ),
+        Index(
+            "ix_orders_finished",
+            "timestamp",
+            postgresql_where=text("status IN ('executed', 'cancelled')"),
+        ),
+    )
+
+
+class OrderHistoryOrm(OrderColumns, Base):
+    """
+    Архив исполненных и отмененных ордеров.
+    """
+
+    __tablename__ = "orders_history"
@@ -1,7 +1,7 @@
 import datetime
 from uuid import UUID, uuid4
 
-from sqlalchemy import FetchedValue, func
+from sqlalchemy import BigInteger, FetchedValue, Identity, Index, func, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from application.database.engine import Base
@@ -15,8 +15,19 @@ class OutboxMessageOrm(Base):
     )
     payload: Mapped[str] = mapped_column(nullable=False)
     created_at: Mapped[datetime.datetime] = mapped_column(
-        default=datetime.datetime.now(), server_default=func.now()
+        server_default=func.now()
     )
+    # Порядок сообщений одной транзакции, у которых общий created_at
+    seq: Mapped[int] = mapped_column(BigInteger, Identity(always=True))
     is_sent: Mapped[bool] = mapped_column(
         default=False, server_default="False"
     )
+
+    __table_args__ = (
+        Index(
+            "ix_outbox_unsent",
+            "created_at",
+            "seq",
+            postgresql_where=text("NOT is_sent"),
+        ),
+    )
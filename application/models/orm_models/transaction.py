@@ -1,7 +1,7 @@
 import datetime
 from uuid import UUID, uuid4
 
-from sqlalchemy import DateTime, ForeignKey, func
+from sqlalchemy import DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.schema import FetchedValue
 
@@ -10,22 +10,30 @@ from application.database.engine import Base
 
 
 class TransactionOrm(Base):
+    """
+    Сделки, секционированные по месяцам времени сделки. Первичный ключ
+    секционированной таблицы обязан содержать ключ секционирования.
+    """
+
     __tablename__ = "transaction"
 
     id: Mapped[UUID] = mapped_column(
         primary_key=True, default=uuid4, server_default=FetchedValue()
     )
     ticker: Mapped[str] = mapped_column(
-        ForeignKey(
-            "instrument.ticker", ondelete="CASCADE", onupdate="CASCADE"
-        ),
-        index=True,
+        ForeignKey("instrument.ticker", ondelete="CASCADE", onupdate="CASCADE")
     )
     qty: Mapped[int]
     price: Mapped[int]
     timestamp: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True),
+        primary_key=True,
         default=timestamp_utc,
         server_default=func.now(),
         nullable=False,
     )
+
+    __table_args__ = (
+        Index("ix_transaction_ticker_timestamp", "ticker", "timestamp", "id"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
@@ -1,8 +1,11 @@
+import datetime
 from uuid import UUID, uuid4
 
+from sqlalchemy import DateTime, func
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.schema import FetchedValue
 
+from application.config import timestamp_utc
 from application.database.engine import Base
 
 
@@ -15,3 +18,21 @@ class UserOrm(Base):
     name: Mapped[str] = mapped_column(unique=True)
     role: Mapped[str] = mapped_column(default="USER", server_default="USER")
     api_key: Mapped[str] = mapped_column(unique=True)
+
+
+class UserRevocationOrm(Base):
+    """
+    Пользователи, чьи токены выданы до удаления или смены роли
+    и не должны проверяться только по подписи.
+    """
+
+    __tablename__ = "user_revocation"
+
+    user_id: Mapped[UUID] = mapped_column(primary_key=True)
+    revoked_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=timestamp_utc,
+        server_default=func.now(),
+        nullable=False,
+        index=True,
+    )
@@ -3,18 +3,17 @@ from uuid import UUID
 
 from pydantic import BaseModel
 
-from application.database.repository.app_config_repository import (
-    AppConfigRepository,
-)
-from application.database.repository.balance_repository import (
-    BalanceRepository,
-)
-from application.database.repository.order_repository import OrderRepository
-from application.database.repository.transaction_repository import (
-    TransactionRepository,
+from application.database.backend import (
+    AppConfigRepositoryProtocol,
+    BalanceRepositoryProtocol,
+    LockManagerProtocol,
+    OrderRepositoryProtocol,
+    TransactionRepositoryProtocol,
 )
 from application.logger import setup_logging
-from application.models.database_models.balance import Balance
+from application.matching.kernel import Fill, MakerOrder, match
+from application.matching.order_book import OrderBook, OrderBookRegistry
+from application.models.database_models.balance import BalanceDelta
 from application.models.database_models.order import (
     Order,
     OrderDirection,
@@ -23,14 +22,17 @@ from application.models.database_models.order import (
 )
 from application.models.database_models.transaction import Transaction
 from application.models.orm_models.user import UserOrm  # noqa
+from application.reference_data import reference_data
 
 logger = setup_logging(__name__)
 
 
 class OrderProcessingResult(BaseModel):
     changed_orders: list[UpdateOrder] = field(default_factory=list)
-    deposit_balances: list[Balance] = field(default_factory=list)
-    withdraw_balances: list[Balance] = field(default_factory=list)
+    # Итоговые изменения (qty, reserve) по паре (user_id, ticker)
+    balance_totals: dict[tuple[UUID, str], list[int]] = field(
+        default_factory=dict
+    )
     transactions: list[Transaction] = field(default_factory=list)
     ticker_count: int = 0
     final_cost: int = 0
@@ -40,19 +42,21 @@ class OrderProcessingResult(BaseModel):
     def add_order(self, order: UpdateOrder):
         self.changed_orders.append(order)
 
-    def add_deposit_balance(self, balance: Balance):
-        self.deposit_balances.append(balance)
-
-    def add_withdraw_balance(self, balance: Balance):
-        self.withdraw_balances.append(balance)
+    def add_balance(
+        self, user_id: UUID, ticker: str, qty: int = 0, reserve: int = 0
+    ):
+        total = self.balance_totals.get((user_id, ticker))
+        if total is None:
+            total = self.balance_totals[(user_id, ticker)] = [0, 0]
+        total[0] += qty
+        total[1] += reserve
 
     def add_transaction(self, transaction: Transaction):
         self.transactions.append(transaction)
 
     def clear_all(self):
         self.changed_orders.clear()
-        self.deposit_balances.clear()
-        self.withdraw_balances.clear()
+        self.balance_totals.clear()
         self.transactions.clear()
 
 
@@ -60,199 +64,147 @@ class OrderFinalResult(BaseModel):
     status_code: int = 200
     order_id: UUID
     detail: str | None = None
+    transactions: list[Transaction] = []
+
+
+async def get_order_book(
+    order_books: OrderBookRegistry,
+    ticker: str,
+    order_repository: OrderRepositoryProtocol,
+) -> OrderBook:
+    """
+    Возвращает резидентный стакан тикера, при необходимости
+    перестраивая его из базы. Вызывается под блокировкой тикера.
+    """
+    order_book = order_books.get(ticker)
+    if order_book is None:
+        orders = await order_repository.get_open_limit_orders(ticker)
+        order_books.rebuild(orders, ticker)
+        order_book = order_books.get(ticker)
+        assert order_book is not None
+        logger.info(f"Order book {ticker} rebuilt: {len(order_book)} orders")
+    return order_book
+
+
+async def get_matching_orders_from_book(
+    current_order: Order,
+    order_repository: OrderRepositoryProtocol,
+    order_book: OrderBook,
+) -> list[Order]:
+    """
+    Берет из стакана встречные ордера, покрывающие текущий ордер,
+    и перечитывает из базы только их. Ордера, которые в базе уже закрыты,
+    удаляются из стакана, после чего выборка повторяется.
+    """
+    while True:
+        order_ids = order_book.crossing(current_order)
+        orders = await order_repository.get_open_by_ids(order_ids)
+        if len(orders) == len(order_ids):
+            break
+        found = {order.id for order in orders}
+        for order_id in order_ids:
+            if order_id not in found:
+                order_book.remove(order_id)
+
+    for order in orders:
+        order_book.fill(order.id, order.filled, order.status)
+    position = {order_id: index for index, order_id in enumerate(order_ids)}
+    return sorted(orders, key=lambda order: position[order.id])
 
 
 async def get_matching_orders(
-    current_order: Order, order_repository: OrderRepository
+    current_order: Order,
+    order_repository: OrderRepositoryProtocol,
+    order_book: OrderBook | None = None,
 ) -> list[Order]:
     """
     Возвращает список ордеров, которые соответствуют текущему
     ордеру по тикеру и количеству.
     """
-    if current_order.direction == OrderDirection.sell:
-        return await order_repository.get_by_ticker(
-            current_order.ticker,
-            current_order.qty,
-            OrderDirection.buy,
+    if order_book is not None:
+        return await get_matching_orders_from_book(
+            current_order, order_repository, order_book
         )
-    return await order_repository.get_by_ticker(
-        current_order.ticker,
-        current_order.qty,
-        OrderDirection.sell,
+    if current_order.direction == OrderDirection.sell:
+        direction = OrderDirection.buy
+    else:
+        direction = OrderDirection.sell
+    return await order_repository.get_crossing_orders(
+        ticker=current_order.ticker,
+        direction=direction,
+        qty=current_order.qty - current_order.filled,
+        price=current_order.price,
     )
 
 
-async def update_result(
+def update_result(
     current_order: Order,
-    matching_order: Order,
-    ticker_filled: int,
-    ticker_price: int,
+    fill: Fill,
     base_asset: str,
     result: OrderProcessingResult,
 ) -> OrderProcessingResult:
     """
-    Обновляет результат обработки ордера, добавляя информацию о сделке,
-    измененных балансах и транзакциях.
+    Сворачивает сделку в итоговые изменения балансов участников
+    и добавляет в результат обновление встречного ордера и транзакцию.
     """
-    assert matching_order.price is not None
-    if current_order.price is not None:
-        difference = abs(current_order.price - matching_order.price)
-        if matching_order.price < current_order.price:
-            result.add_deposit_balance(
-                Balance(
-                    user_id=current_order.user_id,
-                    ticker=base_asset,
-                    qty=difference * ticker_filled,
-                )
-            )
-            result.add_withdraw_balance(
-                Balance(
-                    user_id=current_order.user_id,
-                    ticker=base_asset,
-                    reserve=difference * ticker_filled,
-                )
-            )
-
+    ticker_filled = fill.qty
+    cost = fill.price * ticker_filled
+    add_balance = result.add_balance
     if current_order.direction == OrderDirection.sell:
-        deposit_qty = ticker_filled
-        withdraw_qty = ticker_filled * ticker_price
-        deposit_ticker = matching_order.ticker
-        withdraw_ticker = base_asset
-        result.add_deposit_balance(
-            Balance(
-                user_id=matching_order.user_id,
-                ticker=deposit_ticker,
-                qty=deposit_qty,
-            )
+        add_balance(
+            fill.maker_user_id, current_order.ticker, qty=ticker_filled
         )
-        result.add_withdraw_balance(
-            Balance(
-                user_id=matching_order.user_id,
-                ticker=withdraw_ticker,
-                reserve=withdraw_qty,
-            )
+        add_balance(fill.maker_user_id, base_asset, reserve=-cost)
+        add_balance(current_order.user_id, base_asset, qty=cost)
+        add_balance(
+            current_order.user_id, current_order.ticker, reserve=-ticker_filled
         )
-
     else:
-        deposit_qty = ticker_filled * ticker_price
-        withdraw_qty = ticker_filled
-        deposit_ticker = base_asset
-        withdraw_ticker = matching_order.ticker
-        result.add_deposit_balance(
-            Balance(
-                user_id=matching_order.user_id,
-                ticker=deposit_ticker,
-                qty=deposit_qty,
-            )
-        )
-        result.add_withdraw_balance(
-            Balance(
-                user_id=matching_order.user_id,
-                ticker=withdraw_ticker,
-                reserve=withdraw_qty,
-            )
+        add_balance(fill.maker_user_id, base_asset, qty=cost)
+        add_balance(
+            fill.maker_user_id, current_order.ticker, reserve=-ticker_filled
         )
-    result.add_deposit_balance(
-        Balance(
-            user_id=current_order.user_id,
-            ticker=withdraw_ticker,
-            qty=withdraw_qty,
+        add_balance(
+            current_order.user_id, current_order.ticker, qty=ticker_filled
         )
-    )
-    if (
-        current_order.price is None
-        and current_order.direction != OrderDirection.sell
-    ):
-        result.add_withdraw_balance(
-            Balance(
-                user_id=current_order.user_id,
-                ticker=deposit_ticker,
-                qty=deposit_qty,
-            )
-        )
-    else:
-        result.add_withdraw_balance(
-            Balance(
-                user_id=current_order.user_id,
-                ticker=deposit_ticker,
-                reserve=deposit_qty,
+        if current_order.price is None:
+            add_balance(current_order.user_id, base_asset, qty=-cost)
+        else:
+            # Разница с лимитной ценой возвращается из резерва на баланс
+            improvement = (current_order.price - fill.price) * ticker_filled
+            add_balance(
+                current_order.user_id,
+                base_asset,
+                qty=improvement,
+                reserve=-improvement - cost,
             )
-        )
 
     result.add_order(
         UpdateOrder(
-            id=matching_order.id,
-            status=matching_order.status,
-            filled=matching_order.filled,
+            id=fill.maker_id,
+            status=(
+                OrderStatus.executed
+                if fill.maker_executed
+                else OrderStatus.partially_executed
+            ),
+            filled=fill.maker_filled,
         )
     )
     result.add_transaction(
         Transaction(
-            ticker=matching_order.ticker,
+            ticker=current_order.ticker,
             qty=ticker_filled,
-            price=ticker_price,
+            price=fill.price,
             timestamp=current_order.timestamp,
         )
     )
     result.ticker_count += ticker_filled
-    result.final_cost += ticker_price * ticker_filled
+    result.final_cost += cost
 
     return result
 
 
-async def calculate_order_fill(
-    current_order: Order,
-    matching_order: Order,
-    filled_so_far: int,
-    base_asset: str,
-    result: OrderProcessingResult,
-) -> OrderProcessingResult:
-    """
-    Вычисляет, сколько тикеров может быть заполнено в текущем ордере,
-    и обновляет статусы ордеров.
-    """
-    need = current_order.qty - filled_so_far
-    available = matching_order.qty - matching_order.filled
-    assert matching_order.price is not None
-    if current_order.price is None:
-        if need >= available:
-            ticker_filled = available
-            matching_order.filled = matching_order.qty
-            matching_order.status = OrderStatus.executed
-        else:
-            ticker_filled = need
-            matching_order.filled += ticker_filled
-            matching_order.status = OrderStatus.partially_executed
-            current_order.status = OrderStatus.executed
-        ticker_price = matching_order.price
-    else:
-        if (
-            current_order.direction == OrderDirection.sell
-            and current_order.price > matching_order.price
-        ) or (
-            current_order.direction == OrderDirection.buy
-            and current_order.price < matching_order.price
-        ):
-            return result
-        ticker_filled = min(need, available)
-        ticker_price = matching_order.price
-        matching_order.filled += ticker_filled
-        if matching_order.filled < matching_order.qty:
-            matching_order.status = OrderStatus.partially_executed
-        else:
-            matching_order.status = OrderStatus.executed
-
-    return await update_result(
-        current_order=current_order,
-        matching_order=matching_order,
-        ticker_filled=ticker_filled,
-        ticker_price=ticker_price,
-        base_asset=base_asset,
-        result=result,
-    )
-
-
-async def update_current_order_status(
+def update_current_order_status(
     current_order: Order, ticker_count: int
 ) -> UpdateOrder:
     """
@@ -281,7 +233,7 @@ async def update_current_order_status(
     )
 
 
-async def processing_cancelled_order(
+def processing_cancelled_order(
     updated_current_order: UpdateOrder,
     result: OrderProcessingResult,
 ):
@@ -294,48 +246,44 @@ async def processing_cancelled_order(
     result.status_code = 400
     result.detail = "Order cant execute"
     if updated_current_order.direction == OrderDirection.sell:
-        result.add_deposit_balance(
-            Balance(
-                user_id=updated_current_order.user_id,
-                ticker=updated_current_order.ticker,
-                qty=updated_current_order.qty,
-            )
-        )
-        result.add_withdraw_balance(
-            Balance(
-                user_id=updated_current_order.user_id,
-                ticker=updated_current_order.ticker,
-                reserve=updated_current_order.qty,
-            )
-        )
+        user_id = updated_current_order.user_id
+        ticker = updated_current_order.ticker
+        qty = updated_current_order.qty
+        assert user_id is not None and ticker is not None and qty is not None
+        result.add_balance(user_id, ticker, qty=qty, reserve=-qty)
     return result
 
 
-async def processing_orders(
+def processing_orders(
     current_order: Order, matching_orders: list[Order], base_asset: str
 ) -> OrderProcessingResult:
     """
     Основная функция обработки списка ордеров.
-    Последовательно обрабатывает каждый ордер из списка matching_orders.
+    Исполняет ордер ядром сопоставления и переводит полученные сделки
+    в изменения ордеров, балансов и транзакции.
     """
-    result = OrderProcessingResult()
-    for order in matching_orders:
-        if result.ticker_count >= current_order.qty:
-            break
+    fills = match(
+        direction=OrderDirection(current_order.direction),
+        price=current_order.price,
+        qty=current_order.qty,
+        makers=[
+            MakerOrder(
+                order.id, order.user_id, order.price, order.qty, order.filled
+            )
+            for order in matching_orders
+            if order.price is not None
+        ],
+    )
 
-        await calculate_order_fill(
-            current_order=current_order,
-            matching_order=order,
-            filled_so_far=result.ticker_count,
-            base_asset=base_asset,
-            result=result,
-        )
+    result = OrderProcessingResult()
+    for fill in fills:
+        update_result(current_order, fill, base_asset, result)
 
-    updated_current_order = await update_current_order_status(
+    updated_current_order = update_current_order_status(
         current_order, result.ticker_count
     )
     if current_order.status == OrderStatus.cancelled:
-        result = await processing_cancelled_order(
+        result = processing_cancelled_order(
             updated_current_order=updated_current_order, result=result
         )
     elif current_order.filled > 0:
@@ -344,34 +292,48 @@ async def processing_orders(
     return result
 
 
+def net_balance_deltas(
+    balance_totals: dict[tuple[UUID, str], list[int]],
+) -> list[BalanceDelta]:
+    """
+    Строит по одному изменению баланса на пару (user_id, ticker)
+    из итогов, накопленных по всем сделкам ордера.
+    Пары с нулевым итогом отбрасываются.
+    """
+    return [
+        BalanceDelta(user_id=user_id, ticker=ticker, qty=qty, reserve=reserve)
+        for (user_id, ticker), (qty, reserve) in sorted(balance_totals.items())
+        if qty or reserve
+    ]
+
+
 async def update_orders(
-    orders: list[UpdateOrder], order_repository: OrderRepository
+    orders: list[UpdateOrder], order_repository: OrderRepositoryProtocol
 ) -> None:
     await order_repository.bulk_update(orders)
 
 
 async def update_balances(
     result: OrderProcessingResult,
-    balance_repository: BalanceRepository,
+    balance_repository: BalanceRepositoryProtocol,
 ) -> None:
-    await balance_repository.bulk_adjust(
-        deposit_balances=result.deposit_balances,
-        withdraw_balances=result.withdraw_balances,
-    )
+    deltas = net_balance_deltas(result.balance_totals)
+    await balance_repository.bulk_adjust(deltas)
+    logger.info(f"Balance deltas: {deltas}")
 
 
 async def create_transactions(
     transactions: list[Transaction],
-    transaction_repository: TransactionRepository,
+    transaction_repository: TransactionRepositoryProtocol,
 ) -> None:
     await transaction_repository.bulk_create(transactions)
 
 
 async def process_order_fill(
     result: OrderProcessingResult,
-    order_repository: OrderRepository,
-    transaction_repository: TransactionRepository,
-    balance_repository: BalanceRepository,
+    order_repository: OrderRepositoryProtocol,
+    transaction_repository: TransactionRepositoryProtocol,
+    balance_repository: BalanceRepositoryProtocol,
 ) -> None:
     """
     Применяет все изменения: обновляет ордера и балансы, создает транзакции.
@@ -383,17 +345,15 @@ async def process_order_fill(
     if result.transactions:
         await create_transactions(result.transactions, transaction_repository)
         logger.info(f"Create transactions: {result.transactions}")
-    if result.deposit_balances:
+    if result.balance_totals:
         await update_balances(result, balance_repository)
-        logger.info(f"Deposit balances: {result.deposit_balances}")
-        logger.info(f"Withdraw balances: {result.withdraw_balances}")
 
 
 async def accept_or_deny_operation(
     current_order: Order,
     base_asset: str,
     result: OrderProcessingResult,
-    balance_repository: BalanceRepository,
+    balance_repository: BalanceRepositoryProtocol,
 ) -> OrderProcessingResult:
     """
     Проверяет, достаточно ли средств для выполнения ордера,
@@ -422,109 +382,90 @@ async def accept_or_deny_operation(
 async def check_and_reserve_balance(
     current_order: Order,
     base_asset: str,
-    balance_repository: BalanceRepository,
+    balance_repository: BalanceRepositoryProtocol,
 ) -> OrderFinalResult | None:
     """
-    Проверяет баланс пользователя и резервирует средства для ордера.
-    Возвращает ошибку, если средств недостаточно.
+    Резервирует средства для ордера одним условным UPDATE.
+    Возвращает ошибку, если баланса нет или средств недостаточно.
     """
-    user_base_asset_balance = (
-        await balance_repository.get_balance_by_user_id_and_ticker(
-            current_order.user_id, base_asset
+    if current_order.direction == OrderDirection.sell:
+        ticker = current_order.ticker
+        amount = current_order.qty
+    elif current_order.price is not None:
+        ticker = base_asset
+        amount = current_order.price * current_order.qty
+    else:
+        ticker = base_asset
+        amount = None
+
+    if amount is not None:
+        reserved = await balance_repository.reserve_if_available(
+            current_order.user_id, ticker, amount
         )
+        if reserved is not None:
+            return None
+
+    user_balance = await balance_repository.get_balance_by_user_id_and_ticker(
+        current_order.user_id, ticker
     )
-    user_current_ticker_balance = (
-        await balance_repository.get_balance_by_user_id_and_ticker(
-            current_order.user_id, current_order.ticker
+    if user_balance is None:
+        return OrderFinalResult(
+            status_code=400,
+            order_id=current_order.id,
+            detail=f"{ticker} отсутствует на балансе",
         )
-    )
-    if current_order.direction == OrderDirection.sell:
-        if user_current_ticker_balance is None:
-            return OrderFinalResult(
-                status_code=400,
-                order_id=current_order.id,
-                detail=f"{current_order.ticker} отсутствует на балансе",
-            )
-        elif user_current_ticker_balance.qty < current_order.qty:
-            return OrderFinalResult(
-                status_code=400,
-                order_id=current_order.id,
-                detail=f"Недостаточно {user_current_ticker_balance.ticker} на балансе",  # noqa
-            )
-        await balance_repository.reserve(
-            Balance(
-                user_id=current_order.user_id,
-                ticker=current_order.ticker,
-                reserve=current_order.qty,
-            )
+    if amount is not None:
+        return OrderFinalResult(
+            status_code=400,
+            order_id=current_order.id,
+            detail=f"Недостаточно {ticker} на балансе",
         )
-    else:
-        if user_base_asset_balance is None:
-            return OrderFinalResult(
-                status_code=400,
-                order_id=current_order.id,
-                detail=f"{base_asset} отсутствует на балансе",
-            )
-        elif current_order.price is not None:
-            if (
-                user_base_asset_balance.qty
-                < current_order.price * current_order.qty
-            ):
-                return OrderFinalResult(
-                    status_code=400,
-                    order_id=current_order.id,
-                    detail=f"Недостаточно {user_base_asset_balance.ticker} на балансе",  # noqa
-                )
-            await balance_repository.reserve(
-                Balance(
-                    user_id=current_order.user_id,
-                    ticker=user_base_asset_balance.ticker,
-                    reserve=current_order.price * current_order.qty,
-                )
-            )
-
     return None
 
 
-async def process_order(
+async def execute_order(
     current_order: Order,
-    balance_repository: BalanceRepository,
-    order_repository: OrderRepository,
-    transaction_repository: TransactionRepository,
-    app_config_repository: AppConfigRepository,
+    base_asset: str,
+    balance_repository: BalanceRepositoryProtocol,
+    order_repository: OrderRepositoryProtocol,
+    transaction_repository: TransactionRepositoryProtocol,
+    order_books: OrderBookRegistry | None = None,
 ) -> OrderFinalResult:
     """
-    Основная функция обработки ордера:
-    1. Блокирует ресурсы
-    2. Проверяет и резервирует баланс
-    3. Находит совпадающие ордера
-    4. Обрабатывает сделки
-    5. Применяет изменения
-    6. Разблокирует ресурсы
+    Обрабатывает ордер под уже взятой блокировкой тикера:
+    1. Проверяет и резервирует баланс
+    2. Находит совпадающие ордера
+    3. Обрабатывает сделки
+    4. Применяет изменения
+    Повторно доставленный ордер, который уже исполнен или отменен,
+    пропускается без резервирования.
     """
-    logger.info(f"New order received: {current_order}")
-    order_lock_id = await order_repository.advisory_lock_by_ticker(
-        current_order.ticker
-    )
-    logger.info(
-        f"Order repository obtained advisory lock {order_lock_id}"
-        f" by ticker {current_order.ticker}"
-    )
-    balance_lock_id = await balance_repository.advisory_lock_by_ticker(
-        current_order.ticker
-    )
-    logger.info(
-        f"Balance repository obtained advisory lock {balance_lock_id}"
-        f" by ticker {current_order.ticker}"
-    )
+    stored_order = await order_repository.get_by_id(current_order.id)
+    if stored_order is not None and stored_order.status != OrderStatus.new:
+        logger.info(
+            f"Order {current_order.id} is skipped, "
+            f"status: {stored_order.status}"
+        )
+        return OrderFinalResult(
+            status_code=409,
+            order_id=current_order.id,
+            detail="Order already processed",
+        )
+
+    order_book = None
+    if order_books is not None:
+        order_book = await get_order_book(
+            order_books, current_order.ticker, order_repository
+        )
 
-    base_asset = await app_config_repository.get("base_asset") or "RUB"
     not_enough_balance = await check_and_reserve_balance(
         current_order=current_order,
         base_asset=base_asset,
         balance_repository=balance_repository,
     )
     if not_enough_balance:
+        if order_book is not None:
+            order_book.remove(current_order.id)
         return not_enough_balance
 
     try:
@@ -533,10 +474,10 @@ async def process_order(
         logger.info(f"Process order has started: {current_order}")
 
         matching_orders = await get_matching_orders(
-            current_order, order_repository
+            current_order, order_repository, order_book
         )
 
-        processing_result = await processing_orders(
+        processing_result = processing_orders(
             current_order, matching_orders, base_asset
         )
         logger.info(f"Result of processing: {processing_result}")
@@ -558,10 +499,13 @@ async def process_order(
             transaction_repository=transaction_repository,
             balance_repository=balance_repository,
         )
+        if order_book is not None:
+            order_book.apply(current_order, processing_result.changed_orders)
         return OrderFinalResult(
             status_code=processing_result.status_code,
             order_id=current_order.id,
             detail=processing_result.detail,
+            transactions=processing_result.transactions,
         )
     except Exception as error:
         logger.error(f"Order failed: {current_order}, {error}", exc_info=True)
@@ -570,14 +514,30 @@ async def process_order(
             order_id=current_order.id,
             detail="Internal server error",
         )
-    finally:
-        await balance_repository.advisory_unlock(balance_lock_id)
-        logger.info(
-            f"Balance repository removed advisory lock {balance_lock_id}"
-            f" by ticker {current_order.ticker}"
-        )
-        await order_repository.advisory_unlock(order_lock_id)
-        logger.info(
-            f"Order repository removed advisory lock {order_lock_id}"
-            f" by ticker {current_order.ticker}"
-        )
+
+
+async def process_order(
+    current_order: Order,
+    balance_repository: BalanceRepositoryProtocol,
+    order_repository: OrderRepositoryProtocol,
+    transaction_repository: TransactionRepositoryProtocol,
+    app_config_repository: AppConfigRepositoryProtocol,
+    lock_manager: LockManagerProtocol,
+    order_books: OrderBookRegistry | None = None,
+) -> OrderFinalResult:
+    """
+    Основная функция обработки ордера:
+    1. Блокирует тикер до конца транзакции
+    2. Обрабатывает ордер
+    """
+    logger.info(f"New order received: {current_order}")
+    await lock_manager.lock_ticker(current_order.ticker)
+    base_asset = await reference_data.base_asset(app_config_repository)
+    return await execute_order(
+        current_order=current_order,
+        base_asset=base_asset,
+        balance_repository=balance_repository,
+        order_repository=order_repository,
+        transaction_repository=transaction_repository,
+        order_books=order_books,
+    )
@@ -0,0 +1,140 @@
+import asyncio
+from typing import Callable, NamedTuple
+
+from application.config import REFERENCE_DATA_CHANNEL
+from application.database.backend import (
+    AppConfigRepository,
+    AppConfigRepositoryProtocol,
+    InstrumentRepository,
+    InstrumentRepositoryProtocol,
+    session_factory,
+)
+from application.database.notifications import listen_notifications
+from application.logger import setup_logging
+
+logger = setup_logging(__name__)
+
+RELOAD_RETRY_SECONDS = 1
+
+
+class ReferenceSnapshot(NamedTuple):
+    version: int
+    tickers: frozenset[str]
+    config: dict[str, str]
+
+
+class ReferenceData:
+    """
+    Тикеры инструментов и ключи конфигурации процесса, загруженные
+    из базы целиком. Каждое изменение увеличивает version и сбрасывает
+    снимок до перезагрузки; снимок, прочитанный до изменения, не
+    сохраняется. Пока снимка нет или процесс не слушает канал изменений,
+    запросы идут в репозитории.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.active = False
+        self._snapshot: ReferenceSnapshot | None = None
+        self._changed = asyncio.Event()
+        self._listeners: list[Callable[[frozenset[str]], None]] = []
+
+    def on_reload(self, listener: Callable[[frozenset[str]], None]) -> None:
+        """
+        Вызывает listener с тикерами каждого загруженного снимка.
+        """
+        self._listeners.append(listener)
+
+    @property
+    def snapshot(self) -> ReferenceSnapshot | None:
+        return self._snapshot if self.active else None
+
+    def invalidate(self) -> None:
+        self.version += 1
+        self._snapshot = None
+        self._changed.set()
+
+    def activate(self) -> None:
+        self.active = True
+        self.invalidate()
+
+    def reset(self) -> None:
+        self.active = False
+        self.invalidate()
+
+    async def ticker_exists(
+        self,
+        ticker: str,
+        instrument_repository: InstrumentRepositoryProtocol,
+    ) -> bool:
+        snapshot = self.snapshot
+        if snapshot is None:
+            return await instrument_repository.exists_in_database(ticker)
+        return ticker in snapshot.tickers
+
+    async def get_config(
+        self, key: str, app_config_repository: AppConfigRepositoryProtocol
+    ) -> str | None:
+        snapshot = self.snapshot
+        if snapshot is None:
+            return await app_config_repository.get(key)
+        return snapshot.config.get(key)
+
+    async def base_asset(
+        self, app_config_repository: AppConfigRepositoryProtocol
+    ) -> str:
+        base_asset = await self.get_config("base_asset", app_config_repository)
+        return base_asset or "RUB"
+
+    async def load(self) -> ReferenceSnapshot:
+        version = self.version
+        async with session_factory() as session:
+            instruments = await InstrumentRepository(session).get_all()
+            configs = await AppConfigRepository(session).get_all()
+        return ReferenceSnapshot(
+            version=version,
+            tickers=frozenset(instrument.ticker for instrument in instruments),
+            config={config.key: config.value for config in configs},
+        )
+
+    async def keep_loaded(self) -> None:
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            if not self.active:
+                continue
+            try:
+                snapshot = await self.load()
+            except Exception:
+                logger.exception("Reference data reload failed")
+                await asyncio.sleep(RELOAD_RETRY_SECONDS)
+                self._changed.set()
+                continue
+            if self.active and snapshot.version == self.version:
+                self._snapshot = snapshot
+                for listener in self._listeners:
+                    listener(snapshot.tickers)
+                logger.info(
+                    f"Reference data loaded, version {snapshot.version}: "
+                    f"{len(snapshot.tickers)} instruments, "
+                    f"{len(snapshot.config)} config keys"
+                )
+
+
+reference_data = ReferenceData()
+
+
+async def maintain_reference_data() -> None:
+    """
+    Загружает справочные данные и перезагружает их по уведомлениям
+    об изменениях инструментов и конфигурации.
+    """
+    await asyncio.gather(
+        reference_data.keep_loaded(),
+        listen_notifications(
+            REFERENCE_DATA_CHANNEL,
+            lambda _payload: reference_data.invalidate(),
+            on_connect=reference_data.activate,
+            on_disconnect=reference_data.reset,
+        ),
+    )
@@ -18,6 +18,7 @@ from application.di.repositories import (
     get_instrument_repository,
     get_user_repository,
 )
+from application.market_data.subscriber import discard_ticker
 from application.models.database_models.app_config import AppConfig
 from application.models.database_models.balance import Balance
 from application.models.database_models.instrument import Instrument
@@ -39,6 +40,7 @@ from application.models.endpoint_models.balance.withdraw_balance import (
 from application.models.endpoint_models.success_response import (
     SuccessResponse,
 )
+from application.reference_data import reference_data
 from application.token_management import (
     admin_authorization,
 )
@@ -105,6 +107,7 @@ async def delete_instrument(
         raise HTTPException(status_code=404, detail="Тикер не найден")
 
     await instrument_repository.delete(ticker)
+    discard_ticker(ticker)
     return SuccessResponse()
 
 
@@ -132,8 +135,8 @@ async def deposit_user_balance(
             status_code=400, detail="Данного пользователя не существует"
         )
 
-    ticker_exists = await instrument_repository.exists_in_database(
-        deposit.ticker
+    ticker_exists = await reference_data.ticker_exists(
+        deposit.ticker, instrument_repository
     )
     if not ticker_exists:
         raise HTTPException(
@@ -36,6 +36,11 @@ from application.models.endpoint_models.order.create_order import (
     CreateOrderRequest,
     CreateOrderResponse,
 )
+from application.models.endpoint_models.order.create_order_batch import (
+    CreateOrderBatchItem,
+    CreateOrderBatchRequest,
+    CreateOrderBatchResponse,
+)
 from application.models.endpoint_models.order.get_order_by_id import (
     LimitOrderBody,
     LimitOrderByIdResponse,
@@ -51,12 +56,46 @@ from application.models.endpoint_models.order.get_order_list import (
 from application.models.endpoint_models.success_response import (
     SuccessResponse,
 )
+from application.reference_data import reference_data
 from application.token_management import user_authorization
 
 order_router = APIRouter(prefix="/api/v1/order")
 logger = setup_logging(__name__)
 
 
+def new_order_of(new_order: CreateOrderRequest, user_id: UUID) -> Order:
+    return Order(
+        status=OrderStatus.new,
+        user_id=user_id,
+        timestamp=timestamp_utc(),
+        direction=new_order.direction,
+        ticker=new_order.ticker,
+        qty=new_order.qty,
+        price=new_order.price,
+    )
+
+
+async def order_error(
+    order: Order,
+    base_asset: str,
+    instrument_repository: InstrumentRepository,
+    tickers: dict[str, bool],
+) -> str | None:
+    """
+    Причина, по которой ордер нельзя создать, или None. tickers хранит
+    уже проверенные в запросе тикеры.
+    """
+    if order.ticker == base_asset:
+        return "Создание заявки на данный эквивалент невозможна"
+    if order.ticker not in tickers:
+        tickers[order.ticker] = await reference_data.ticker_exists(
+            order.ticker, instrument_repository
+        )
+    if not tickers[order.ticker]:
+        return "Данного тикера не существует"
+    return None
+
+
 @order_router.post("", summary="Create Order")
 async def create_order(
     new_order: CreateOrderRequest,
@@ -68,48 +107,69 @@ async def create_order(
         get_instrument_repository
     ),
     order_repository: OrderRepository = Depends(get_order_repository),
-    outbox_message_repository: OutboxMessageRepository = Depends(
-        get_outbox_message_repository
-    ),
 ) -> CreateOrderResponse:
     """
     Создает новый торговый ордер для авторизованного пользователя
     """
-    order_body = Order(
-        status=OrderStatus.new,
-        user_id=authorization,
-        timestamp=timestamp_utc(),
-        direction=new_order.direction,
-        ticker=new_order.ticker,
-        qty=new_order.qty,
-        price=new_order.price,
+    order_body = new_order_of(new_order, authorization)
+    base_asset = await reference_data.base_asset(app_config_repository)
+    error = await order_error(
+        order_body, base_asset, instrument_repository, {}
     )
+    if error is not None:
+        raise HTTPException(status_code=400, detail=error)
 
-    base_asset = await app_config_repository.get("base_asset") or "RUB"
-    if order_body.ticker == base_asset:
-        raise HTTPException(
-            status_code=400,
-            detail="Создание заявки на данный эквивалент невозможна",
-        )
-
-    ticker_exists = await instrument_repository.exists_in_database(
-        order_body.ticker
+    await order_repository.create_with_outbox(
+        order_body,
+        OutboxMessage(id=order_body.id, payload=order_body.model_dump_json()),
     )
-    if not ticker_exists:
-        raise HTTPException(
-            status_code=400, detail="Данного тикера не существует"
-        )
 
-    await order_repository.create(order_body)
+    return CreateOrderResponse(order_id=order_body.id)
 
-    await outbox_message_repository.create(
-        OutboxMessage(
-            id=order_body.id,
-            payload=order_body.model_dump_json(),
+
+@order_router.post("/batch", summary="Create Orders Batch")
+async def create_order_batch(
+    batch: CreateOrderBatchRequest,
+    authorization: UUID = Depends(user_authorization),
+    app_config_repository: AppConfigRepository = Depends(
+        get_app_config_repository
+    ),
+    instrument_repository: InstrumentRepository = Depends(
+        get_instrument_repository
+    ),
+    order_repository: OrderRepository = Depends(get_order_repository),
+) -> CreateOrderBatchResponse:
+    """
+    Создает пачку ордеров авторизованного пользователя одной транзакцией.
+    Ордера с ошибкой пропускаются, для каждого ордера в порядке запроса
+    возвращается его ID или ошибка
+    """
+    base_asset = await reference_data.base_asset(app_config_repository)
+    tickers: dict[str, bool] = {}
+    orders = []
+    items = []
+    for new_order in batch.orders:
+        order_body = new_order_of(new_order, authorization)
+        error = await order_error(
+            order_body, base_asset, instrument_repository, tickers
         )
-    )
+        if error is None:
+            orders.append(order_body)
+            items.append(CreateOrderBatchItem(order_id=order_body.id))
+        else:
+            items.append(CreateOrderBatchItem(error=error))
 
-    return CreateOrderResponse(order_id=order_body.id)
+    if orders:
+        await order_repository.bulk_create_with_outbox(
+            orders,
+            [
+                OutboxMessage(id=order.id, payload=order.model_dump_json())
+                for order in orders
+            ],
+        )
+    logger.info(f"Order batch of {len(batch.orders)}: {len(orders)} created")
+
+    return CreateOrderBatchResponse(orders=items)
 
 
 @order_router.get("", summary="List Orders")
@@ -205,6 +265,9 @@ async def cancel_order_by_id(
     app_config_repository: AppConfigRepository = Depends(
         get_app_config_repository
     ),
+    outbox_message_repository: OutboxMessageRepository = Depends(
+        get_outbox_message_repository
+    ),
 ) -> SuccessResponse:
     """
     Отменяет новый ордер авторизованного пользователя по ID
@@ -222,7 +285,7 @@ async def cancel_order_by_id(
             status_code=400, detail="Вы не можете отменить данный ордер"
         )
 
-    base_asset = await app_config_repository.get("base_asset") or "RUB"
+    base_asset = await reference_data.base_asset(app_config_repository)
     await order_repository.update(
         UpdateOrder(id=order_id, status=OrderStatus.cancelled)
     )
@@ -244,4 +307,10 @@ async def cancel_order_by_id(
             )
         )
 
+    # Консьюмер удалит ордер из резидентного стакана
+    order.status = OrderStatus.cancelled
+    await outbox_message_repository.create(
+        OutboxMessage(payload=order.model_dump_json())
+    )
+
     return SuccessResponse()
@@ -1,8 +1,20 @@
-from datetime import datetime, timedelta
-from typing import Dict, List
+from datetime import datetime
+from uuid import UUID, uuid4
 
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
 
+from application.config import MARKET_DATA_STREAM_TRADES
+from application.database.repository.candle_repository import (
+    CandleRepository,
+)
 from application.database.repository.instrument_repository import (
     InstrumentRepository,
 )
@@ -12,15 +24,31 @@ from application.database.repository.transaction_repository import (
 )
 from application.database.repository.user_repository import UserRepository
 from application.di.repositories import (
+    get_candle_repository,
     get_instrument_repository,
     get_order_repository,
     get_transaction_repository,
     get_user_repository,
 )
+from application.market_data.candles import (
+    combine_candles,
+    from_epoch_microseconds,
+    rollup_resolution,
+    trade_candles,
+)
+from application.market_data.stream import MarketDataStream
+from application.market_data.subscriber import (
+    instrument_exists,
+    load_levels,
+    load_trades,
+    order_book_snapshots,
+    trade_tapes,
+)
 from application.models.database_models.order import (
     OrderDirection,
 )
-from application.models.database_models.user import User
+from application.models.database_models.transaction import Transaction
+from application.models.database_models.user import User, UserRole
 from application.models.endpoint_models.public.create_user import (
     CreateUserRequest,
     CreateUserResponse,
@@ -39,6 +67,11 @@ from application.models.endpoint_models.public.get_transaction_history import (
 from application.models.endpoint_models.public.list_instrument import (
     InstrumentListResponse,
 )
+from application.models.endpoint_models.public.stream_market_data import (
+    MarketDataMessage,
+    MarketDataMessageType,
+)
+from application.reference_data import reference_data
 from application.token_management import create_access_token
 
 public_router = APIRouter(prefix="/api/v1/public")
@@ -59,8 +92,11 @@ async def register_new_user(
             status_code=409, detail="Пользователь уже существует"
         )
 
-    api_key = create_access_token({"sub": new_user.name})
-    new_user = User(name=new_user.name, api_key=api_key)
+    user_id = uuid4()
+    api_key = create_access_token(
+        {"sub": str(user_id), "name": new_user.name, "role": UserRole.user}
+    )
+    new_user = User(id=user_id, name=new_user.name, api_key=api_key)
     # # костыль на время тестов
     # if new_user.name == "ADMIN":
     #     new_user.api_key = "super_admin_api_key_123456789tochkaonelove"
@@ -100,55 +136,131 @@ async def get_orderbook(
     ticker: str,
     limit: int = 10,
     order_repository: OrderRepository = Depends(get_order_repository),
+    instrument_repository: InstrumentRepository = Depends(
+        get_instrument_repository
+    ),
 ) -> GetOrderbookResponse:
     """
     Получает стакан ордеров по заданному тикеру
     """
     if limit <= 0:
         limit = 10
-    orders = await order_repository.get_by_ticker(ticker, limit)
-    bid_levels_dict: Dict[int, int] = {}
-    ask_levels_dict: Dict[int, int] = {}
-    for order in orders:
-        assert order.price is not None
-        qty = order.qty - order.filled
-        if order.direction == OrderDirection.sell:
-            if order.price in ask_levels_dict:
-                ask_levels_dict[order.price] += qty
-            else:
-                ask_levels_dict[order.price] = qty
-        else:
-            if order.price in bid_levels_dict:
-                bid_levels_dict[order.price] += qty
-            else:
-                bid_levels_dict[order.price] = qty
 
-    ask_levels = [
-        Level(price=price, qty=qty) for price, qty in ask_levels_dict.items()
-    ]
-    bid_levels = [
-        Level(price=price, qty=qty) for price, qty in bid_levels_dict.items()
-    ]
+    # Снимок поддерживается событиями консьюмера; без подписки
+    # уровни агрегируются в базе
+    snapshot = order_book_snapshots.get(ticker)
+    if snapshot is None:
+        # Состояние загружается и хранится только для инструментов,
+        # стакан неизвестного тикера пуст
+        if not await reference_data.ticker_exists(
+            ticker, instrument_repository
+        ):
+            return GetOrderbookResponse(bid_levels=[], ask_levels=[])
+        snapshot = await order_book_snapshots.load(ticker, load_levels)
+    if snapshot is not None:
+        bids = snapshot.bids.levels(limit)
+        asks = snapshot.asks.levels(limit)
+    else:
+        bids = await order_repository.get_levels(
+            ticker, OrderDirection.buy, limit
+        )
+        asks = await order_repository.get_levels(
+            ticker, OrderDirection.sell, limit
+        )
 
-    sorted_ask_levels = sorted(ask_levels, key=lambda x: x.price)
-    sorted_bid_levels = sorted(bid_levels, key=lambda x: x.price, reverse=True)
     return GetOrderbookResponse(
-        ask_levels=sorted_ask_levels, bid_levels=sorted_bid_levels
+        bid_levels=[Level(price=price, qty=qty) for price, qty in bids],
+        ask_levels=[Level(price=price, qty=qty) for price, qty in asks],
     )
 
 
+@public_router.websocket("/stream/{ticker}")
+async def stream_market_data(websocket: WebSocket, ticker: str) -> None:
+    """
+    Транслирует изменения стакана и сделки по тикеру. Первым приходит
+    снимок с номером seq, далее - сообщения delta, каждое из которых
+    применяется к состоянию prev_seq. Медленному клиенту изменения
+    приходят схлопнутыми; при сбросе снимков клиент получает новый.
+    """
+    await websocket.accept()
+    stream = MarketDataStream(ticker, MARKET_DATA_STREAM_TRADES)
+    order_book_snapshots.add_stream(stream)
+    try:
+        while True:
+            if stream.resync:
+                if not await instrument_exists(ticker):
+                    await websocket.close(
+                        code=status.WS_1008_POLICY_VIOLATION,
+                        reason="Unknown ticker",
+                    )
+                    return
+                snapshot = await order_book_snapshots.load(ticker, load_levels)
+                if snapshot is None:
+                    await websocket.close(
+                        code=status.WS_1013_TRY_AGAIN_LATER,
+                        reason="Market data is unavailable",
+                    )
+                    return
+                message = MarketDataMessage(
+                    type=MarketDataMessageType.snapshot,
+                    ticker=ticker,
+                    seq=order_book_snapshots.seq(ticker),
+                    bid_levels=[
+                        Level(price=price, qty=qty)
+                        for price, qty in snapshot.bids.levels()
+                    ],
+                    ask_levels=[
+                        Level(price=price, qty=qty)
+                        for price, qty in snapshot.asks.levels()
+                    ],
+                )
+                stream.start(message.seq)
+            else:
+                await stream.wait()
+                if stream.resync:
+                    continue
+                message = stream.pop()
+            await websocket.send_text(message.model_dump_json())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        order_book_snapshots.remove_stream(stream)
+
+
 @public_router.get("/transactions/{ticker}", summary="Get Transaction History")
 async def get_transaction_history(
     ticker: str,
     limit: int = 10,
+    before: UUID | None = None,
     transaction_repository: TransactionRepository = Depends(
         get_transaction_repository
     ),
+    instrument_repository: InstrumentRepository = Depends(
+        get_instrument_repository
+    ),
 ) -> list[GetTransactionHistoryResponse]:
     """
-    Получает список транзакций по заданному тикеру
+    Получает список транзакций по заданному тикеру от новых к старым.
+    before - id транзакции, после которой продолжается список
     """
-    transactions = await transaction_repository.get(ticker, limit)
+    # Последние сделки отдаются из ленты в памяти, более старые -
+    # из базы
+    transactions: list[Transaction] | None = None
+    tape = trade_tapes.get(ticker)
+    if tape is None:
+        # Ленты загружаются только для инструментов, у неизвестного
+        # тикера сделок нет
+        if await reference_data.ticker_exists(ticker, instrument_repository):
+            tape = await trade_tapes.load(ticker, load_trades)
+        else:
+            transactions = []
+    if tape is not None:
+        transactions = tape.latest(limit, before)
+    if transactions is None:
+        transactions = await transaction_repository.get_latest(
+            ticker, limit, before
+        )
+
     result = []
     for transaction in transactions:
         result.append(
@@ -169,6 +281,7 @@ async def get_candles(
     interval_seconds: int,
     from_time: datetime | None = None,
     to_time: datetime | None = None,
+    candle_repository: CandleRepository = Depends(get_candle_repository),
     transaction_repository: TransactionRepository = Depends(
         get_transaction_repository
     ),
@@ -179,82 +292,44 @@ async def get_candles(
     if interval_seconds < 1:
         raise HTTPException(status_code=422, detail="Недопустимый интервал")
 
-    transaction_list = await transaction_repository.get(ticker)
-    # Фильтрация транзакций по временному диапазону
-    transaction_list = [
-        t
-        for t in transaction_list
-        if (from_time is None or t.timestamp >= from_time)
-        and (to_time is None or t.timestamp < to_time)
-    ]
-
-    if not transaction_list:
-        return GetCandlesResponse(ticker=ticker, candles=[])
-
-    delta = timedelta(seconds=interval_seconds)
-
-    candles = []
-    current_bucket_start = None
-    current_prices: List[int] = []
-    current_volume = 0
-
-    # Обработка каждой транзакции
-    for transaction in transaction_list:
-        # Определение начала интервала для текущей транзакции
-        timestamp = transaction.timestamp.timestamp()
-
-        if delta.total_seconds() >= 86400:  # Для интервалов >= 1 дня
-            # Округление до 00:00:00 текущего дня
-            bucket_start = datetime.fromtimestamp(
-                timestamp - (timestamp % 86400)
-            )
-        elif delta.total_seconds() >= 3600:  # Для интервалов >= 1 часа
-            # Округление до часа
-            bucket_start = datetime.fromtimestamp(
-                timestamp - (timestamp % 3600)
-            )
-        elif delta.total_seconds() >= 60:  # Для интервалов >= 1 минуты
-            # Округление до минуты
-            bucket_start = datetime.fromtimestamp(timestamp - (timestamp % 60))
-        else:
-            # Для интервалов в секундах
-            bucket_start = datetime.fromtimestamp(
-                timestamp - (timestamp % delta.total_seconds())
-            )
-
-        # Если начался новый интервал
-        if current_bucket_start != bucket_start:
-            # Сохраняем предыдущую свечу, если есть данные
-            if current_bucket_start is not None and current_prices:
-                candles.append(
-                    CandleStick(
-                        open_price=current_prices[0],
-                        high_price=max(current_prices),
-                        low_price=min(current_prices),
-                        close_price=current_prices[-1],
-                        volume=current_volume,
-                        timestamp=current_bucket_start,
-                    )
+    # Свечи собираются из хранимых агрегатов, если интервал кратен
+    # их разрешению, а границы диапазона выровнены по нему
+    resolution = rollup_resolution(interval_seconds, from_time, to_time)
+    if resolution is not None:
+        rollups = await candle_repository.get(
+            ticker, resolution, from_time, to_time
+        )
+        return GetCandlesResponse(
+            ticker=ticker,
+            candles=[
+                CandleStick(
+                    open_price=candle.open,
+                    high_price=candle.high,
+                    low_price=candle.low,
+                    close_price=candle.close,
+                    volume=candle.volume,
+                    timestamp=candle.bucket,
                 )
+                for candle in combine_candles(rollups, interval_seconds)
+            ],
+        )
 
-            current_bucket_start = bucket_start
-            current_prices = []
-            current_volume = 0
-
-        current_prices.append(transaction.price)
-        current_volume += transaction.qty
-
-    # Добавление последней свечи
-    if current_prices:
+    trades = await transaction_repository.get_trade_columns(
+        ticker, from_time, to_time
+    )
+    columns = trade_candles(trades, interval_seconds)
+    candles = []
+    for bucket, open_price, high_price, low_price, close_price, volume in zip(
+        *(column.tolist() for column in columns), strict=True
+    ):
         candles.append(
             CandleStick(
-                open_price=current_prices[0],
-                high_price=max(current_prices),
-                low_price=min(current_prices),
-                close_price=current_prices[-1],
-                volume=current_volume,
-                timestamp=current_bucket_start,
+                open_price=open_price,
+                high_price=high_price,
+                low_price=low_price,
+                close_price=close_price,
+                volume=volume,
+                timestamp=from_epoch_microseconds(bucket),
             )
         )
-
     return GetCandlesResponse(ticker=ticker, candles=candles)
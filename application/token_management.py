@@ -4,9 +4,14 @@ from uuid import UUID
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, Security
 from fastapi.security.api_key import APIKeyHeader
-from jose import jwt
+from jose import ExpiredSignatureError, JWTError, jwt
 
-from application.config import JWT_SECRET_KEY
+from application.auth_cache import AuthorizedUser, auth_cache, revoked_users
+from application.config import (
+    ACCESS_TOKEN_EXPIRE_DAYS,
+    AUTH_MODE,
+    JWT_SECRET_KEY,
+)
 from application.database.repository.user_repository import UserRepository
 from application.di.repositories import get_user_repository
 from application.models.database_models.user import UserRole
@@ -16,17 +21,75 @@ load_dotenv()
 api_key_header = APIKeyHeader(name="Authorization")
 
 
+def token_claims(api_key: str) -> AuthorizedUser | None:
+    """
+    Пользователь и роль из подписанного токена с проверкой срока.
+    None - токен не JWT или выдан без этих данных: его ищут в базе.
+    """
+    auth_data = get_auth_data()
+    try:
+        claims = jwt.decode(
+            api_key,
+            auth_data["secret_key"],
+            algorithms=[auth_data["algorithm"]],
+        )
+    except ExpiredSignatureError:
+        raise HTTPException(
+            status_code=401, detail="Срок действия токена истек"
+        ) from None
+    except JWTError:
+        return None
+    try:
+        return AuthorizedUser(
+            id=UUID(claims["sub"]), role=UserRole(claims["role"])
+        )
+    except (KeyError, ValueError):
+        return None
+
+
+async def authorize_by_claims(
+    api_key: str, user_repository: UserRepository
+) -> AuthorizedUser | None:
+    user = token_claims(api_key)
+    if user is None or user.id not in revoked_users:
+        return user
+    # Пользователь удален или сменил роль после выдачи токена
+    stored_user = await user_repository.get_by_id(user.id)
+    if stored_user is None:
+        raise HTTPException(
+            status_code=401, detail="Пользователь не авторизован"
+        )
+    return AuthorizedUser(id=stored_user.id, role=stored_user.role)
+
+
+async def authorize_by_api_key(
+    api_key: str, user_repository: UserRepository
+) -> AuthorizedUser:
+    user = auth_cache.get(api_key)
+    if user is not None:
+        return user
+    version = auth_cache.version
+    user_orm = await user_repository.get_by_api_key(api_key)
+    if user_orm is None:
+        raise HTTPException(
+            status_code=401, detail="Пользователь не авторизован"
+        )
+    user = AuthorizedUser(id=user_orm.id, role=UserRole(user_orm.role))
+    auth_cache.put(api_key, user, version)
+    return user
+
+
 async def base_authorization(
     api_key: str,
     user_repository: UserRepository,
     required_role: UserRole | None = None,
 ) -> UUID:
     api_key = api_key.replace("TOKEN ", "", 1)
-    user = await user_repository.get_by_api_key(api_key)
+    user = None
+    if AUTH_MODE == "jwt":
+        user = await authorize_by_claims(api_key, user_repository)
     if user is None:
-        raise HTTPException(
-            status_code=401, detail="Пользователь не авторизован"
-        )
+        user = await authorize_by_api_key(api_key, user_repository)
     if required_role and user.role != required_role:
         raise HTTPException(status_code=403, detail="Недостаточно прав")
     return user.id
@@ -55,7 +118,7 @@ def get_auth_data():
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
-    expire = datetime.now(UTC) + timedelta(days=30)
+    expire = datetime.now(UTC) + timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
     to_encode.update({"exp": expire})
     auth_data = get_auth_data()
     encode_jwt = jwt.encode(
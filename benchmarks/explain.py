@@ -0,0 +1,201 @@
+"""
+Проверка планов горячих запросов: каждый использует свой индекс.
+
+Запросы выполняются настоящими методами репозиториев на локальном
+Postgres (по настройкам из .env, с примененными миграциями), их SQL
+перехватывается и разбирается через EXPLAIN. Последовательное
+сканирование запрещено (enable_seqscan = off), поэтому на пустых
+таблицах проверяется, что индекс применим к запросу: если условие
+запроса не совпадает с условием частичного индекса, план все равно
+будет последовательным сканированием.
+
+Пример:
+    python -m benchmarks.explain
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, NamedTuple
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from application.database.engine import async_engine
+from application.database.repository.candle_repository import (
+    CandleRepository,
+)
+from application.database.repository.order_repository import OrderRepository
+from application.database.repository.outbox_message_repository import (
+    OutboxMessageRepository,
+)
+from application.database.repository.transaction_repository import (
+    TransactionRepository,
+)
+from application.models.database_models.order import OrderDirection
+
+TICKER = "EXPLAIN"
+NOW = datetime.now(timezone.utc)
+
+
+class HotQuery(NamedTuple):
+    name: str
+    index_name: str
+    run: Callable[[AsyncSession], Awaitable[Any]]
+
+
+HOT_QUERIES = [
+    HotQuery(
+        "matching: asks crossing a buy",
+        "ix_orders_open_asks",
+        lambda session: OrderRepository(session).get_crossing_orders(
+            TICKER, OrderDirection.sell, qty=10, price=100
+        ),
+    ),
+    HotQuery(
+        "matching: bids crossing a sell",
+        "ix_orders_open_bids",
+        lambda session: OrderRepository(session).get_crossing_orders(
+            TICKER, OrderDirection.buy, qty=10, price=100
+        ),
+    ),
+    HotQuery(
+        "order book: ask levels",
+        "ix_orders_open_asks",
+        lambda session: OrderRepository(session).get_levels(
+            TICKER, OrderDirection.sell, 10
+        ),
+    ),
+    HotQuery(
+        "order book: bid levels",
+        "ix_orders_open_bids",
+        lambda session: OrderRepository(session).get_levels(
+            TICKER, OrderDirection.buy, 10
+        ),
+    ),
+    HotQuery(
+        "trades: newest page",
+        "ix_transaction_ticker_timestamp",
+        lambda session: TransactionRepository(session).get_latest(
+            TICKER, 100, uuid.uuid4()
+        ),
+    ),
+    HotQuery(
+        "candles: trades of a range",
+        "ix_transaction_ticker_timestamp",
+        lambda session: TransactionRepository(session).get_trade_columns(
+            TICKER, NOW - timedelta(hours=1), NOW
+        ),
+    ),
+    HotQuery(
+        "candles: rollups of a range",
+        "candle_pkey",
+        lambda session: CandleRepository(session).get(
+            TICKER, 60, NOW - timedelta(days=1), NOW
+        ),
+    ),
+    HotQuery(
+        "archiver: finished orders",
+        "ix_orders_finished",
+        lambda session: OrderRepository(session).archive_finished(1000),
+    ),
+    HotQuery(
+        "outbox: unsent messages",
+        "ix_outbox_unsent",
+        lambda session: OutboxMessageRepository(session).get(limit=50),
+    ),
+]
+
+
+def plan_indexes(plan: dict) -> set[str]:
+    indexes = set()
+    if "Index Name" in plan:
+        indexes.add(plan["Index Name"])
+    for child in plan.get("Plans", ()):
+        indexes |= plan_indexes(child)
+    return indexes
+
+
+async def partition_roots(
+    connection: AsyncConnection, indexes: set[str]
+) -> set[str]:
+    """
+    Заменяет индексы секций (transaction_default_..., transaction_2026_10_...)
+    индексом секционированной таблицы, к которому они присоединены.
+    """
+    if not indexes:
+        return indexes
+    result = await connection.execute(
+        text(
+            "SELECT coalesce(pg_partition_root(to_regclass(name))::text, name)"
+            " FROM unnest(CAST(:names AS text[])) AS name"
+        ),
+        {"names": sorted(indexes)},
+    )
+    return set(result.scalars())
+
+
+async def explain(query: HotQuery) -> set[str]:
+    """
+    Выполняет запрос в откатываемой транзакции и возвращает индексы
+    из планов всех его SELECT и WITH; индексы секций сделок приводятся
+    к индексу таблицы transaction.
+    """
+    statements: list[tuple[str, Any]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SET LOCAL enable_seqscan = off"))
+        event.listen(
+            async_engine.sync_engine, "before_cursor_execute", capture
+        )
+        try:
+            await query.run(AsyncSession(bind=connection))
+        finally:
+            event.remove(
+                async_engine.sync_engine, "before_cursor_execute", capture
+            )
+
+        indexes = set()
+        for statement, parameters in statements:
+            result = await connection.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters
+            )
+            plan = result.scalar_one()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            indexes |= plan_indexes(plan[0]["Plan"])
+        indexes = await partition_roots(connection, indexes)
+        await connection.rollback()
+    return indexes
+
+
+async def check_plans() -> bool:
+    passed = True
+    for query in HOT_QUERIES:
+        indexes = await explain(query)
+        ok = query.index_name in indexes
+        passed &= ok
+        used = ", ".join(sorted(indexes)) or "no index"
+        print(
+            f"{'OK  ' if ok else 'FAIL'} {query.name}: "
+            f"expected {query.index_name}, used {used}"
+        )
+    await async_engine.dispose()
+    return passed
+
+
+def main() -> None:
+    argparse.ArgumentParser(description=__doc__.splitlines()[1]).parse_args()
+    if not asyncio.run(check_plans()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
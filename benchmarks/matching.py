@@ -0,0 +1,420 @@
+"""
+Нагрузочный прогон пути сопоставления ордеров на синтетическом потоке.
+
+Режимы:
+    engine - стакан, ядро сопоставления и свертка балансов в памяти,
+             без базы данных;
+    memory - execute_order с репозиториями в памяти (STORAGE_BACKEND=memory),
+             транзакция на ордер;
+    db     - execute_order с настоящими репозиториями на локальном
+             Postgres (по настройкам из .env), транзакция на ордер.
+
+Пример:
+    python -m benchmarks.matching --mode engine --orders 50000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, NamedTuple
+from uuid import UUID
+
+from sqlalchemy import delete
+
+from application.database.engine import async_engine, async_session_factory
+from application.database.lock_manager import LockManager
+from application.database.memory.lock_manager import MemoryLockManager
+from application.database.memory.repositories import (
+    MemoryBalanceRepository,
+    MemoryInstrumentRepository,
+    MemoryOrderRepository,
+    MemoryTransactionRepository,
+    MemoryUserRepository,
+)
+from application.database.memory.session import MemorySessionFactory
+from application.database.memory.storage import MemoryStorage
+from application.database.repository.balance_repository import (
+    BalanceRepository,
+)
+from application.database.repository.instrument_repository import (
+    InstrumentRepository,
+)
+from application.database.repository.order_repository import OrderRepository
+from application.database.repository.transaction_repository import (
+    TransactionRepository,
+)
+from application.database.repository.user_repository import UserRepository
+from application.matching.order_book import OrderBook, OrderBookRegistry
+from application.models.database_models.balance import Balance
+from application.models.database_models.instrument import Instrument
+from application.models.database_models.order import Order
+from application.models.database_models.user import User
+from application.models.orm_models.order import OrderOrm
+from application.models.orm_models.transaction import TransactionOrm
+from application.models.orm_models.user import UserOrm
+from application.order_consumer import (
+    execute_order,
+    net_balance_deltas,
+    processing_orders,
+)
+from benchmarks.order_flow import FlowConfig, OrderFlow, PriceDistribution
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+BASE_ASSET = "RUB"
+INITIAL_BALANCE = 10**12
+
+
+class BenchmarkRecorder:
+    """
+    Собирает задержки ордеров и выборочные замеры аллокаций.
+    Ордера с замером аллокаций (tracemalloc) в задержки не попадают.
+    """
+
+    def __init__(self, alloc_every: int):
+        self.alloc_every = alloc_every
+        self.latencies: list[int] = []
+        self.alloc_peaks: list[int] = []
+        self.fills = 0
+        self.orders = 0
+        self.elapsed = 0.0
+        self._blocks = 0
+
+    def start(self) -> None:
+        self._blocks = sys.getallocatedblocks()
+        self._started = time.perf_counter()
+
+    def stop(self) -> None:
+        self.elapsed = time.perf_counter() - self._started
+        self._blocks = sys.getallocatedblocks() - self._blocks
+
+    def sampled(self) -> bool:
+        return bool(self.alloc_every) and self.orders % self.alloc_every == 0
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "orders": self.orders,
+            "fills": self.fills,
+            "elapsed_s": round(self.elapsed, 4),
+            "orders_per_s": round(self.orders / self.elapsed, 1),
+            "fills_per_s": round(self.fills / self.elapsed, 1),
+            "latency_us": {
+                "p50": percentile(latencies, 50),
+                "p99": percentile(latencies, 99),
+                "p999": percentile(latencies, 99.9),
+                "max": round(latencies[-1] / 1000, 1) if latencies else 0,
+            },
+            "allocations": {
+                "samples": len(self.alloc_peaks),
+                "peak_bytes_per_order": (
+                    round(sum(self.alloc_peaks) / len(self.alloc_peaks))
+                    if self.alloc_peaks
+                    else None
+                ),
+                "retained_blocks_per_order": round(
+                    self._blocks / self.orders, 2
+                ),
+            },
+        }
+
+
+def percentile(values: list[int], percent: float) -> float:
+    """
+    Перцентиль по ближайшему рангу для отсортированных значений в нс,
+    результат в микросекундах.
+    """
+    if not values:
+        return 0
+    rank = max(round(percent / 100 * len(values) + 0.5) - 1, 0)
+    return round(values[min(rank, len(values) - 1)] / 1000, 1)
+
+
+def measure(recorder: BenchmarkRecorder, process, current_order) -> None:
+    recorder.orders += 1
+    if recorder.sampled():
+        tracemalloc.start()
+        recorder.fills += process(current_order)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        recorder.alloc_peaks.append(peak)
+        return
+    started = time.perf_counter_ns()
+    recorder.fills += process(current_order)
+    recorder.latencies.append(time.perf_counter_ns() - started)
+
+
+async def measure_async(
+    recorder: BenchmarkRecorder, process, current_order
+) -> None:
+    recorder.orders += 1
+    if recorder.sampled():
+        tracemalloc.start()
+        await process(current_order)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        recorder.alloc_peaks.append(peak)
+        return
+    started = time.perf_counter_ns()
+    await process(current_order)
+    recorder.latencies.append(time.perf_counter_ns() - started)
+
+
+def run_engine(config: FlowConfig, alloc_every: int) -> dict:
+    """
+    Прогоняет поток через резидентный стакан, ядро сопоставления
+    и свертку изменений балансов, применяя результат к данным в памяти.
+    """
+
+    flow = OrderFlow(config)
+    book = OrderBook(config.ticker)
+    open_orders: dict[UUID, Order] = {}
+    balances: dict[tuple[UUID, str], list[int]] = {}
+
+    def process(current_order: Order) -> int:
+        matching_orders = [
+            open_orders[order_id] for order_id in book.crossing(current_order)
+        ]
+        result = processing_orders(current_order, matching_orders, BASE_ASSET)
+        for delta in net_balance_deltas(result.balance_totals):
+            balance = balances.setdefault(
+                (delta.user_id, delta.ticker), [0, 0]
+            )
+            balance[0] += delta.qty
+            balance[1] += delta.reserve
+        for changed in result.changed_orders:
+            order = open_orders.get(changed.id)
+            if order is None:
+                continue
+            if changed.filled is not None:
+                order.filled = changed.filled
+            if changed.status is not None:
+                order.status = changed.status
+        book.apply(current_order, result.changed_orders)
+        for changed in result.changed_orders:
+            if changed.id not in book:
+                open_orders.pop(changed.id, None)
+        if current_order.id in book:
+            open_orders[current_order.id] = current_order
+        return len(result.transactions)
+
+    for order in flow.book():
+        process(order)
+
+    recorder = BenchmarkRecorder(alloc_every)
+    recorder.start()
+    for order in flow.orders():
+        measure(recorder, process, order)
+    recorder.stop()
+    return recorder.summary()
+
+
+class Repositories(NamedTuple):
+    session_factory: Any
+    lock_manager: type
+    balance: type
+    instrument: type
+    order: type
+    transaction: type
+    user: type
+
+
+def get_repositories(mode: str) -> Repositories:
+    if mode == "memory":
+        return Repositories(
+            session_factory=MemorySessionFactory(MemoryStorage()),
+            lock_manager=MemoryLockManager,
+            balance=MemoryBalanceRepository,
+            instrument=MemoryInstrumentRepository,
+            order=MemoryOrderRepository,
+            transaction=MemoryTransactionRepository,
+            user=MemoryUserRepository,
+        )
+    return Repositories(
+        session_factory=async_session_factory,
+        lock_manager=LockManager,
+        balance=BalanceRepository,
+        instrument=InstrumentRepository,
+        order=OrderRepository,
+        transaction=TransactionRepository,
+        user=UserRepository,
+    )
+
+
+async def count_fills(repositories: Repositories, ticker: str) -> int:
+    async with repositories.session_factory() as session:
+        transactions = await repositories.transaction(session).get(ticker)
+    return len(transactions)
+
+
+async def delete_database_data(ticker: str, user_ids: list[UUID]) -> None:
+    async with async_session_factory.begin() as session:
+        await session.execute(
+            delete(TransactionOrm).where(TransactionOrm.ticker == ticker)
+        )
+        await session.execute(
+            delete(OrderOrm).where(OrderOrm.ticker == ticker)
+        )
+        await session.execute(delete(UserOrm).where(UserOrm.id.in_(user_ids)))
+        await InstrumentRepository(session).delete(ticker)
+    await async_engine.dispose()
+
+
+async def run_repositories(
+    config: FlowConfig, alloc_every: int, mode: str
+) -> dict:
+    """
+    Прогоняет поток через execute_order с репозиториями Postgres (db)
+    или в памяти (memory): каждый ордер в своей транзакции под
+    блокировкой тикера, как в консьюмере. Данные прогона в базе
+    удаляются после него.
+    """
+    repositories = get_repositories(mode)
+    session_factory = repositories.session_factory
+    flow = OrderFlow(config)
+    order_books = OrderBookRegistry()
+
+    async with session_factory.begin() as session:
+        await repositories.instrument(session).create(
+            Instrument(name=config.ticker, ticker=config.ticker)
+        )
+        user_repository = repositories.user(session)
+        balance_repository = repositories.balance(session)
+        user_ids = []
+        for index in range(len(flow.user_ids)):
+            user = await user_repository.create(
+                User(
+                    name=f"bench-{config.ticker}-{index}",
+                    api_key=f"bench-{config.ticker}-{index}",
+                )
+            )
+            user_ids.append(user.id)
+            for ticker in (BASE_ASSET, config.ticker):
+                await balance_repository.upsert(
+                    Balance(
+                        user_id=user.id, ticker=ticker, qty=INITIAL_BALANCE
+                    )
+                )
+    # Ордера генератора ссылаются на созданных в хранилище пользователей
+    user_map = dict(zip(flow.user_ids, user_ids, strict=True))
+    order_books.rebuild([])
+
+    async def process(current_order: Order) -> None:
+        current_order.user_id = user_map[current_order.user_id]
+        async with session_factory.begin() as session:
+            await repositories.lock_manager(session).lock_ticker(
+                current_order.ticker
+            )
+            await execute_order(
+                current_order=current_order,
+                base_asset=BASE_ASSET,
+                balance_repository=repositories.balance(session),
+                order_repository=repositories.order(session),
+                transaction_repository=repositories.transaction(session),
+                order_books=order_books,
+            )
+
+    recorder = BenchmarkRecorder(alloc_every)
+    try:
+        for order in flow.book():
+            await process(order)
+        fills_before = await count_fills(repositories, config.ticker)
+
+        recorder.start()
+        for order in flow.orders():
+            await measure_async(recorder, process, order)
+        recorder.stop()
+
+        fills_after = await count_fills(repositories, config.ticker)
+        recorder.fills = fills_after - fills_before
+    finally:
+        if mode == "db":
+            await delete_database_data(config.ticker, user_ids)
+    return recorder.summary()
+
+
+def parse_args() -> argparse.Namespace:
+    defaults = FlowConfig()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--mode", choices=("engine", "memory", "db"), default="engine"
+    )
+    parser.add_argument("--orders", type=int, default=defaults.orders)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--depth", type=int, default=defaults.depth)
+    parser.add_argument("--mid-price", type=int, default=defaults.mid_price)
+    parser.add_argument(
+        "--price-spread", type=int, default=defaults.price_spread
+    )
+    parser.add_argument(
+        "--distribution",
+        choices=[item.value for item in PriceDistribution],
+        default=defaults.distribution.value,
+    )
+    parser.add_argument(
+        "--market-ratio", type=float, default=defaults.market_ratio
+    )
+    parser.add_argument("--max-qty", type=int, default=defaults.max_qty)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument(
+        "--alloc-every",
+        type=int,
+        default=100,
+        help="замерять аллокации каждого N-го ордера (0 - не замерять)",
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    config = FlowConfig(
+        orders=args.orders,
+        users=args.users,
+        depth=args.depth,
+        mid_price=args.mid_price,
+        price_spread=args.price_spread,
+        distribution=args.distribution,
+        market_ratio=args.market_ratio,
+        max_qty=args.max_qty,
+        seed=args.seed,
+    )
+    # Логи обработки каждого ордера искажают замеры
+    logging.disable(logging.INFO)
+
+    started_at = datetime.now(timezone.utc)
+    if args.mode == "engine":
+        metrics = run_engine(config, args.alloc_every)
+    else:
+        if args.mode == "db":
+            config.ticker = f"B{started_at:%H%M%S}"
+        metrics = asyncio.run(
+            run_repositories(config, args.alloc_every, args.mode)
+        )
+
+    report = {
+        "benchmark": "matching",
+        "mode": args.mode,
+        "started_at": started_at.isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config.model_dump(mode="json"),
+        "metrics": metrics,
+    }
+    output = args.output or (
+        RESULTS_DIR / f"matching-{args.mode}-{started_at:%Y%m%dT%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(json.dumps(report["metrics"], indent=2))
+    print(f"Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import random
+import uuid
+from datetime import timedelta
+from enum import StrEnum
+from typing import Iterator
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+from application.config import timestamp_utc
+from application.models.database_models.order import (
+    Order,
+    OrderDirection,
+    OrderStatus,
+)
+
+
+class PriceDistribution(StrEnum):
+    uniform = "uniform"
+    normal = "normal"
+
+
+class FlowConfig(BaseModel):
+    ticker: str = "BENCH"
+    orders: int = Field(default=10_000, gt=0)
+    users: int = Field(default=100, gt=0)
+    depth: int = Field(default=1_000, ge=0)
+    mid_price: int = Field(default=10_000, gt=0)
+    price_spread: int = Field(default=50, gt=0)
+    distribution: PriceDistribution = PriceDistribution.normal
+    market_ratio: float = Field(default=0.1, ge=0, le=1)
+    max_qty: int = Field(default=10, gt=0)
+    seed: int = 0
+
+
+class OrderFlow:
+    """
+    Генератор синтетического потока ордеров одного тикера.
+    Цены лимитных ордеров распределены вокруг mid_price, поэтому часть
+    ордеров встает в стакан, а часть пересекается со встречными.
+    """
+
+    def __init__(self, config: FlowConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.user_ids: list[UUID] = [
+            uuid.UUID(int=self.random.getrandbits(128), version=4)
+            for _ in range(config.users)
+        ]
+        self._timestamp = timestamp_utc()
+
+    def _next_timestamp(self):
+        self._timestamp += timedelta(microseconds=1)
+        return self._timestamp
+
+    def _offset(self) -> int:
+        spread = self.config.price_spread
+        if self.config.distribution == PriceDistribution.uniform:
+            return self.random.randint(-spread, spread)
+        return round(self.random.gauss(0, spread / 2))
+
+    def _order(self, direction: OrderDirection, price: int | None) -> Order:
+        return Order(
+            id=uuid.UUID(int=self.random.getrandbits(128), version=4),
+            status=OrderStatus.new,
+            user_id=self.random.choice(self.user_ids),
+            timestamp=self._next_timestamp(),
+            direction=direction,
+            ticker=self.config.ticker,
+            qty=self.random.randint(1, self.config.max_qty),
+            price=price,
+        )
+
+    def book(self) -> list[Order]:
+        """
+        Начальная глубина стакана: depth лимитных ордеров, не
+        пересекающихся между собой (bid ниже mid_price, ask выше).
+        """
+        orders = []
+        for _ in range(self.config.depth):
+            distance = abs(self._offset()) + 1
+            if self.random.random() < 0.5:
+                direction = OrderDirection.buy
+                price = max(self.config.mid_price - distance, 1)
+            else:
+                direction = OrderDirection.sell
+                price = self.config.mid_price + distance
+            orders.append(self._order(direction, price))
+        return orders
+
+    def orders(self) -> Iterator[Order]:
+        for _ in range(self.config.orders):
+            direction = self.random.choice(
+                (OrderDirection.buy, OrderDirection.sell)
+            )
+            if self.random.random() < self.config.market_ratio:
+                yield self._order(direction, None)
+                continue
+            price = max(self.config.mid_price + self._offset(), 1)
+            yield self._order(direction, price)
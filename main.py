@@ -1,12 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 
+from application.auth_cache import (
+    listen_user_changes,
+    refresh_revoked_users,
+)
+from application.broker.run_broker import consume_orders
+from application.broker.run_outbox_publisher import publish_outbox_messages
+from application.broker.sharding import owned_shards
+from application.config import AUTH_MODE, STORAGE_BACKEND
+from application.market_data.subscriber import consume_market_data
+from application.reference_data import maintain_reference_data
 from application.routers.admin import admin_router
 from application.routers.balance import balance_router
 from application.routers.order import order_router
 from application.routers.public import public_router
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Данные в памяти доступны только этому процессу, поэтому
+    # консьюмер и публикатор outbox работают внутри него
+    tasks = [asyncio.create_task(consume_market_data())]
+    if STORAGE_BACKEND == "memory":
+        tasks += [
+            asyncio.create_task(consume_orders(owned_shards())),
+            asyncio.create_task(publish_outbox_messages()),
+        ]
+    else:
+        tasks += [
+            asyncio.create_task(listen_user_changes()),
+            asyncio.create_task(maintain_reference_data()),
+        ]
+    if AUTH_MODE == "jwt":
+        tasks.append(asyncio.create_task(refresh_revoked_users()))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(public_router, tags=["public"])
 app.include_router(balance_router, tags=["balance"])
 app.include_router(order_router, tags=["order"])
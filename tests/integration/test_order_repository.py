@@ -0,0 +1,85 @@
+import uuid
+
+import pytest
+
+from application.database.repository.order_repository import OrderRepository
+from application.database.repository.user_repository import UserRepository
+from application.models.database_models.order import (
+    Order,
+    OrderDirection,
+    OrderStatus,
+    UpdateOrder,
+)
+from application.models.database_models.user import User
+
+
+@pytest.mark.asyncio
+async def test_crossing_orders_are_paged_in_priority_order(
+    db_session, order_repository: OrderRepository
+):
+    user = await UserRepository(db_session).create(
+        User(name="crossing-orders", api_key=f"key-{uuid.uuid4()}")
+    )
+
+    async def create(direction: OrderDirection, price: int) -> Order:
+        order = Order(
+            status=OrderStatus.new,
+            user_id=user.id,
+            direction=direction,
+            ticker="CROSS",
+            qty=5,
+            price=price,
+        )
+        await order_repository.create(order)
+        return order
+
+    asks = [
+        await create(OrderDirection.sell, price)
+        for price in (100, 90, 100, 120, 100)
+    ]
+    bids = [await create(OrderDirection.buy, price) for price in (80, 85, 85)]
+    await order_repository.bulk_update(
+        [
+            UpdateOrder(
+                id=asks[0].id,
+                status=OrderStatus.partially_executed,
+                filled=3,
+            ),
+            UpdateOrder(id=asks[2].id, status=OrderStatus.executed, filled=5),
+        ]
+    )
+
+    async def crossing(direction, qty, price=None, page_size=2):
+        orders = await order_repository.get_crossing_orders(
+            "CROSS", direction, qty=qty, price=price, page_size=page_size
+        )
+        return [order.id for order in orders]
+
+    # 5 + 2 не покрывают 8, поэтому берется третий ордер со второй
+    # страницы; исполненный ордер пропускается
+    assert await crossing(OrderDirection.sell, 8, price=100) == [
+        asks[1].id,
+        asks[0].id,
+        asks[4].id,
+    ]
+    assert await crossing(OrderDirection.sell, 7, price=100) == [
+        asks[1].id,
+        asks[0].id,
+    ]
+    assert await crossing(OrderDirection.sell, 100, price=95) == [asks[1].id]
+    assert await crossing(OrderDirection.sell, 100) == [
+        asks[1].id,
+        asks[0].id,
+        asks[4].id,
+        asks[3].id,
+    ]
+    assert await crossing(OrderDirection.buy, 100, price=85) == [
+        bids[1].id,
+        bids[2].id,
+    ]
+    assert await crossing(OrderDirection.buy, 6, page_size=100) == [
+        bids[1].id,
+        bids[2].id,
+    ]
+
+    await db_session.rollback()
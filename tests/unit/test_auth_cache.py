@@ -0,0 +1,83 @@
+import asyncio
+import uuid
+
+from fastapi import HTTPException
+
+from application import token_management
+from application.auth_cache import AuthCache, AuthorizedUser, RevokedUsers
+from application.database.memory.repositories import MemoryUserRepository
+from application.database.memory.session import MemorySessionFactory
+from application.database.memory.storage import MemoryStorage
+from application.market_data.candles import EPOCH
+from application.models.database_models.user import User, UserRole
+
+
+def test_auth_cache_evicts_and_invalidates():
+    cache = AuthCache(size=2, ttl=60)
+    users = [AuthorizedUser(uuid.uuid4(), UserRole.user) for _ in range(3)]
+
+    cache.put("key-0", users[0], cache.version)
+    assert cache.get("key-0") is None
+
+    cache.activate()
+    for index, user in enumerate(users[:2]):
+        cache.put(f"key-{index}", user, cache.version)
+    assert cache.get("key-0") == users[0]
+    cache.put("key-2", users[2], cache.version)
+    assert cache.get("key-1") is None
+    assert cache.get("key-0") == users[0]
+
+    # Чтение из базы началось до удаления пользователя
+    version = cache.version
+    cache.invalidate(users[0].id)
+    cache.put("key-0", users[0], version)
+    assert cache.get("key-0") is None
+    assert len(cache) == 1
+
+    expired = AuthCache(size=2, ttl=0)
+    expired.activate()
+    expired.put("key-0", users[0], expired.version)
+    assert expired.get("key-0") is None
+    assert len(expired) == 0
+
+
+def test_jwt_claims_are_trusted_until_user_is_revoked(monkeypatch):
+    monkeypatch.setattr(token_management, "JWT_SECRET_KEY", "secret")
+    monkeypatch.setattr(token_management, "revoked_users", RevokedUsers())
+    revoked_users = token_management.revoked_users
+
+    async def scenario():
+        factory = MemorySessionFactory(MemoryStorage())
+        user_id = uuid.uuid4()
+        api_key = token_management.create_access_token(
+            {"sub": str(user_id), "role": UserRole.user}
+        )
+        async with factory.begin() as session:
+            repository = MemoryUserRepository(session)
+            await repository.create(
+                User(id=user_id, name="u", api_key=api_key)
+            )
+
+        async with factory() as session:
+            repository = MemoryUserRepository(session)
+            # Пока отзывы не загружены, пользователь читается из базы
+            assert await token_management.authorize_by_claims(
+                api_key, repository
+            ) == (user_id, UserRole.user)
+            revoked_users.replace(await repository.get_revoked(EPOCH))
+            assert user_id not in revoked_users
+
+        async with factory.begin() as session:
+            await MemoryUserRepository(session).delete(user_id)
+
+        async with factory() as session:
+            repository = MemoryUserRepository(session)
+            revoked_users.begin_refresh()
+            revoked_users.replace(await repository.get_revoked(EPOCH))
+            try:
+                await token_management.authorize_by_claims(api_key, repository)
+            except HTTPException as error:
+                return error.status_code
+
+    assert asyncio.run(scenario()) == 401
+    assert token_management.token_claims("not a token") is None
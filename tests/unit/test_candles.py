@@ -0,0 +1,113 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from application.database.memory.repositories import (
+    MemoryCandleRepository,
+    MemoryTransactionRepository,
+)
+from application.database.memory.session import MemorySessionFactory
+from application.database.memory.storage import MemoryStorage
+from application.market_data.candles import (
+    TradeColumns,
+    bucket_start,
+    combine_candles,
+    epoch_microseconds,
+    from_epoch_microseconds,
+    trade_candles,
+)
+from application.models.database_models.transaction import Transaction
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_trades(count: int) -> list[Transaction]:
+    generator = random.Random(1)
+    return [
+        Transaction(
+            ticker="BTC",
+            qty=generator.randint(1, 10),
+            price=generator.randint(90, 110),
+            timestamp=START + timedelta(seconds=index * 37.5),
+        )
+        for index in range(count)
+    ]
+
+
+def naive_candles(trades: list[Transaction], interval: int) -> list[tuple]:
+    buckets: dict[datetime, list[Transaction]] = {}
+    for trade in trades:
+        buckets.setdefault(bucket_start(trade.timestamp, interval), []).append(
+            trade
+        )
+    return [
+        (
+            bucket,
+            group[0].price,
+            max(trade.price for trade in group),
+            min(trade.price for trade in group),
+            group[-1].price,
+            sum(trade.qty for trade in group),
+        )
+        for bucket, group in sorted(buckets.items())
+    ]
+
+
+def test_rollups_match_trades_and_rebuild():
+    trades = make_trades(5000)
+
+    async def scenario():
+        factory = MemorySessionFactory(MemoryStorage())
+        async with factory.begin() as session:
+            transactions = MemoryTransactionRepository(session)
+            # Пачки в обратном порядке: объединение не зависит от порядка
+            for index in reversed(range(0, len(trades), 64)):
+                await transactions.bulk_create(trades[index : index + 64])
+
+        async with factory.begin() as session:
+            candles = MemoryCandleRepository(session)
+            incremental = await candles.get("BTC", 60)
+            await candles.rebuild("BTC", START, START + timedelta(days=3))
+            rebuilt = await candles.get("BTC", 60)
+            hourly = await candles.get(
+                "BTC", 3600, START + timedelta(hours=2), START + timedelta(1)
+            )
+        return incremental, rebuilt, hourly
+
+    incremental, rebuilt, hourly = asyncio.run(scenario())
+    assert incremental == rebuilt
+
+    two_hours = [
+        (c.bucket, c.open, c.high, c.low, c.close, c.volume)
+        for c in combine_candles(hourly, 7200)
+    ]
+    in_range = [
+        trade
+        for trade in trades
+        if START + timedelta(hours=2) <= trade.timestamp < START + timedelta(1)
+    ]
+    assert two_hours == naive_candles(in_range, 7200)
+
+
+def test_trade_candles_match_per_trade_buckets():
+    trades = make_trades(3000)
+    columns = TradeColumns(
+        epochs=np.array([epoch_microseconds(t.timestamp) for t in trades]),
+        prices=np.array([t.price for t in trades]),
+        quantities=np.array([t.qty for t in trades]),
+    )
+    candles = trade_candles(columns, 7 * 60)
+    assert [
+        (from_epoch_microseconds(bucket), *ohlcv)
+        for bucket, *ohlcv in zip(
+            *(column.tolist() for column in candles), strict=True
+        )
+    ] == naive_candles(trades, 7 * 60)
+
+
+def test_trade_candles_without_trades():
+    empty = np.empty(0, dtype=np.int64)
+    candles = trade_candles(TradeColumns(empty, empty, empty), 7 * 60)
+    assert all(len(column) == 0 for column in candles)
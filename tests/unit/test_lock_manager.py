@@ -0,0 +1,105 @@
+import asyncio
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from application.database.lock_manager import (
+    LockManager,
+    LockMetrics,
+    lock_metrics,
+    ticker_lock_key,
+)
+
+TICKERS = ["BTC", "MEMCOIN", "DODGE", "", "ТИКЕР"]
+
+
+class FakeResult:
+    def __init__(self, value: bool):
+        self.value = value
+
+    def one(self) -> bool:
+        return self.value
+
+
+class FakeSession:
+    """
+    Сессия, в которой pg_try_advisory_xact_lock возвращает заданные
+    значения по очереди.
+    """
+
+    def __init__(self, attempts: list[bool]):
+        self.attempts = attempts
+        self.calls = 0
+
+    async def scalars(self, statement):
+        self.calls += 1
+        return FakeResult(self.attempts.pop(0))
+
+
+def test_ticker_lock_key_is_stable_and_fits_bigint():
+    keys = [ticker_lock_key(ticker) for ticker in TICKERS]
+
+    assert keys == [ticker_lock_key(ticker) for ticker in TICKERS]
+    assert len(set(keys)) == len(keys)
+    assert all(-(2**63) <= key < 2**63 for key in keys)
+
+    # hash() строк зависит от PYTHONHASHSEED, ключ - нет
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys\n"
+            "from application.database.lock_manager import ticker_lock_key\n"
+            "print(*map(ticker_lock_key, sys.argv[1:]))",
+            *TICKERS,
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+        cwd=Path(__file__).parents[2],
+        env={**os.environ, "PYTHONHASHSEED": "1", "PYTHONIOENCODING": "utf-8"},
+    ).stdout
+    assert [int(key) for key in output.split()] == keys
+
+
+def test_lock_metrics_accumulate_waits_and_timeouts():
+    metrics = LockMetrics(log_interval=0)
+    metrics.record("BTC", 0.002)
+    metrics.record("BTC", 0.004)
+    metrics.record("BTC", 0.5, acquired=False)
+    metrics.record("DODGE", 0.001)
+
+    assert metrics.snapshot() == {
+        "BTC": {
+            "count": 2,
+            "timeouts": 1,
+            "total_wait_ms": 6.0,
+            "avg_wait_ms": 3.0,
+            "max_wait_ms": 4.0,
+        },
+        "DODGE": {
+            "count": 1,
+            "timeouts": 0,
+            "total_wait_ms": 1.0,
+            "avg_wait_ms": 1.0,
+            "max_wait_ms": 1.0,
+        },
+    }
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_try_lock_retries_until_acquired_or_timeout():
+    lock_metrics.reset()
+    acquired = FakeSession([False, False, True])
+    assert asyncio.run(LockManager(acquired).try_lock_ticker("BTC", 1))
+    assert acquired.calls == 3
+
+    busy = FakeSession([False] * 1000)
+    assert not asyncio.run(LockManager(busy).try_lock_ticker("BTC", 0.01))
+    assert 1 < busy.calls < 1000
+
+    stats = lock_metrics.snapshot()["BTC"]
+    assert (stats["count"], stats["timeouts"]) == (1, 1)
+    lock_metrics.reset()
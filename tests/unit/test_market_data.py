@@ -0,0 +1,156 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from application.database.memory.repositories import (
+    MemoryTransactionRepository,
+)
+from application.database.memory.session import MemorySessionFactory
+from application.database.memory.storage import MemoryStorage
+from application.market_data.events import (
+    MarketDataEvent,
+    MarketDataEventType,
+)
+from application.market_data.snapshot import L2SnapshotRegistry
+from application.market_data.stream import MarketDataStream
+from application.market_data.tape import TradeTape
+from application.models.database_models.transaction import Transaction
+
+NOW = datetime(2026, 10, 18, tzinfo=timezone.utc)
+
+
+def levels_event(bids, trades=0) -> MarketDataEvent:
+    return MarketDataEvent(
+        type=MarketDataEventType.levels,
+        ticker="BTC",
+        bids=bids,
+        trades=[Transaction(ticker="BTC", qty=1, price=90)] * trades,
+    )
+
+
+def test_slow_stream_receives_coalesced_delta():
+    async def scenario():
+        snapshots = L2SnapshotRegistry()
+        snapshots.active = True
+
+        async def loader(ticker):
+            return [(90, 5)], [(100, 1)]
+
+        stream = MarketDataStream("BTC", max_trades=2)
+        snapshots.add_stream(stream)
+        await snapshots.load("BTC", loader)
+        stream.start(snapshots.seq("BTC"))
+
+        snapshots.apply(levels_event([(90, 4)], trades=1))
+        snapshots.apply(levels_event([(90, 0), (85, 2)], trades=2))
+        await asyncio.wait_for(stream.wait(), 1)
+        return stream.pop()
+
+    message = asyncio.run(scenario())
+    assert (message.prev_seq, message.seq) == (0, 2)
+    assert {(level.price, level.qty) for level in message.bid_levels} == {
+        (90, 0),
+        (85, 2),
+    }
+    assert len(message.trades) == 2
+    assert message.missed_trades == 1
+
+
+def test_snapshots_of_deleted_instruments_are_dropped():
+    async def scenario():
+        snapshots = L2SnapshotRegistry()
+        snapshots.active = True
+
+        async def loader(ticker):
+            return [(90, 5)], []
+
+        stream = MarketDataStream("ETH", max_trades=2)
+        snapshots.add_stream(stream)
+        for ticker in ("BTC", "ETH"):
+            await snapshots.load(ticker, loader)
+        stream.start(snapshots.seq("ETH"))
+
+        snapshots.retain(frozenset({"BTC"}))
+        return snapshots, stream
+
+    snapshots, stream = asyncio.run(scenario())
+    assert snapshots.get("BTC") is not None
+    assert snapshots.get("ETH") is None
+    # Клиент удаленного тикера запрашивает снимок и получает отказ
+    assert stream.resync
+
+
+def test_trade_tape_serves_newest_first_until_evicted():
+    trades = [
+        Transaction(
+            ticker="BTC",
+            qty=index + 1,
+            price=100 + index,
+            timestamp=NOW + timedelta(seconds=index),
+        )
+        for index in range(5)
+    ]
+    tape = TradeTape("BTC", capacity=3, trades=trades[:2], complete=True)
+    assert [trade.qty for trade in tape.latest(0)] == [2, 1]
+
+    tape.extend(trades[1:])
+    assert not tape.complete
+    assert [trade.id for trade in tape.latest(2)] == [
+        trades[4].id,
+        trades[3].id,
+    ]
+    assert [trade.price for trade in tape.latest(2, trades[4].id)] == [
+        103,
+        102,
+    ]
+    # Старше буфера - только из базы
+    assert tape.latest(3, trades[4].id) is None
+    assert tape.latest(1, trades[1].id) is None
+
+
+def test_trade_tape_pages_past_oldest_trade_are_empty():
+    trades = [
+        Transaction(
+            ticker="BTC",
+            qty=1,
+            price=100,
+            timestamp=NOW + timedelta(seconds=index),
+        )
+        for index in range(2)
+    ]
+    assert TradeTape("BTC", capacity=3, complete=True).latest(10) == []
+
+    tape = TradeTape("BTC", capacity=3, trades=trades, complete=True)
+    assert tape.latest(10, trades[0].id) == []
+    assert tape.latest(0, trades[0].id) == []
+
+
+@pytest.mark.asyncio
+async def test_trade_pages_continue_from_tape_into_database():
+    # Все сделки одного тейкера имеют его время
+    trades = [
+        Transaction(ticker="BTC", qty=1, price=100 + index, timestamp=NOW)
+        for index in range(7)
+    ]
+    factory = MemorySessionFactory(MemoryStorage())
+    async with factory.begin() as session:
+        repository = MemoryTransactionRepository(session)
+        await repository.bulk_create(trades)
+        expected = await repository.get_latest("BTC")
+        tape = TradeTape(
+            "BTC", capacity=3, trades=reversed(expected[:3]), complete=False
+        )
+
+        pages = []
+        before = None
+        while True:
+            page = tape.latest(2, before)
+            if page is None:
+                page = await repository.get_latest("BTC", 2, before)
+            if not page:
+                break
+            pages += page
+            before = page[-1].id
+
+    assert [trade.id for trade in pages] == [trade.id for trade in expected]
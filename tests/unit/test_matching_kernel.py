@@ -0,0 +1,103 @@
+import uuid
+
+from application.matching.kernel import MakerOrder, match
+from application.models.database_models.order import (
+    Order,
+    OrderDirection,
+    OrderStatus,
+)
+from application.order_consumer import net_balance_deltas, processing_orders
+
+
+def make_maker(price: int, qty: int, filled: int = 0) -> MakerOrder:
+    return MakerOrder(uuid.uuid4(), uuid.uuid4(), price, qty, filled)
+
+
+def test_limit_order_stops_at_limit_price():
+    makers = [make_maker(100, 5), make_maker(101, 5), make_maker(105, 5)]
+
+    fills = match(OrderDirection.buy, 101, 20, makers)
+
+    assert [(fill.price, fill.qty) for fill in fills] == [(100, 5), (101, 5)]
+    assert all(fill.maker_executed for fill in fills)
+
+
+def test_partial_fill_of_maker():
+    maker = make_maker(100, 10, filled=4)
+
+    (fill,) = match(OrderDirection.sell, None, 3, [maker])
+
+    assert fill.qty == 3
+    assert fill.maker_filled == 7
+    assert not fill.maker_executed
+
+
+def test_processing_orders_builds_balances_and_transactions():
+    seller = Order(
+        status=OrderStatus.new,
+        user_id=uuid.uuid4(),
+        direction=OrderDirection.sell,
+        ticker="BTC",
+        qty=3,
+        price=90,
+    )
+    buyer = Order(
+        status=OrderStatus.new,
+        user_id=uuid.uuid4(),
+        direction=OrderDirection.buy,
+        ticker="BTC",
+        qty=5,
+        price=100,
+    )
+
+    result = processing_orders(seller, [buyer], "RUB")
+
+    assert seller.status == OrderStatus.executed
+    assert result.ticker_count == 3
+    assert result.final_cost == 300
+    assert [(t.qty, t.price) for t in result.transactions] == [(3, 100)]
+    maker_update = result.changed_orders[0]
+    assert maker_update.id == buyer.id
+    assert maker_update.filled == 3
+    assert maker_update.status == OrderStatus.partially_executed
+    assert result.balance_totals == {
+        (buyer.user_id, "BTC"): [3, 0],
+        (buyer.user_id, "RUB"): [0, -300],
+        (seller.user_id, "RUB"): [300, 0],
+        (seller.user_id, "BTC"): [0, -3],
+    }
+
+
+def test_sweep_nets_balance_deltas_per_account():
+    maker_user_id = uuid.uuid4()
+    makers = [
+        Order(
+            status=OrderStatus.new,
+            user_id=maker_user_id,
+            direction=OrderDirection.sell,
+            ticker="BTC",
+            qty=1,
+            price=90 + index % 5,
+        )
+        for index in range(50)
+    ]
+    makers.sort(key=lambda order: order.price)
+    taker = Order(
+        status=OrderStatus.new,
+        user_id=uuid.uuid4(),
+        direction=OrderDirection.buy,
+        ticker="BTC",
+        qty=50,
+        price=100,
+    )
+
+    result = processing_orders(taker, makers, "RUB")
+    deltas = net_balance_deltas(result.balance_totals)
+
+    cost = sum(order.price for order in makers)
+    assert {(d.user_id, d.ticker): (d.qty, d.reserve) for d in deltas} == {
+        (maker_user_id, "BTC"): (0, -50),
+        (maker_user_id, "RUB"): (cost, 0),
+        (taker.user_id, "BTC"): (50, 0),
+        (taker.user_id, "RUB"): (100 * 50 - cost, -100 * 50),
+    }
@@ -0,0 +1,194 @@
+import asyncio
+import uuid
+
+from application.database.memory.repositories import (
+    MemoryBalanceRepository,
+    MemoryOrderRepository,
+    MemoryOutboxMessageRepository,
+)
+from application.database.memory.session import MemorySessionFactory
+from application.database.memory.storage import MemoryStorage
+from application.models.database_models.balance import Balance, BalanceDelta
+from application.models.database_models.order import (
+    Order,
+    OrderDirection,
+    OrderStatus,
+    UpdateOrder,
+)
+from application.models.database_models.outbox_message import OutboxMessage
+
+
+def make_order(direction: OrderDirection, price: int, qty: int) -> Order:
+    return Order(
+        status=OrderStatus.new,
+        user_id=uuid.uuid4(),
+        direction=direction,
+        ticker="BTC",
+        qty=qty,
+        price=price,
+    )
+
+
+def test_crossing_orders_follow_updates():
+    async def scenario():
+        factory = MemorySessionFactory(MemoryStorage())
+        cheap = make_order(OrderDirection.sell, 90, 5)
+        early = make_order(OrderDirection.sell, 100, 5)
+        late = make_order(OrderDirection.sell, 100, 5)
+        async with factory.begin() as session:
+            repository = MemoryOrderRepository(session)
+            for order in (early, late, cheap):
+                await repository.create(order)
+            await repository.bulk_update(
+                [
+                    UpdateOrder(
+                        id=cheap.id, status=OrderStatus.executed, filled=5
+                    ),
+                    UpdateOrder(
+                        id=early.id,
+                        status=OrderStatus.partially_executed,
+                        filled=2,
+                    ),
+                ]
+            )
+            crossing = await repository.get_crossing_orders(
+                "BTC", OrderDirection.sell, qty=4, price=100
+            )
+        assert [(order.id, order.filled) for order in crossing] == [
+            (early.id, 2),
+            (late.id, 0),
+        ]
+
+    asyncio.run(scenario())
+
+
+def test_savepoint_rollback_restores_balances():
+    async def scenario():
+        factory = MemorySessionFactory(MemoryStorage())
+        user_id = uuid.uuid4()
+        async with factory.begin() as session:
+            repository = MemoryBalanceRepository(session)
+            await repository.upsert(
+                Balance(user_id=user_id, ticker="RUB", qty=100)
+            )
+            savepoint = await session.begin_nested()
+            assert await repository.reserve_if_available(user_id, "RUB", 60)
+            await repository.bulk_adjust(
+                [BalanceDelta(user_id=user_id, ticker="BTC", qty=1)]
+            )
+            await savepoint.rollback()
+            assert not await repository.reserve_if_available(
+                user_id, "RUB", 101
+            )
+            return await repository.get_balances_by_user_id(user_id)
+
+    balances = asyncio.run(scenario())
+    assert [(b.ticker, b.qty, b.reserve) for b in balances] == [
+        ("RUB", 100, 0)
+    ]
+
+
+def test_order_and_outbox_message_are_written_together():
+    storage = MemoryStorage()
+
+    async def scenario():
+        factory = MemorySessionFactory(storage)
+        order = make_order(OrderDirection.buy, 100, 5)
+        message = OutboxMessage(id=order.id, payload=order.model_dump_json())
+        async with factory() as session:
+            repository = MemoryOrderRepository(session)
+            await repository.create_with_outbox(order, message)
+            await session.rollback()
+        assert not storage.orders and not storage.outbox
+        storage.outbox_ready.clear()
+
+        async with factory.begin() as session:
+            repository = MemoryOrderRepository(session)
+            await repository.create_with_outbox(order, message)
+            outbox = MemoryOutboxMessageRepository(session)
+            return await repository.get_by_id(order.id), await outbox.get()
+
+    order, messages = asyncio.run(scenario())
+    assert storage.outbox_ready.is_set()
+    assert order.status == OrderStatus.new
+    assert [Order.model_validate_json(m.payload).id for m in messages] == [
+        order.id
+    ]
+
+
+def test_outbox_returns_order_batch_whole():
+    async def scenario():
+        factory = MemorySessionFactory(MemoryStorage())
+        single = make_order(OrderDirection.buy, 100, 1)
+        batch = [make_order(OrderDirection.sell, 101, 1) for _ in range(3)]
+        async with factory.begin() as session:
+            await MemoryOrderRepository(session).create_with_outbox(
+                single,
+                OutboxMessage(id=single.id, payload=single.model_dump_json()),
+            )
+        async with factory.begin() as session:
+            await MemoryOrderRepository(session).bulk_create_with_outbox(
+                batch,
+                [
+                    OutboxMessage(id=order.id, payload=order.model_dump_json())
+                    for order in batch
+                ],
+            )
+            return await MemoryOutboxMessageRepository(session).get(limit=2)
+
+    messages = asyncio.run(scenario())
+    assert len(messages) == 4
+
+
+def test_sent_outbox_messages_are_dropped_until_rollback():
+    storage = MemoryStorage()
+    messages = [OutboxMessage(id=uuid.uuid4(), payload="{}") for _ in range(3)]
+
+    async def scenario():
+        factory = MemorySessionFactory(storage)
+        for message in messages:
+            async with factory.begin() as session:
+                await MemoryOutboxMessageRepository(session).create(message)
+
+        async with factory() as session:
+            outbox = MemoryOutboxMessageRepository(session)
+            await outbox.mark_sent([messages[0].id, messages[1].id])
+            assert list(storage.outbox) == [messages[2].id]
+            await session.rollback()
+        restored = list(storage.outbox)
+
+        async with factory.begin() as session:
+            outbox = MemoryOutboxMessageRepository(session)
+            await outbox.mark_sent([messages[1].id])
+            return restored, await outbox.get()
+
+    restored, unsent = asyncio.run(scenario())
+    assert restored == [message.id for message in messages]
+    assert [message.id for message in unsent] == [
+        messages[0].id,
+        messages[2].id,
+    ]
+
+
+def test_outbox_batch_keeps_order_after_rollback():
+    storage = MemoryStorage()
+    messages = [OutboxMessage(id=uuid.uuid4(), payload="{}") for _ in range(3)]
+
+    async def scenario():
+        factory = MemorySessionFactory(storage)
+        async with factory.begin() as session:
+            await MemoryOutboxMessageRepository(session).bulk_create(messages)
+
+        async with factory() as session:
+            outbox = MemoryOutboxMessageRepository(session)
+            await outbox.mark_sent([messages[2].id, messages[0].id])
+            await session.rollback()
+
+        async with factory() as session:
+            return await MemoryOutboxMessageRepository(session).get(limit=1)
+
+    # Сообщения одной транзакции возвращаются в порядке записи
+    unsent = asyncio.run(scenario())
+    assert [message.id for message in unsent] == [
+        message.id for message in messages
+    ]
@@ -0,0 +1,160 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from application.market_data.events import (
+    MarketDataEvent,
+    MarketDataEventType,
+)
+from application.market_data.snapshot import L2SnapshotRegistry
+from application.matching.order_book import OrderBook, OrderBookRegistry
+from application.models.database_models.order import (
+    Order,
+    OrderDirection,
+    OrderStatus,
+    UpdateOrder,
+)
+
+START = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def make_order(
+    direction: OrderDirection,
+    price: int | None,
+    qty: int,
+    seconds: int = 0,
+    filled: int = 0,
+) -> Order:
+    return Order(
+        status=OrderStatus.new,
+        user_id=uuid.uuid4(),
+        timestamp=START + timedelta(seconds=seconds),
+        direction=direction,
+        ticker="BTC",
+        qty=qty,
+        price=price,
+        filled=filled,
+    )
+
+
+def test_crossing_uses_price_time_priority():
+    book = OrderBook("BTC")
+    late = make_order(OrderDirection.sell, 100, 5, seconds=2)
+    early = make_order(OrderDirection.sell, 100, 5, seconds=1)
+    cheap = make_order(OrderDirection.sell, 90, 5, seconds=3)
+    expensive = make_order(OrderDirection.sell, 120, 5)
+    for order in (early, late, cheap, expensive):
+        book.add(order)
+
+    taker = make_order(OrderDirection.buy, 110, 12)
+    assert book.crossing(taker) == [cheap.id, early.id, late.id]
+
+    small_taker = make_order(OrderDirection.buy, 110, 6)
+    assert book.crossing(small_taker) == [cheap.id, early.id]
+
+
+def test_market_order_crosses_all_levels():
+    book = OrderBook("BTC")
+    best = make_order(OrderDirection.buy, 100, 1)
+    worst = make_order(OrderDirection.buy, 10, 1)
+    book.add(worst)
+    book.add(best)
+
+    taker = make_order(OrderDirection.sell, None, 10)
+    assert book.crossing(taker) == [best.id, worst.id]
+
+
+def test_apply_updates_fills_and_rests_current_order():
+    book = OrderBook("BTC")
+    maker = make_order(OrderDirection.sell, 100, 5)
+    other = make_order(OrderDirection.sell, 100, 5, seconds=1)
+    book.add(maker)
+    book.add(other)
+
+    taker = make_order(OrderDirection.buy, 100, 8)
+    taker.filled = 8
+    taker.status = OrderStatus.executed
+    book.apply(
+        taker,
+        [
+            UpdateOrder(id=maker.id, status=OrderStatus.executed, filled=5),
+            UpdateOrder(
+                id=other.id,
+                status=OrderStatus.partially_executed,
+                filled=3,
+            ),
+        ],
+    )
+
+    assert maker.id not in book
+    assert taker.id not in book
+    assert book.crossing(make_order(OrderDirection.buy, 100, 10)) == [other.id]
+    assert len(book.asks) == 1
+
+
+def test_registry_rebuilds_invalidated_ticker():
+    registry = OrderBookRegistry()
+    assert registry.get("BTC") is None
+
+    order = make_order(OrderDirection.buy, 100, 1)
+    registry.rebuild([order])
+    book = registry.get("BTC")
+    assert book is not None and order.id in book
+
+    registry.invalidate("BTC")
+    assert registry.get("BTC") is None
+    registry.rebuild([], "BTC")
+    assert len(registry.get("BTC")) == 0
+
+
+def test_rebuild_orders_equal_timestamps_by_id():
+    orders = sorted(
+        (make_order(OrderDirection.sell, 100, 1) for _ in range(5)),
+        key=lambda order: order.id,
+        reverse=True,
+    )
+    registry = OrderBookRegistry()
+    registry.rebuild(orders)
+
+    book = registry.get("BTC")
+    assert book is not None
+    taker = make_order(OrderDirection.buy, 100, 5)
+    assert book.crossing(taker) == sorted(order.id for order in orders)
+
+
+def test_changed_levels_keep_snapshot_in_sync():
+    book = OrderBook("BTC")
+    bid = make_order(OrderDirection.buy, 90, 5)
+    ask = make_order(OrderDirection.sell, 100, 5)
+    book.add(bid)
+    book.add(ask)
+
+    snapshots = L2SnapshotRegistry()
+    snapshots.active = True
+    is_snapshot, bids, asks = book.pop_changed_levels()
+    assert is_snapshot
+    snapshots.apply(
+        MarketDataEvent(
+            type=MarketDataEventType.snapshot,
+            ticker="BTC",
+            bids=bids,
+            asks=asks,
+        )
+    )
+
+    book.fill(ask.id, 2, OrderStatus.partially_executed)
+    book.remove(bid.id)
+    book.add(make_order(OrderDirection.buy, 95, 4))
+    is_snapshot, bids, asks = book.pop_changed_levels()
+    assert not is_snapshot
+    snapshots.apply(
+        MarketDataEvent(
+            type=MarketDataEventType.levels,
+            ticker="BTC",
+            bids=bids,
+            asks=asks,
+        )
+    )
+
+    snapshot = snapshots.get("BTC")
+    assert snapshot.bids.levels() == list(book.bids.levels()) == [(95, 4)]
+    assert snapshot.asks.levels(1) == list(book.asks.levels()) == [(100, 3)]
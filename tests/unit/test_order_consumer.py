@@ -0,0 +1,80 @@
+import asyncio
+import uuid
+
+from application.database.memory.repositories import (
+    MemoryBalanceRepository,
+    MemoryOrderRepository,
+    MemoryTransactionRepository,
+)
+from application.database.memory.session import MemorySessionFactory
+from application.database.memory.storage import MemoryStorage
+from application.matching.order_book import OrderBookRegistry
+from application.models.database_models.balance import Balance
+from application.models.database_models.order import (
+    Order,
+    OrderDirection,
+    OrderStatus,
+)
+from application.order_consumer import execute_order
+
+
+def make_order(user_id: uuid.UUID, direction: OrderDirection) -> Order:
+    return Order(
+        status=OrderStatus.new,
+        user_id=user_id,
+        direction=direction,
+        ticker="BTC",
+        qty=5,
+        price=100,
+    )
+
+
+def test_redelivered_order_is_executed_once():
+    seller_id = uuid.uuid4()
+    buyer_id = uuid.uuid4()
+    sell = make_order(seller_id, OrderDirection.sell)
+    buy = make_order(buyer_id, OrderDirection.buy)
+
+    async def scenario():
+        factory = MemorySessionFactory(MemoryStorage())
+        order_books = OrderBookRegistry()
+        async with factory.begin() as session:
+            balances = MemoryBalanceRepository(session)
+            await balances.upsert(
+                Balance(user_id=seller_id, ticker="BTC", qty=5)
+            )
+            await balances.upsert(
+                Balance(user_id=buyer_id, ticker="RUB", qty=1000)
+            )
+
+        async def deliver(order: Order):
+            async with factory.begin() as session:
+                return await execute_order(
+                    current_order=order.model_copy(),
+                    base_asset="RUB",
+                    balance_repository=MemoryBalanceRepository(session),
+                    order_repository=MemoryOrderRepository(session),
+                    transaction_repository=MemoryTransactionRepository(
+                        session
+                    ),
+                    order_books=order_books,
+                )
+
+        results = [await deliver(order) for order in (sell, buy, buy, sell)]
+        async with factory.begin() as session:
+            balances = MemoryBalanceRepository(session)
+            buyer_rub = await balances.get_balance_by_user_id_and_ticker(
+                buyer_id, "RUB"
+            )
+            seller_btc = await balances.get_balance_by_user_id_and_ticker(
+                seller_id, "BTC"
+            )
+            trades = await MemoryTransactionRepository(session).get("BTC")
+        return results, buyer_rub, seller_btc, trades
+
+    results, buyer_rub, seller_btc, trades = asyncio.run(scenario())
+
+    assert [result.status_code for result in results] == [200, 200, 409, 409]
+    assert len(trades) == 1
+    assert (buyer_rub.qty, buyer_rub.reserve) == (500, 0)
+    assert (seller_btc.qty, seller_btc.reserve) == (0, 0)
@@ -0,0 +1,67 @@
+import asyncio
+import uuid
+
+from application.broker import run_outbox_publisher
+from application.broker.run_outbox_publisher import (
+    next_batch_size,
+    publish_batch,
+)
+from application.config import OUTBOX_BATCH_MAX, OUTBOX_BATCH_MIN
+from application.models.database_models.outbox_message import OutboxMessage
+
+
+class FakeRabbitMQClient:
+    def __init__(self, confirmed: list[bool]):
+        self.confirmed = confirmed
+        self.published: list[list[tuple[str, str]]] = []
+
+    async def publish_batch(self, messages):
+        self.published.append(messages)
+        return self.confirmed
+
+
+def test_confirmed_and_invalid_messages_are_marked_sent():
+    messages = [
+        OutboxMessage(id=uuid.uuid4(), payload='{"ticker": "MEMCOIN"}'),
+        OutboxMessage(id=uuid.uuid4(), payload="not json"),
+        OutboxMessage(id=uuid.uuid4(), payload='{"ticker": "DODGE"}'),
+    ]
+    rabbit = FakeRabbitMQClient([True, False])
+
+    sent = asyncio.run(publish_batch(rabbit, messages))
+
+    # Сообщение, которое невозможно разобрать, не выбирается повторно
+    assert sent == [messages[1].id, messages[0].id]
+    assert len(rabbit.published) == 1
+    assert [payload for payload, _ in rabbit.published[0]] == [
+        messages[0].payload,
+        messages[2].payload,
+    ]
+
+
+def test_messages_after_unconfirmed_one_in_queue_are_retried(monkeypatch):
+    monkeypatch.setattr(run_outbox_publisher, "ticker_queue", lambda t: t)
+    messages = [
+        OutboxMessage(id=uuid.uuid4(), payload='{"ticker": "MEMCOIN"}'),
+        OutboxMessage(id=uuid.uuid4(), payload='{"ticker": "MEMCOIN"}'),
+        OutboxMessage(id=uuid.uuid4(), payload='{"ticker": "DODGE"}'),
+        OutboxMessage(id=uuid.uuid4(), payload='{"ticker": "MEMCOIN"}'),
+    ]
+    rabbit = FakeRabbitMQClient([True, False, True, True])
+
+    sent = asyncio.run(publish_batch(rabbit, messages))
+
+    # Следующее сообщение очереди MEMCOIN ждет повтора предыдущего
+    assert sent == [messages[0].id, messages[2].id]
+
+
+def test_batch_size_follows_backlog():
+    batch_size = OUTBOX_BATCH_MIN
+    while batch_size < OUTBOX_BATCH_MAX:
+        batch_size = next_batch_size(batch_size, batch_size)
+    assert batch_size == OUTBOX_BATCH_MAX
+    assert next_batch_size(batch_size, batch_size * 3) == OUTBOX_BATCH_MAX
+
+    while batch_size > OUTBOX_BATCH_MIN:
+        batch_size = next_batch_size(batch_size, 1)
+    assert batch_size == OUTBOX_BATCH_MIN
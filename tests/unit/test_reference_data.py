@@ -0,0 +1,46 @@
+import asyncio
+
+from application.reference_data import ReferenceData, ReferenceSnapshot
+
+
+class FakeInstrumentRepository:
+    def __init__(self):
+        self.queries = 0
+
+    async def exists_in_database(self, ticker: str) -> bool:
+        self.queries += 1
+        return ticker == "NEW"
+
+
+def test_reference_data_skips_snapshot_read_before_change():
+    async def scenario():
+        reference_data = ReferenceData()
+        tickers = [{"BTC"}]
+
+        async def load():
+            version = reference_data.version
+            await asyncio.sleep(0)
+            return ReferenceSnapshot(version, frozenset(tickers[0]), {})
+
+        reference_data.load = load
+        repository = FakeInstrumentRepository()
+        task = asyncio.create_task(reference_data.keep_loaded())
+
+        reference_data.activate()
+        await asyncio.sleep(0)
+        # Инструмент добавлен, пока снимок читался
+        tickers[0] = {"BTC", "NEW"}
+        reference_data.invalidate()
+        assert await reference_data.ticker_exists("NEW", repository)
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        found = await reference_data.ticker_exists("NEW", repository)
+        reference_data.reset()
+        task.cancel()
+        return found, reference_data.snapshot, repository.queries
+
+    found, snapshot, queries = asyncio.run(scenario())
+    assert found
+    assert snapshot is None
+    assert queries == 1
@@ -0,0 +1,40 @@
+import pytest
+
+from application.broker.sharding import (
+    owned_shards,
+    shard_queue,
+    ticker_queue,
+    ticker_shard,
+)
+from application.config import ORDER_QUEUE
+
+
+def test_owned_shards_parses_lists_and_ranges():
+    assert owned_shards("0,1,4-7", 8) == [0, 1, 4, 5, 6, 7]
+    assert owned_shards(" 3 , 1-2 ,, 2 ", 4) == [1, 2, 3]
+    assert owned_shards("5-5", 8) == [5]
+    assert owned_shards("", 3) == [0, 1, 2]
+    assert owned_shards("  ", 3) == [0, 1, 2]
+
+
+@pytest.mark.parametrize(
+    "value", ["8", "0,8", "6-9", "-1", "x", "1-", "1-x", "3-1", "1-2-3", ","]
+)
+def test_owned_shards_rejects_invalid_specs(value):
+    with pytest.raises(ValueError):
+        owned_shards(value, 8)
+
+
+def test_ticker_shard_is_stable_crc32():
+    # Значения зафиксированы: смена хеша перенаправит тикеры
+    # в другие очереди
+    tickers = ("BTC", "MEMCOIN", "DODGE")
+    assert [ticker_shard(ticker, 8) for ticker in tickers] == [6, 5, 6]
+    assert all(0 <= ticker_shard(f"T{index}", 5) < 5 for index in range(100))
+    assert ticker_shard("BTC", 1) == 0
+
+
+def test_ticker_queue_names():
+    assert shard_queue(0, 1) == ORDER_QUEUE
+    assert shard_queue(3, 8) == f"{ORDER_QUEUE}.3"
+    assert ticker_queue("BTC", 8) == f"{ORDER_QUEUE}.6"